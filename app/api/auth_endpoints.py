@@ -0,0 +1,25 @@
+from fastapi import APIRouter, status
+
+from app.dependencies import device_login
+from app.schemas.responses import AuthStatusResponse
+
+router = APIRouter()
+
+
+@router.get(
+    "/status",
+    response_model=AuthStatusResponse,
+    summary="Current state of the Microsoft Graph device-code login",
+)
+async def auth_status() -> AuthStatusResponse:
+    return AuthStatusResponse(**device_login.status())
+
+
+@router.post(
+    "/start",
+    response_model=AuthStatusResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Start a device-code login and return the user code",
+)
+async def auth_start() -> AuthStatusResponse:
+    return AuthStatusResponse(**await device_login.start())
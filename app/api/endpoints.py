@@ -1,12 +1,47 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from fastapi.responses import JSONResponse
-from app.dependencies import get_email_manager
-from app.schemas.email import EmailCreate
-from app.schemas.responses import FetchEmailsResponse, SendEmailResponse
+from app.core.config import settings
+from app.db.base import IEmailRepository
+from app.dependencies import (
+    get_cached_email_repo,
+    get_email_manager,
+    get_outbox_workers,
+    get_sync_engine,
+    require_graph_auth,
+)
+from app.schemas.email import (
+    EMAIL_FIELDS,
+    EmailCreate,
+    EmailInDB,
+    EmailPage,
+    EmailQuery,
+)
+from app.schemas.responses import (
+    BulkSendEmailResponse,
+    FetchEmailsResponse,
+    OutboxStatusResponse,
+    SendEmailResponse,
+)
 from app.services.email_manager import EmailManager
+from app.services.outbox_worker import OutboxWorkerPool
+from app.services.sync_engine import MailboxSyncEngine
 
 router = APIRouter()
 
+
+def _projection(fields: str | None) -> list[str] | None:
+    """Parse the comma-separated ``fields`` parameter, rejecting unknown fields."""
+    if not fields:
+        return None
+    projection = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = set(projection) - EMAIL_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {sorted(unknown)}",
+        )
+    return projection or None
+
 @router.get("/health", tags=["Health"])
 async def health_check():
     """
@@ -14,21 +49,107 @@ async def health_check():
     """
     return JSONResponse(status_code=status.HTTP_200_OK, content={"status": "All good"})
 
+@router.get(
+    "",
+    tags=["Business Logic"],
+    response_model=EmailPage,
+    summary="Stored emails, newest first, with keyset pagination",
+)
+async def list_emails(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    sender: str | None = None,
+    conversation_id: str | None = None,
+    folder_id: str | None = None,
+    is_read: bool | None = None,
+    fields: str | None = Query(
+        None,
+        description=(
+            "Comma-separated fields to return, e.g. subject,sender; "
+            "default all but body"
+        ),
+    ),
+    repo: IEmailRepository = Depends(get_cached_email_repo),
+) -> EmailPage:
+    projection = _projection(fields)
+    query = EmailQuery(
+        sender=sender,
+        conversation_id=conversation_id,
+        folder_id=folder_id,
+        is_read=is_read,
+    )
+    try:
+        return await repo.query_emails(
+            query, limit=limit, cursor=cursor, fields=projection,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 @router.post(
     "/send",
     tags=["Business Logic"],
     response_model=SendEmailResponse,
-    status_code=status.HTTP_200_OK,
-    summary="Send an email and echo the request",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Queue an email in the outbox for delivery",
+    dependencies=[Depends(require_graph_auth)],
 )
 async def send_email(
     email: EmailCreate,
     manager: EmailManager = Depends(get_email_manager),
+    workers: OutboxWorkerPool = Depends(get_outbox_workers),
 ) -> SendEmailResponse:
-    graph_status: int = await manager.send_email(email)
-    if not graph_status:
-        return SendEmailResponse(status_code=500, email=email , message="error inn sending mail")
-    return SendEmailResponse(status_code=200, email=email , message="Email Sent")
+    message = await manager.queue_email(email)
+    workers.wake()
+    return SendEmailResponse(
+        status_code=202,
+        email=email,
+        message="Email queued",
+        id=message.id,
+    )
+
+
+@router.get(
+    "/send/{message_id}",
+    tags=["Business Logic"],
+    response_model=OutboxStatusResponse,
+    summary="Delivery status of a queued email",
+)
+async def get_send_status(
+    message_id: str,
+    manager: EmailManager = Depends(get_email_manager),
+) -> OutboxStatusResponse:
+    message = await manager.get_outbox_message(message_id)
+    if message is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown message id",
+        )
+    return OutboxStatusResponse(
+        id=message.id,
+        status=message.status,
+        attempts=message.attempts,
+        last_error=message.last_error,
+        created_at=message.created_at,
+        sent_at=message.sent_at,
+    )
+
+
+@router.post(
+    "/send/bulk",
+    tags=["Business Logic"],
+    response_model=BulkSendEmailResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Send many emails through Graph JSON batching",
+    dependencies=[Depends(require_graph_auth)],
+)
+async def send_emails_bulk(
+    emails: list[EmailCreate] = Body(..., min_length=1, max_length=1000),
+    manager: EmailManager = Depends(get_email_manager),
+) -> BulkSendEmailResponse:
+    results = await manager.send_emails_batch(emails)
+    sent = sum(result.sent for result in results)
+    return BulkSendEmailResponse(sent=sent, failed=len(results) - sent, results=results)
 
 
 @router.get(
@@ -37,10 +158,55 @@ async def send_email(
     response_model=FetchEmailsResponse,
     status_code=status.HTTP_200_OK,
     summary="Fetch new emails and report count",
+    dependencies=[Depends(require_graph_auth)],
 )
-@router.get("/fetch")
 async def fetch_emails(
-    manager: EmailManager = Depends(get_email_manager),
+    engine: MailboxSyncEngine = Depends(get_sync_engine),
 ):
-    messages = await manager.sync_and_store_emails()
-    return FetchEmailsResponse(status_code=200, count=len(messages))
+    # Joins the scheduled sync if one is already running for the mailbox
+    stats = await engine.sync_mailbox(settings.USER_EMAIL)
+    if stats is None:
+        # Another sync holds the mailbox's (or the global) sync lease and covers it
+        return FetchEmailsResponse(status_code=202, count=0)
+    return FetchEmailsResponse(status_code=200, count=stats.stored)
+
+
+@router.get(
+    "/search",
+    tags=["Business Logic"],
+    response_model=EmailPage,
+    summary="Full-text search over subject, preview and body, best matches first",
+)
+async def search_emails(
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    fields: str | None = Query(None, description="Comma-separated fields to return"),
+    repo: IEmailRepository = Depends(get_cached_email_repo),
+) -> EmailPage:
+    try:
+        return await repo.search_emails(
+            q, limit=limit, cursor=cursor, fields=_projection(fields)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+# Declared last: the catch-all path must not shadow /health, /fetch, /send/...
+@router.get(
+    "/{email_id}",
+    tags=["Business Logic"],
+    response_model=EmailInDB,
+    summary="One stored email, including its body",
+)
+async def get_email(
+    email_id: str,
+    repo: IEmailRepository = Depends(get_cached_email_repo),
+) -> EmailInDB:
+    email = await repo.get_email(email_id)
+    if email is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown email id",
+        )
+    return email
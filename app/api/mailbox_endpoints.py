@@ -0,0 +1,63 @@
+from datetime import UTC, datetime
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import EmailStr, TypeAdapter, ValidationError
+
+from app.db.base import IMailboxRepository
+from app.dependencies import get_mailbox_repo
+from app.schemas.mailbox import Mailbox
+from app.schemas.responses import MailboxStatusResponse, MailboxUpdate
+
+router = APIRouter()
+
+# The address ends up in Graph URLs and every sync tick; only real ones get in
+_ADDRESS = TypeAdapter(EmailStr)
+
+
+def _status(mailbox: Mailbox) -> MailboxStatusResponse:
+    lag = None
+    if mailbox.last_success_at is not None:
+        last_success = mailbox.last_success_at
+        if last_success.tzinfo is None:
+            last_success = last_success.replace(tzinfo=UTC)
+        lag = (datetime.now(UTC) - last_success).total_seconds()
+    return MailboxStatusResponse(
+        address=mailbox.address,
+        enabled=mailbox.enabled,
+        last_success_at=mailbox.last_success_at,
+        lag_seconds=lag,
+        last_error=mailbox.last_error,
+        last_stats=mailbox.last_stats,
+    )
+
+
+@router.get(
+    "",
+    response_model=list[MailboxStatusResponse],
+    summary="Registered mailboxes and how far behind their sync is",
+)
+async def list_mailboxes(
+    repo: IMailboxRepository = Depends(get_mailbox_repo),
+) -> list[MailboxStatusResponse]:
+    mailboxes = await repo.list_mailboxes(enabled_only=False)
+    return [_status(mailbox) for mailbox in mailboxes]
+
+
+@router.put(
+    "/{address}",
+    response_model=MailboxStatusResponse,
+    summary="Add a mailbox to the sync registry, or enable/disable it",
+)
+async def register_mailbox(
+    address: str,
+    update: MailboxUpdate,
+    repo: IMailboxRepository = Depends(get_mailbox_repo),
+) -> MailboxStatusResponse:
+    try:
+        address = _ADDRESS.validate_python(address)
+    except ValidationError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Not a mailbox address: {address!r}",
+        )
+    return _status(await repo.register_mailbox(address, enabled=update.enabled))
@@ -0,0 +1,38 @@
+from fastapi import APIRouter
+
+from app.core.config import settings
+from app.dependencies import (
+    get_contact_writer,
+    get_email_read_cache,
+    get_notification_processor,
+    get_outbox_workers,
+    get_parse_pool,
+    get_subscription_manager,
+    get_sync_engine,
+    graph_rate_limiter,
+    token_refresher,
+)
+
+router = APIRouter()
+
+
+@router.get(
+    "",
+    tags=["Observability"],
+    summary="Runtime metrics of background components",
+)
+async def get_metrics():
+    metrics = {
+        "token_refresher": token_refresher.stats(),
+        "outbox": get_outbox_workers().stats(),
+        "graph_rate_limiter": graph_rate_limiter.stats(),
+        "sync": get_sync_engine().stats(),
+        "contacts": get_contact_writer().stats(),
+        "email_cache": get_email_read_cache().stats(),
+    }
+    if settings.PUSH_ENABLED:
+        metrics["notifications"] = get_notification_processor().stats()
+        metrics["subscriptions"] = get_subscription_manager().stats()
+    if get_parse_pool() is not None:
+        metrics["parse_pool"] = get_parse_pool().stats()
+    return metrics
@@ -0,0 +1,82 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.dependencies import (
+    get_notification_processor,
+    get_subscription_manager,
+    require_push_enabled,
+)
+from app.services.notification_processor import NotificationProcessor
+from app.services.subscription_manager import SubscriptionManager
+
+logger = logging.getLogger(__name__)
+
+# Without push settings the processor never starts, so nothing is accepted
+router = APIRouter(dependencies=[Depends(require_push_enabled)])
+
+
+@router.post(
+    "",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Webhook for Microsoft Graph change notifications",
+)
+async def receive_notifications(
+    request: Request,
+    validation_token: str | None = Query(None, alias="validationToken"),
+    subscriptions: SubscriptionManager = Depends(get_subscription_manager),
+    processor: NotificationProcessor = Depends(get_notification_processor),
+):
+    if validation_token is not None:
+        # Subscription handshake: echo the token back as plain text
+        return PlainTextResponse(validation_token, status_code=status.HTTP_200_OK)
+
+    # Public endpoint: anything can be posted here, not just Graph's payloads
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    items = payload.get("value", []) if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Expected a JSON object with a "value" list',
+        )
+
+    accepted, rejected = 0, 0
+    for item in items:
+        if not isinstance(item, dict):
+            rejected += 1
+            continue
+        if not subscriptions.verify_client_state(item.get("clientState")):
+            rejected += 1
+            continue
+        mailbox = await subscriptions.mailbox_for(item.get("subscriptionId"))
+        if mailbox is None:
+            rejected += 1
+            continue
+        if item.get("lifecycleEvent"):
+            # missed / subscriptionRemoved / reauthorizationRequired: changes may
+            # have been dropped, and the subscription may need fixing
+            event = item["lifecycleEvent"]
+            logger.warning(f"Lifecycle event {event} for {mailbox}")
+            subscriptions.handle_lifecycle(mailbox, item["subscriptionId"], event)
+            processor.request_resync(mailbox)
+            accepted += 1
+            continue
+        resource_data = item.get("resourceData")
+        if not isinstance(resource_data, dict):
+            resource_data = {}
+        message_id = resource_data.get("id")
+        if message_id:
+            processor.submit(mailbox, message_id)
+            accepted += 1
+
+    if rejected:
+        logger.warning(f"Rejected {rejected} change notifications")
+    # Graph only needs a fast 2xx; the messages are fetched by the workers
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"accepted": accepted, "rejected": rejected},
+    )
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.db.base import IThreadRepository
+from app.dependencies import get_thread_repo
+from app.schemas.thread import ThreadPage
+
+router = APIRouter()
+
+
+@router.get(
+    "",
+    response_model=ThreadPage,
+    summary="Conversation summaries, most recent activity first",
+)
+async def list_threads(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    participant: str | None = None,
+    unread_only: bool = False,
+    repo: IThreadRepository = Depends(get_thread_repo),
+) -> ThreadPage:
+    try:
+        return await repo.list_threads(
+            participant=participant,
+            unread_only=unread_only,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -2,7 +2,30 @@
 from typing import Any, Protocol, runtime_checkable
 
 
+class TokenAcquisitionError(Exception):
+    """Raised when no usable access token could be obtained."""
+
+
+class AuthenticationRequiredError(TokenAcquisitionError):
+    """Raised when only an interactive (device-code) login can produce a token."""
+
+
 @runtime_checkable
 class IAuthFlow(Protocol):
-    def acquire_token(self) -> dict[str, Any]:
+    async def acquire_token(self, force_refresh: bool = False) -> dict[str, Any]:
+        pass
+
+
+@runtime_checkable
+class ITokenCacheStore(Protocol):
+    async def load(self) -> str | None:
+        pass
+
+    async def save(self, serialized: str) -> bool:
+        pass
+
+
+@runtime_checkable
+class ITokenProvider(Protocol):
+    async def get_token(self) -> str:
         pass
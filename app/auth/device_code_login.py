@@ -0,0 +1,142 @@
+# app/auth/device_code_login.py
+import asyncio
+from datetime import UTC, datetime, timedelta
+from enum import Enum
+import logging
+import time
+from typing import Any
+
+from app.auth.base import AuthenticationRequiredError
+from app.auth.ms_device_code_flow import DeviceCodeFlow
+from app.auth.token_provider import CachedTokenProvider
+
+logger = logging.getLogger(__name__)
+
+
+class AuthState(str, Enum):
+    NOT_STARTED = "not_started"
+    PENDING_USER_CODE = "pending_user_code"
+    POLLING = "polling"
+    AUTHENTICATED = "authenticated"
+    FAILED = "failed"
+
+
+class DeviceCodeLogin:
+    """Runs the device-code login as a background state machine.
+
+    DeviceCodeFlow runs the blocking MSAL calls (requesting the user code and
+    polling AAD until the user enters it) in worker threads, so the event
+    loop keeps serving requests while a login is in progress.
+    """
+
+    def __init__(self, auth_flow: DeviceCodeFlow, token_provider: CachedTokenProvider):
+        self.auth_flow = auth_flow
+        self.token_provider = token_provider
+        self.state = AuthState.NOT_STARTED
+        self.user_code: str | None = None
+        self.verification_uri: str | None = None
+        self.message: str | None = None
+        self.expires_at: datetime | None = None
+        self.error: str | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_authenticated(self) -> bool:
+        self._follow_token()
+        return self.state == AuthState.AUTHENTICATED
+
+    def _follow_token(self) -> None:
+        """Track the provider's token, which TokenRefresher renews in the background.
+
+        An expired token ends the session; a valid one restores it after an
+        outage, unless a device-code login is in progress.
+        """
+        token = self.token_provider.token
+        if token is None:
+            return
+        valid = time.monotonic() < token.expires_at
+        if self.state == AuthState.AUTHENTICATED and not valid:
+            self.state = AuthState.FAILED
+            self.error = "Access token expired and could not be renewed silently"
+        elif valid and self.state in (AuthState.NOT_STARTED, AuthState.FAILED):
+            self.state = AuthState.AUTHENTICATED
+            self.error = None
+            logger.info("Graph session restored by a token refresh")
+
+    async def bootstrap(self) -> None:
+        """Pick up an existing session from the token cache without prompting."""
+        try:
+            await self.token_provider.get_token()
+        except AuthenticationRequiredError as e:
+            logger.warning(f"Graph login required, start a device-code login: {e}")
+            return
+        except Exception as e:
+            # Likely transient (network, AAD outage): TokenRefresher keeps
+            # retrying and the session is picked up once a token arrives
+            self.error = str(e)
+            logger.warning(
+                f"Silent Graph login failed, retrying in the background: {e}",
+            )
+            return
+        self.state = AuthState.AUTHENTICATED
+        logger.info("Graph session restored from token cache")
+
+    async def start(self) -> dict[str, Any]:
+        if self.is_authenticated or self.state in (
+            AuthState.PENDING_USER_CODE,
+            AuthState.POLLING,
+        ):
+            return self.status()
+
+        self.state = AuthState.PENDING_USER_CODE
+        self.error = None
+        try:
+            flow = await self.auth_flow.initiate_device_flow()
+        except Exception as e:
+            self._fail(e)
+            return self.status()
+
+        self.user_code = flow.get("user_code")
+        self.verification_uri = flow.get("verification_uri")
+        self.message = flow.get("message")
+        self.expires_at = datetime.now(UTC) + timedelta(
+            seconds=int(flow.get("expires_in", 0)),
+        )
+        self.state = AuthState.POLLING
+        self._task = asyncio.create_task(self._poll(flow), name="device-code-login")
+        return self.status()
+
+    async def _poll(self, flow: dict) -> None:
+        try:
+            await self.auth_flow.complete_device_flow(flow)
+            # Stage the fresh token so the first Graph request doesn't pay for it
+            await self.token_provider.refresh()
+        except Exception as e:
+            self._fail(e)
+            return
+        self.state = AuthState.AUTHENTICATED
+        self.user_code = self.verification_uri = self.message = None
+        self.expires_at = None
+        logger.info("Device-code login completed")
+
+    def _fail(self, error: Exception) -> None:
+        self.state = AuthState.FAILED
+        self.error = str(error)
+        logger.error(f"Device-code login failed: {error}")
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            # The worker thread finishes on its own when the device code expires
+            self._task.cancel()
+        self._task = None
+
+    def status(self) -> dict[str, Any]:
+        self._follow_token()
+        return {
+            "state": self.state.value,
+            "user_code": self.user_code,
+            "verification_uri": self.verification_uri,
+            "message": self.message,
+            "expires_at": self.expires_at,
+            "error": self.error,
+        }
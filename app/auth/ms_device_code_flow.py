@@ -1,11 +1,18 @@
 # app/auth/ms_device_code_flow.py
+import asyncio
+import json
 import logging
-import os
 import sys
 
 import msal
 
-from app.auth.base import IAuthFlow
+from app.auth.base import (
+    AuthenticationRequiredError,
+    IAuthFlow,
+    ITokenCacheStore,
+    TokenAcquisitionError,
+)
+from app.auth.token_cache_store import FileTokenCacheStore
 
 # Configure logging
 logging.basicConfig(
@@ -18,6 +25,25 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Conditional saves retried after merging in a concurrent writer's cache
+CACHE_SAVE_ATTEMPTS = 3
+
+
+def merge_token_caches(shared: str | None, local: str) -> str:
+    """Overlay ``local``'s MSAL cache entries on ``shared``.
+
+    Entries only ``shared`` has, written by another replica, are kept. Both
+    are ``SerializableTokenCache.serialize()`` output: one dict of entries
+    per credential type, keyed by MSAL's entry key.
+    """
+    merged = json.loads(shared) if shared else {}
+    for credential_type, entries in json.loads(local).items():
+        if isinstance(entries, dict):
+            merged.setdefault(credential_type, {}).update(entries)
+        else:
+            merged[credential_type] = entries
+    return json.dumps(merged, indent=4)
+
 
 class DeviceCodeFlow(IAuthFlow):
     def __init__(
@@ -27,14 +53,14 @@ class DeviceCodeFlow(IAuthFlow):
         scopes: list[str],
         auth_url: str,
         cache_file="token_cache.json",
+        cache_store: ITokenCacheStore | None = None,
     ):
         self.client_id = client_id
         self.authority = f"{auth_url}/{tenant}"
         self.scopes = scopes
-        self.cache_file = cache_file
+        self.cache_store = cache_store or FileTokenCacheStore(cache_file)
         self.token_cache = msal.SerializableTokenCache()
-
-        self._load_token_cache()
+        self._loaded_cache: str | None = None
 
         self.app = msal.PublicClientApplication(
             client_id=self.client_id,
@@ -42,52 +68,92 @@ class DeviceCodeFlow(IAuthFlow):
             token_cache=self.token_cache,
         )
 
-    def acquire_token(self):
-        accounts = self.app.get_accounts()
-        result = None
-        if accounts:
-            logger.info(f"acquire_token: found accounts {accounts!r}")
-            result = self.app.acquire_token_silent(self.scopes, account=accounts[0])
-            logger.info(f"acquire_token: silent result = {result!r}")
-            self._save_token_cache()
-            return result
-        # 2) If silent failed or no access_token, always do the device‐code flow
+    async def acquire_token(self, force_refresh: bool = False):
+        """Silent acquisition only; interactive login goes through DeviceCodeLogin."""
+        await self._load_token_cache()
+        try:
+            return await asyncio.to_thread(self._acquire_token_silent, force_refresh)
+        finally:
+            await self._save_token_cache()
+
+    async def initiate_device_flow(self) -> dict:
+        flow = await asyncio.to_thread(
+            self.app.initiate_device_flow,
+            scopes=self.scopes,
+        )
+        if "user_code" not in flow:
+            err = flow.get("error", "<no‑error>")
+            desc = flow.get("error_description", "<no‑description>")
+            raise TokenAcquisitionError(f"Device‑flow init failed: {err} — {desc}")
+
+        logger.info(flow["message"])
+        return flow
+
+    async def complete_device_flow(self, flow: dict) -> dict:
+        """Polls AAD in a worker thread until the user enters the code or it expires."""
+        result = await asyncio.to_thread(self.app.acquire_token_by_device_flow, flow)
+        ok = bool(result and "access_token" in result)
+        logger.info(f"acquire_token: device_flow result ok = {ok}")
+        await self._save_token_cache()
         if not result or "access_token" not in result:
-            logger.info("acquire_token: silent failed, initiating device flow")
-
-            flow = self.app.initiate_device_flow(scopes=self.scopes)
-
-            logger.info(f"acquire_token: device_flow response = {flow!r}")
-            logger.info(f"Device‑flow response: {flow!r}")
-
-            if "user_code" not in flow:
-                err = flow.get("error", "<no‑error>")
-                desc = flow.get("error_description", "<no‑description>")
-                raise Exception(f"Device‑flow init failed: {err} — {desc}")
-
-            logger.info(flow["message"])
-            result = self.app.acquire_token_by_device_flow(flow)
-            logger.info(f"acquire_token: device_flow token result = {result!r}")
-            self._save_token_cache()
-            return result
+            err = (result or {}).get("error", "<no‑error>")
+            desc = (result or {}).get("error_description", "<no‑description>")
+            raise TokenAcquisitionError(f"Device‑flow login failed: {err} — {desc}")
+        return result
 
+    def _acquire_token_silent(self, force_refresh: bool) -> dict:
+        accounts = self.app.get_accounts()
+        if not accounts:
+            raise AuthenticationRequiredError(
+                "No cached account, device-code login required",
+            )
+
+        logger.info(f"acquire_token: found accounts {accounts!r}")
+        result = self.app.acquire_token_silent(
+            self.scopes,
+            account=accounts[0],
+            force_refresh=force_refresh,
+        )
+        ok = bool(result and "access_token" in result)
+        logger.info(f"acquire_token: silent result ok = {ok}")
         if not result or "access_token" not in result:
-            logger.error(f"acquire_token: final result invalid = {result!r}")
-            raise Exception(f"Token acquisition failed: {result}")
-
-        #  if "access_token" in result:
-        #     if self._save_token_cache():
-        #         logger.info("acquire_token: success, returning token")
-        #         return result
-        # else:
-        #     raise Exception(f"Token acquisition failed: {result}")
-
-    def _load_token_cache(self):
-        if os.path.exists(self.cache_file):
-            with open(self.cache_file) as f:
-                self.token_cache.deserialize(f.read())
-
-    def _save_token_cache(self):
+            error = (result or {}).get("error", "no cached refresh token")
+            raise AuthenticationRequiredError(
+                f"Silent token acquisition failed: {error}",
+            )
+        return result
+
+    async def _load_token_cache(self):
+        serialized = await self.cache_store.load()
+        # Stores hand back the same object while nothing changed, skip re-parsing it
+        if serialized is None or serialized is self._loaded_cache:
+            return
+        self._loaded_cache = serialized
         if self.token_cache.has_state_changed:
-            with open(self.cache_file, "w") as f:
-                f.write(self.token_cache.serialize())
+            # A save lost a race earlier: keep that change on top of the shared copy
+            self.token_cache.deserialize(
+                merge_token_caches(serialized, self.token_cache.serialize()),
+            )
+            self.token_cache.has_state_changed = True
+        else:
+            self.token_cache.deserialize(serialized)
+
+    async def _save_token_cache(self):
+        if not self.token_cache.has_state_changed:
+            return
+        serialized = self.token_cache.serialize()
+        for attempt in range(CACHE_SAVE_ATTEMPTS):
+            if await self.cache_store.save(serialized):
+                if attempt:
+                    # Pick up the other writer's entries too
+                    self.token_cache.deserialize(serialized)
+                self._loaded_cache = serialized
+                return
+            # Another replica saved first (say, a refresh while this login
+            # finished): merge this change into its cache and try again
+            shared = await self.cache_store.load()
+            self._loaded_cache = shared
+            serialized = merge_token_caches(shared, serialized)
+        logger.warning("Token cache kept changing elsewhere, saving on the next call")
+        self.token_cache.deserialize(serialized)
+        self.token_cache.has_state_changed = True
@@ -0,0 +1,42 @@
+# app/auth/token_cache_store.py
+import asyncio
+import logging
+import os
+
+from app.auth.base import ITokenCacheStore
+
+logger = logging.getLogger(__name__)
+
+
+class FileTokenCacheStore(ITokenCacheStore):
+    """Single-process MSAL cache persisted to a local JSON file."""
+
+    def __init__(self, cache_file: str = "token_cache.json"):
+        self.cache_file = cache_file
+        self._serialized: str | None = None
+        self._mtime: float | None = None
+
+    def _read(self) -> str | None:
+        if not os.path.exists(self.cache_file):
+            return None
+        mtime = os.path.getmtime(self.cache_file)
+        if mtime != self._mtime:
+            with open(self.cache_file) as f:
+                self._serialized = f.read()
+            self._mtime = mtime
+        return self._serialized
+
+    def _write(self, serialized: str) -> None:
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, "w") as f:
+            f.write(serialized)
+        os.replace(tmp_file, self.cache_file)
+        self._serialized = serialized
+        self._mtime = os.path.getmtime(self.cache_file)
+
+    async def load(self) -> str | None:
+        return await asyncio.to_thread(self._read)
+
+    async def save(self, serialized: str) -> bool:
+        await asyncio.to_thread(self._write, serialized)
+        return True
@@ -0,0 +1,72 @@
+# app/auth/token_provider.py
+import asyncio
+from dataclasses import dataclass
+import logging
+import time
+
+from app.auth.base import IAuthFlow, ITokenProvider, TokenAcquisitionError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AccessToken:
+    value: str
+    expires_at: float  # time.monotonic() deadline
+    refresh_at: float  # time.monotonic() after which we renew
+
+
+class CachedTokenProvider(ITokenProvider):
+    """Keeps the current access token in memory and renews it once, near expiry."""
+
+    def __init__(self, auth_flow: IAuthFlow, refresh_skew_seconds: float = 240):
+        self.auth_flow = auth_flow
+        self.refresh_skew_seconds = refresh_skew_seconds
+        self._token: AccessToken | None = None
+        self._lock = asyncio.Lock()
+        self.refresh_count = 0
+
+    @property
+    def token(self) -> AccessToken | None:
+        return self._token
+
+    def _is_fresh(self, token: AccessToken | None) -> bool:
+        return token is not None and time.monotonic() < token.refresh_at
+
+    async def get_token(self) -> str:
+        token = self._token
+        if self._is_fresh(token):
+            return token.value
+
+        # Single-flight: only the first caller talks to MSAL, the rest wait for it
+        async with self._lock:
+            token = self._token
+            if not self._is_fresh(token):
+                token = await self._refresh()
+        return token.value
+
+    async def refresh(self) -> AccessToken:
+        """Renew the token now; callers keep getting the old one until it's staged."""
+        async with self._lock:
+            return await self._refresh(force_refresh=self._token is not None)
+
+    async def _refresh(self, force_refresh: bool = False) -> AccessToken:
+        result = await self.auth_flow.acquire_token(force_refresh=force_refresh)
+        if not result or "access_token" not in result:
+            error = (result or {}).get("error", "no token returned")
+            raise TokenAcquisitionError(f"Token acquisition failed: {error}")
+
+        now = time.monotonic()
+        expires_in = float(result.get("expires_in", 0))
+        # Never let the skew swallow more than half of a short-lived token
+        skew = min(self.refresh_skew_seconds, expires_in / 2)
+        token = AccessToken(
+            value=result["access_token"],
+            expires_at=now + expires_in,
+            refresh_at=now + expires_in - skew,
+        )
+        # Staged with a single reference swap, readers never see a partial token
+        self._token = token
+        self.refresh_count += 1
+        logger.info(f"Access token refreshed, expires in {expires_in:.0f}s")
+        return token
@@ -0,0 +1,105 @@
+# app/auth/token_refresher.py
+import asyncio
+from datetime import UTC, datetime
+import logging
+import random
+import time
+from typing import Any
+
+from app.auth.token_provider import CachedTokenProvider
+
+logger = logging.getLogger(__name__)
+
+
+class TokenRefresher:
+    """Background task that renews the access token before the request path needs to."""
+
+    def __init__(
+        self,
+        provider: CachedTokenProvider,
+        lead_seconds: float = 60,
+        min_backoff_seconds: float = 1,
+        max_backoff_seconds: float = 300,
+    ):
+        self.provider = provider
+        self.lead_seconds = lead_seconds
+        self.min_backoff_seconds = min_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._task: asyncio.Task | None = None
+
+        self.refresh_count = 0
+        self.failure_count = 0
+        self.consecutive_failures = 0
+        self.last_latency_ms: float | None = None
+        self.last_error: str | None = None
+        self.last_success_at: datetime | None = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="token-refresher")
+            logger.info("Token refresher started")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Token refresher stopped")
+
+    def _next_delay(self) -> float:
+        if self.consecutive_failures:
+            # Exponential backoff with full jitter
+            cap = min(
+                self.max_backoff_seconds,
+                self.min_backoff_seconds * 2 ** (self.consecutive_failures - 1),
+            )
+            floor = self.min_backoff_seconds
+            return random.uniform(floor, max(cap, floor))
+
+        token = self.provider.token
+        if token is None:
+            return 0
+        return max(0.0, token.refresh_at - self.lead_seconds - time.monotonic())
+
+    async def refresh_once(self) -> None:
+        started = time.perf_counter()
+        try:
+            await self.provider.refresh()
+        except Exception as e:
+            self.failure_count += 1
+            self.consecutive_failures += 1
+            self.last_error = str(e)
+            logger.warning(
+                f"Token refresh failed ({self.consecutive_failures} in a row): {e}",
+            )
+            return
+
+        self.last_latency_ms = (time.perf_counter() - started) * 1000
+        self.refresh_count += 1
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.last_success_at = datetime.now(UTC)
+        logger.info(f"Token refreshed in background in {self.last_latency_ms:.1f} ms")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._next_delay())
+            await self.refresh_once()
+
+    def stats(self) -> dict[str, Any]:
+        token = self.provider.token
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "refresh_count": self.refresh_count,
+            "failure_count": self.failure_count,
+            "consecutive_failures": self.consecutive_failures,
+            "last_latency_ms": self.last_latency_ms,
+            "last_error": self.last_error,
+            "last_success_at": self.last_success_at,
+            "token_expires_in_seconds": (
+                max(0.0, token.expires_at - time.monotonic()) if token else None
+            ),
+        }
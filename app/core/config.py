@@ -56,6 +56,35 @@ class Settings(BaseSettings):
     MS_GRAPH_AUTH_URL: str = Field(..., env="MS_GRAPH_AUTH_URL")
     RAW_SCOPES: str = Field(..., validation_alias="SCOPES")
 
+    # MSAL token cache backend: "file" (single process) or "mongo" (shared)
+    TOKEN_CACHE_BACKEND: str = Field("file", env="TOKEN_CACHE_BACKEND")
+    TOKEN_CACHE_FILE: str = Field("token_cache.json", env="TOKEN_CACHE_FILE")
+    TOKEN_CACHE_READ_TTL_SECONDS: float = Field(5, env="TOKEN_CACHE_READ_TTL_SECONDS")
+
+    # Seconds before expiry at which the cached access token is renewed
+    TOKEN_REFRESH_SKEW_SECONDS: int = Field(240, env="TOKEN_REFRESH_SKEW_SECONDS")
+    # Background refresher renews this many seconds ahead of the request path
+    TOKEN_BACKGROUND_REFRESH_LEAD_SECONDS: int = Field(
+        60, env="TOKEN_BACKGROUND_REFRESH_LEAD_SECONDS"
+    )
+    TOKEN_REFRESH_MAX_BACKOFF_SECONDS: int = Field(
+        300, env="TOKEN_REFRESH_MAX_BACKOFF_SECONDS"
+    )
+
+    # Graph HTTP transport (shared keep-alive pool)
+    GRAPH_HTTP_POOL_SIZE: int = Field(20, env="GRAPH_HTTP_POOL_SIZE")
+    GRAPH_HTTP_CONNECT_TIMEOUT: float = Field(5.0, env="GRAPH_HTTP_CONNECT_TIMEOUT")
+    GRAPH_HTTP_READ_TIMEOUT: float = Field(30.0, env="GRAPH_HTTP_READ_TIMEOUT")
+    GRAPH_HTTP2: bool = Field(False, env="GRAPH_HTTP2")
+    # Per-mailbox token bucket in front of every Graph call; fetches leave
+    # GRAPH_RATE_LIMIT_SEND_RESERVE tokens for sends
+    GRAPH_RATE_LIMIT_PER_SECOND: float = Field(10, env="GRAPH_RATE_LIMIT_PER_SECOND")
+    GRAPH_RATE_LIMIT_BURST: int = Field(20, env="GRAPH_RATE_LIMIT_BURST")
+    GRAPH_RATE_LIMIT_SEND_RESERVE: int = Field(2, env="GRAPH_RATE_LIMIT_SEND_RESERVE")
+    GRAPH_MAX_RETRIES: int = Field(3, env="GRAPH_MAX_RETRIES")
+    # Messages requested per Graph page ($top) when syncing
+    GRAPH_PAGE_SIZE: int = Field(50, env="GRAPH_PAGE_SIZE")
+
     # MongoDB Settings
     #MONGODB_URI: str = Field(..., env="MONGODB_URI")
     #MONGO_URI: str = Field(..., env="MONGO_URI")
@@ -70,9 +99,68 @@ class Settings(BaseSettings):
 
     # Email Polling
     EMAIL_RETRIEVAL_INTERVAL_MINUTES: int = Field(..., env="EMAIL_RETRIEVAL_INTERVAL_MINUTES")
+    # "filter" re-scans a receivedDateTime window, "delta" uses messages/delta
+    EMAIL_SYNC_MODE: str = Field("filter", env="EMAIL_SYNC_MODE")
+    EMAIL_SYNC_FOLDER: str = Field("inbox", env="EMAIL_SYNC_FOLDER")
+    # Mailboxes of the registry synced at the same time
+    SYNC_MAX_CONCURRENCY: int = Field(4, env="SYNC_MAX_CONCURRENCY")
+    # Replicas coordinate through MongoDB leases: "mailbox" (one lease per
+    # mailbox, replicas share the work) or "global" (one replica syncs all)
+    SYNC_LEASE_SCOPE: str = Field("mailbox", env="SYNC_LEASE_SCOPE")
+    SYNC_LEASE_TTL_SECONDS: float = Field(120, env="SYNC_LEASE_TTL_SECONDS")
+    # Adaptive polling: each mailbox's interval starts at
+    # EMAIL_RETRIEVAL_INTERVAL_MINUTES and moves between these bounds with
+    # its mail arrival rate; the scheduler checks for due mailboxes every tick
+    SYNC_ADAPTIVE_POLLING: bool = Field(True, env="SYNC_ADAPTIVE_POLLING")
+    SYNC_MIN_INTERVAL_SECONDS: float = Field(30, env="SYNC_MIN_INTERVAL_SECONDS")
+    SYNC_MAX_INTERVAL_SECONDS: float = Field(900, env="SYNC_MAX_INTERVAL_SECONDS")
+    SYNC_SCHEDULER_TICK_SECONDS: float = Field(15, env="SYNC_SCHEDULER_TICK_SECONDS")
+    # Worker processes that parse fetched pages so backfills use more than one
+    # core; 0 parses on the event loop. Pages are split in chunks of this size
+    SYNC_PARSE_WORKERS: int = Field(0, env="SYNC_PARSE_WORKERS")
+    SYNC_PARSE_CHUNK_SIZE: int = Field(25, env="SYNC_PARSE_CHUNK_SIZE")
+
+    # Outbox: /send queues mail, these workers deliver it
+    OUTBOX_WORKERS: int = Field(4, env="OUTBOX_WORKERS")
+    OUTBOX_LEASE_SECONDS: float = Field(60, env="OUTBOX_LEASE_SECONDS")
+    OUTBOX_MAX_ATTEMPTS: int = Field(5, env="OUTBOX_MAX_ATTEMPTS")
+    OUTBOX_POLL_INTERVAL_SECONDS: float = Field(2, env="OUTBOX_POLL_INTERVAL_SECONDS")
+
+    # Read-through cache of GET /emails and email detail reads; 0 disables it
+    EMAIL_CACHE_TTL_SECONDS: float = Field(60, env="EMAIL_CACHE_TTL_SECONDS")
+    EMAIL_CACHE_MAX_ENTRIES: int = Field(1000, env="EMAIL_CACHE_MAX_ENTRIES")
+
+    # (user, contact) pairs remembered as already written to the contact graph
+    CONTACT_CACHE_SIZE: int = Field(10000, env="CONTACT_CACHE_SIZE")
+
+    # Push sync: public URL of /api/v1/notifications that Graph posts change
+    # notifications to; empty keeps the service on polling only
+    GRAPH_WEBHOOK_URL: str = Field("", env="GRAPH_WEBHOOK_URL")
+    GRAPH_WEBHOOK_CLIENT_STATE: str = Field("", env="GRAPH_WEBHOOK_CLIENT_STATE")
+    GRAPH_SUBSCRIPTION_TTL_MINUTES: int = Field(
+        4200, env="GRAPH_SUBSCRIPTION_TTL_MINUTES",
+    )
+    GRAPH_SUBSCRIPTION_RENEW_INTERVAL_MINUTES: int = Field(
+        60, env="GRAPH_SUBSCRIPTION_RENEW_INTERVAL_MINUTES"
+    )
+    NOTIFICATION_WORKERS: int = Field(2, env="NOTIFICATION_WORKERS")
+    NOTIFICATION_QUEUE_SIZE: int = Field(10000, env="NOTIFICATION_QUEUE_SIZE")
+    # With push enabled, polling only reconciles what notifications missed
+    EMAIL_PUSH_RECONCILE_INTERVAL_MINUTES: int = Field(
+        30, env="EMAIL_PUSH_RECONCILE_INTERVAL_MINUTES"
+    )
 
     ## OTHER VARIBALES NOT NECESSARILY ENV VARS
-    COLLECTIONS: List[str] = ["users" , "emails"]
+    COLLECTIONS: List[str] = [
+        "users",
+        "emails",
+        "token_cache",
+        "sync_state",
+        "outbox",
+        "mailboxes",
+        "leases",
+        "threads",
+    ]
 
     class Config:
         # env_file = str(Path(__file__).parent.parent.parent / ".env.docker.new")
@@ -85,6 +173,15 @@ class Settings(BaseSettings):
     def SCOPES(self) -> List[str]:
         return [scope.strip() for scope in self.RAW_SCOPES.split(",")]
 
+    @property
+    def PUSH_ENABLED(self) -> bool:
+        return bool(self.GRAPH_WEBHOOK_URL and self.GRAPH_WEBHOOK_CLIENT_STATE)
+
+    @property
+    def ADAPTIVE_POLLING_ENABLED(self) -> bool:
+        # With push on, polling is only a fixed-rate reconcile pass
+        return self.SYNC_ADAPTIVE_POLLING and not self.PUSH_ENABLED
+
     @property
     def MONGODB_URI(self) -> str:
         return f"mongodb://{self.MONGO_AUTH_USERNAME}:{self.MONGO_AUTH_PASSWORD}@{self.MONGO_SERVER_ADDRESS}:{self.MONGO_SERVER_PORT}"
@@ -1,7 +1,17 @@
 # app/db/base.py
+from datetime import datetime
 from typing import Protocol, runtime_checkable
 
-from app.schemas.email import EmailInDB
+from app.schemas.email import EmailCreate, EmailInDB, EmailPage, EmailQuery
+from app.schemas.lease import Lease
+from app.schemas.mailbox import Mailbox
+from app.schemas.outbox import OutboxMessage
+from app.schemas.sync import BulkUpsertResult, SyncCheckpoint, SyncRunStats
+from app.schemas.thread import ThreadPage
+
+
+class LeaseLostError(Exception):
+    """A lease expired or was taken over while its holder was still working."""
 
 
 @runtime_checkable
@@ -9,9 +19,189 @@ class IEmailRepository(Protocol):
     async def upsert_email(self, email: EmailInDB) -> None:
         pass
 
+    async def upsert_emails(self, emails: list[EmailInDB | dict]) -> BulkUpsertResult:
+        pass
+
+    async def delete_emails(self, ids: list[str]) -> int:
+        pass
+
+    async def get_email(self, email_id: str) -> EmailInDB | None:
+        pass
+
     async def list_recent_emails(
         self,
         filter_query: dict = None,
         limit: int = 10,
     ) -> list[EmailInDB]:
         pass
+
+    async def query_emails(
+        self,
+        query: EmailQuery,
+        limit: int = 50,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> EmailPage:
+        pass
+
+    async def search_emails(
+        self,
+        text: str,
+        limit: int = 20,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> EmailPage:
+        pass
+
+    async def add_contacts(self, contacts: dict[str, set[str]]) -> None:
+        pass
+
+
+@runtime_checkable
+class ISyncStateRepository(Protocol):
+    async def get_checkpoint(self, mailbox: str) -> SyncCheckpoint | None:
+        pass
+
+    async def commit_checkpoint(
+        self,
+        mailbox: str,
+        high_water_mark: datetime,
+        high_water_ids: list[str],
+        fence: Lease | None = None,
+    ) -> None:
+        pass
+
+    async def record_run(
+        self,
+        mailbox: str,
+        stats: SyncRunStats,
+        fence: Lease | None = None,
+    ) -> None:
+        pass
+
+    async def get_delta_link(self, mailbox: str, folder: str) -> str | None:
+        pass
+
+    async def save_delta_link(
+        self,
+        mailbox: str,
+        folder: str,
+        delta_link: str,
+        fence: Lease | None = None,
+    ) -> None:
+        pass
+
+
+@runtime_checkable
+class IOutboxRepository(Protocol):
+    async def enqueue(
+        self,
+        mailbox: str,
+        email: EmailCreate,
+        max_attempts: int = 5,
+    ) -> OutboxMessage:
+        pass
+
+    async def get(self, message_id: str) -> OutboxMessage | None:
+        pass
+
+    async def claim(self, owner: str, lease_seconds: float) -> OutboxMessage | None:
+        pass
+
+    async def renew_lease(
+        self,
+        message_id: str,
+        owner: str,
+        lease_seconds: float,
+    ) -> bool:
+        pass
+
+    async def mark_sent(self, message_id: str, owner: str) -> bool:
+        pass
+
+    async def mark_retry(
+        self,
+        message_id: str,
+        owner: str,
+        error: str,
+        retry_at: datetime,
+        attempted: bool = True,
+    ) -> bool:
+        pass
+
+    async def mark_failed(self, message_id: str, owner: str, error: str) -> bool:
+        pass
+
+
+@runtime_checkable
+class IMailboxRepository(Protocol):
+    async def list_mailboxes(self, enabled_only: bool = True) -> list[Mailbox]:
+        pass
+
+    async def get_mailbox(self, address: str) -> Mailbox | None:
+        pass
+
+    async def register_mailbox(self, address: str, enabled: bool = True) -> Mailbox:
+        pass
+
+    async def record_sync(
+        self,
+        address: str,
+        started_at: datetime,
+        stats: SyncRunStats | None = None,
+        error: str | None = None,
+    ) -> None:
+        pass
+
+    async def save_subscription(
+        self,
+        address: str,
+        subscription_id: str | None,
+        expires_at: datetime | None,
+    ) -> None:
+        pass
+
+    async def find_by_subscription(self, subscription_id: str) -> Mailbox | None:
+        pass
+
+
+@runtime_checkable
+class IThreadRepository(Protocol):
+    async def snapshot(self, email_ids: list[str]) -> dict[str, dict]:
+        pass
+
+    async def apply(
+        self,
+        emails: list[dict],
+        inserted_ids: set[str],
+        previous: dict[str, dict],
+        removed_ids: list[str] | None = None,
+    ) -> None:
+        pass
+
+    async def list_threads(
+        self,
+        participant: str | None = None,
+        unread_only: bool = False,
+        limit: int = 50,
+        cursor: str | None = None,
+    ) -> ThreadPage:
+        pass
+
+    async def is_empty(self) -> bool:
+        pass
+
+    async def rebuild(self) -> int:
+        pass
+
+
+@runtime_checkable
+class ILeaseRepository(Protocol):
+    async def acquire(self, name: str, owner: str, ttl_seconds: float) -> Lease | None:
+        pass
+
+    async def renew(self, lease: Lease, ttl_seconds: float) -> Lease | None:
+        pass
+
+    async def release(self, lease: Lease) -> None:
+        pass
@@ -0,0 +1,106 @@
+# app/db/cached_email_repository.py
+import logging
+
+from app.db.base import IEmailRepository
+from app.db.read_cache import ReadThroughCache
+from app.schemas.email import EmailCreate, EmailInDB, EmailPage, EmailQuery
+from app.schemas.sync import BulkUpsertResult
+
+logger = logging.getLogger(__name__)
+
+
+class CachedEmailRepository(IEmailRepository):
+    """Read-through cache in front of another IEmailRepository.
+
+    List and detail reads are cached by their normalized arguments; every
+    email write made through this repository invalidates the whole cache.
+    Writes made by other replicas are only picked up once entries expire,
+    so ``ttl_seconds`` bounds how stale a read can be. Cached results are
+    shared between callers and must not be mutated.
+    """
+
+    def __init__(self, inner: IEmailRepository, cache: ReadThroughCache):
+        self.inner = inner
+        self.cache = cache
+
+    async def get_email(self, email_id: str) -> EmailInDB | None:
+        return await self.cache.get_or_load(
+            ("get", email_id),
+            lambda: self.inner.get_email(email_id),
+        )
+
+    async def list_recent_emails(self, limit: int = 10) -> list[EmailInDB]:
+        return await self.cache.get_or_load(
+            ("recent", limit),
+            lambda: self.inner.list_recent_emails(limit=limit),
+        )
+
+    async def query_emails(
+        self,
+        query: EmailQuery,
+        limit: int = 50,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> EmailPage:
+        key = (
+            "query",
+            tuple(sorted(query.to_filter().items())),
+            limit,
+            cursor,
+            tuple(sorted(set(fields))) if fields else None,
+        )
+        return await self.cache.get_or_load(
+            key,
+            lambda: self.inner.query_emails(
+                query, limit=limit, cursor=cursor, fields=fields,
+            ),
+        )
+
+    async def search_emails(
+        self,
+        text: str,
+        limit: int = 20,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> EmailPage:
+        projection = tuple(sorted(set(fields))) if fields else None
+        key = ("search", text, limit, cursor, projection)
+        return await self.cache.get_or_load(
+            key,
+            lambda: self.inner.search_emails(
+                text, limit=limit, cursor=cursor, fields=fields,
+            ),
+        )
+
+    async def upsert_email(self, email: EmailInDB) -> None:
+        try:
+            await self.inner.upsert_email(email)
+        finally:
+            self.cache.invalidate()
+
+    async def upsert_emails(self, emails: list[EmailInDB | dict]) -> BulkUpsertResult:
+        if not emails:
+            return await self.inner.upsert_emails(emails)
+        try:
+            return await self.inner.upsert_emails(emails)
+        finally:
+            # Also on failure: an unordered bulk write may have applied part of the page
+            self.cache.invalidate()
+
+    async def delete_emails(self, ids: list[str]) -> int:
+        if not ids:
+            return 0
+        try:
+            return await self.inner.delete_emails(ids)
+        finally:
+            self.cache.invalidate()
+
+    async def save_sent_email(self, email: EmailCreate) -> None:
+        try:
+            await self.inner.save_sent_email(email)
+        finally:
+            self.cache.invalidate()
+
+    async def add_contacts(self, contacts: dict[str, set[str]]) -> None:
+        # The users collection isn't cached
+        await self.inner.add_contacts(contacts)
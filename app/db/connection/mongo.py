@@ -1,9 +1,10 @@
 import logging
 
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import PyMongoError
+from pymongo.errors import CollectionInvalid, PyMongoError
 
 from app.db.connection.base import IConnectionManager
+from app.db.indexes import IndexReport, IndexSpec, reconcile_indexes
 
 logger = logging.getLogger(__name__)
 
@@ -32,16 +33,25 @@ class MongoConnectionManager(IConnectionManager):
             self.client.close()
             logger.info("MongoDB connection closed")
 
-    async def ensure_database(self , collections: list[str]):
-    
+    async def ensure_database(
+        self,
+        collections: list[str],
+        indexes: list[IndexSpec] | None = None,
+    ) -> IndexReport:
         try:
             db = await self.connect()
             names = await db.list_collection_names()
 
             for name in collections:
                 if name not in names:
-                    await db.create_collection(name)
+                    try:
+                        await db.create_collection(name)
+                    except CollectionInvalid:
+                        # Created meanwhile, e.g. by a first insert
+                        continue
                     logger.info(f"Created {name} collection")
+
+            return await reconcile_indexes(db, indexes or [])
         except PyMongoError as e:
             logger.error(f"ensure_database failed: {e}")
             raise
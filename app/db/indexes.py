@@ -0,0 +1,132 @@
+# app/db/indexes.py
+from dataclasses import dataclass, field
+import logging
+from typing import Any
+
+from pymongo import IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Index options that change behaviour; anything else (v, ns, background) is ignored
+_COMPARED_OPTIONS = (
+    "unique",
+    "sparse",
+    "expireAfterSeconds",
+    "partialFilterExpression",
+    "weights",
+    "default_language",
+)
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    keys: tuple[tuple[str, Any], ...]
+    name: str
+    options: dict[str, Any] = field(default_factory=dict, hash=False)
+
+    def to_index_model(self) -> IndexModel:
+        return IndexModel(list(self.keys), name=self.name, **self.options)
+
+    def drift(self, info: dict[str, Any]) -> list[str]:
+        """Differences between this spec and MongoDB's index_information() entry."""
+        differences = []
+        if not self._is_text_index() and list(info.get("key", [])) != list(self.keys):
+            differences.append(f"key {info.get('key')} != {list(self.keys)}")
+        for option in _COMPARED_OPTIONS:
+            expected = self._expected_option(option)
+            if info.get(option) != expected:
+                differences.append(f"{option} {info.get(option)!r} != {expected!r}")
+        return differences
+
+    def _is_text_index(self) -> bool:
+        return any(direction == "text" for _, direction in self.keys)
+
+    def _expected_option(self, option: str) -> Any:
+        if option == "weights" and self._is_text_index():
+            # MongoDB reports the weight of every text field, defaulting to 1
+            weights = {name: 1 for name, direction in self.keys if direction == "text"}
+            weights.update(self.options.get("weights", {}))
+            return weights
+        if option == "default_language" and self._is_text_index():
+            return self.options.get("default_language", "english")
+        return self.options.get(option)
+
+
+@dataclass
+class IndexReport:
+    created: list[str] = field(default_factory=list)
+    drifted: dict[str, list[str]] = field(default_factory=dict)
+    unchanged: list[str] = field(default_factory=list)
+
+
+async def reconcile_indexes(db: Any, specs: list[IndexSpec]) -> IndexReport:
+    """Create missing indexes and flag existing ones that no longer match their spec.
+
+    Drifted indexes are reported, never dropped: rebuilding a large index is
+    an operational decision, not something to do implicitly at startup.
+    """
+    report = IndexReport()
+    by_collection: dict[str, list[IndexSpec]] = {}
+    for spec in specs:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    for collection, collection_specs in by_collection.items():
+        existing = await db[collection].index_information()
+        missing = []
+        for spec in collection_specs:
+            qualified = f"{collection}.{spec.name}"
+            info = existing.get(spec.name)
+            if info is None:
+                missing.append(spec)
+                continue
+            differences = spec.drift(info)
+            if differences:
+                report.drifted[qualified] = differences
+                logger.warning(
+                    f"Index {qualified} drifted from its spec: {differences}",
+                )
+            else:
+                report.unchanged.append(qualified)
+
+        if missing:
+            await db[collection].create_indexes(
+                [spec.to_index_model() for spec in missing],
+            )
+            report.created.extend(f"{collection}.{spec.name}" for spec in missing)
+            logger.info(f"Created indexes on {collection}: {[s.name for s in missing]}")
+    return report
+
+
+async def explain_index(
+    db: Any,
+    collection: str,
+    filter: dict[str, Any],
+    sort: list[tuple[str, int]] | None = None,
+    limit: int = 0,
+) -> str | None:
+    """Run explain() for a find and return the index the planner chose."""
+    cursor = db[collection].find(filter)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    return winning_index(await cursor.explain())
+
+
+def winning_index(explain: dict[str, Any]) -> str | None:
+    """Name of the index used by the winning plan of an explain() result, if any."""
+    stack = [explain.get("queryPlanner", {}).get("winningPlan", {})]
+    while stack:
+        stage = stack.pop()
+        scans_index = stage.get("stage") in ("IXSCAN", "TEXT_MATCH", "TEXT")
+        if scans_index and stage.get("indexName"):
+            return stage["indexName"]
+        # Newer servers wrap the classic plan in queryPlan
+        stack.extend(
+            child
+            for key in ("queryPlan", "inputStage")
+            if isinstance(child := stage.get(key), dict)
+        )
+        stack.extend(stage.get("inputStages", []))
+    return None
@@ -1,14 +1,72 @@
 import datetime
 import logging
 
+from pymongo import ASCENDING, DESCENDING, TEXT, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
 from app.db.base import IEmailRepository
 from app.db.connection.base import IConnectionManager
-from app.schemas.email import EmailInDB
+from app.db.indexes import IndexSpec
+from app.db.pagination import (
+    encode_cursor,
+    encode_search_cursor,
+    keyset_filter,
+    search_keyset_filter,
+)
+from app.mail.html_text import body_text
+from app.schemas.email import EmailInDB, EmailPage, EmailQuery
+from app.schemas.sync import BulkUpsertResult
 
 logger = logging.getLogger(__name__)
 
 from app.schemas.email import EmailCreate
 
+EMAIL_INDEXES = [
+    IndexSpec("emails", (("conversationId", ASCENDING),), "conversationId_1"),
+    IndexSpec("emails", (("internetMessageId", ASCENDING),), "internetMessageId_1"),
+    IndexSpec(
+        "emails",
+        (("sender.emailAddress.address", ASCENDING), ("receivedDateTime", DESCENDING)),
+        "sender.emailAddress.address_1_receivedDateTime_-1",
+    ),
+    # Keyset pagination of GET /emails: (receivedDateTime, _id) desc
+    IndexSpec(
+        "emails",
+        (("receivedDateTime", DESCENDING), ("_id", DESCENDING)),
+        "receivedDateTime_-1__id_-1",
+    ),
+    IndexSpec(
+        "emails",
+        (
+            ("parentFolderId", ASCENDING),
+            ("receivedDateTime", DESCENDING),
+            ("_id", DESCENDING),
+        ),
+        "parentFolderId_1_receivedDateTime_-1__id_-1",
+    ),
+    # GET /emails/search; a collection can only have one text index
+    IndexSpec(
+        "emails",
+        (("subject", TEXT), ("bodyPreview", TEXT), ("bodyText", TEXT)),
+        "emails_text",
+        {"weights": {"subject": 10, "bodyPreview": 3, "bodyText": 1}},
+    ),
+]
+
+USER_INDEXES = [
+    IndexSpec("users", (("contacts", ASCENDING),), "contacts_1"),
+]
+
+
+def _document(email: EmailInDB | dict) -> dict:
+    # Parsed pages arrive as ready documents; only models still need dumping.
+    # Documents are copied so filling in bodyText doesn't touch the caller's
+    doc = dict(email) if isinstance(email, dict) else email.model_dump(by_alias=True)
+    if doc.get("bodyText") is None:
+        body = doc.get("body") or {}
+        doc["bodyText"] = body_text(body.get("contentType"), body.get("content"))
+    return doc
+
 
 class MongoEmailRepository(IEmailRepository):
     def __init__(self, manager: IConnectionManager):
@@ -16,24 +74,146 @@ class MongoEmailRepository(IEmailRepository):
 
     async def upsert_email(self, email: EmailInDB) -> None:
         db = await self.manager.connect()
-        # assert "_id" in email.model_dump(by_alias=True)
-        # print(email.model_dump(by_alias=True))
-        print("ID used in upsert:", email.id)
-
         await db.emails.update_one(
             {"_id": email.id},
-            {"$set": email.model_dump(by_alias=True)},
+            {"$set": _document(email)},
             upsert=True,
         )
-        did = await db.emails.distinct("_id")
-        alist = await db.emails.find({"_id": email.id}).to_list(None)
-        print(len(did), len(alist))
+
+    async def upsert_emails(self, emails: list[EmailInDB | dict]) -> BulkUpsertResult:
+        """Upsert a whole page in one unordered bulk_write round-trip.
+
+        Accepts models or documents as produced by ``parse_messages``.
+        """
+        if not emails:
+            return BulkUpsertResult()
+
+        db = await self.manager.connect()
+        ids = []
+        operations = []
+        for email in emails:
+            doc = _document(email)
+            ids.append(doc["_id"])
+            operations.append(
+                UpdateOne({"_id": doc["_id"]}, {"$set": doc}, upsert=True)
+            )
+        try:
+            result = await db.emails.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            # Unordered: every other operation was still applied
+            details = e.details
+
+        if details.get("writeConcernErrors"):
+            raise PyMongoError(
+                f"Bulk upsert not durable: {details['writeConcernErrors']}",
+            )
+
+        write_errors = details.get("writeErrors", [])
+        summary = BulkUpsertResult(
+            inserted=details.get("nUpserted", 0),
+            modified=details.get("nModified", 0),
+            matched=details.get("nMatched", 0),
+            failed=len(write_errors),
+            upserted_ids=[str(u["_id"]) for u in details.get("upserted", [])],
+            failed_ids=[str(ids[err["index"]]) for err in write_errors],
+            errors=[err.get("errmsg", "") for err in write_errors],
+        )
+        logger.info(
+            f"Bulk upsert of {len(emails)} emails: {summary.inserted} inserted, "
+            f"{summary.modified} modified, {summary.failed} failed",
+        )
+        return summary
+
+    async def delete_emails(self, ids: list[str]) -> int:
+        if not ids:
+            return 0
+        db = await self.manager.connect()
+        result = await db.emails.delete_many({"_id": {"$in": ids}})
+        logger.info(f"Deleted {result.deleted_count} emails removed upstream")
+        return result.deleted_count
+
+    async def get_email(self, email_id: str) -> EmailInDB | None:
+        db = await self.manager.connect()
+        doc = await db.emails.find_one({"_id": email_id})
+        return EmailInDB(**doc) if doc else None
 
     async def list_recent_emails(self, limit: int = 10):
         db = await self.manager.connect()
         cursor = db.emails.find().sort("receivedDateTime", -1).limit(limit)
         return [EmailInDB(**doc) async for doc in cursor]
 
+    async def query_emails(
+        self,
+        query: EmailQuery,
+        limit: int = 50,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> EmailPage:
+        """One page of emails, newest first, continuing after ``cursor``.
+
+        ``fields`` projects the documents; without it everything but the body
+        is returned. Raises ValueError for a malformed cursor.
+        """
+        filter_query = query.to_filter()
+        if cursor:
+            filter_query.update(keyset_filter(cursor))
+        if fields:
+            # The sort keys are always needed to build the next cursor
+            projection = dict.fromkeys({*fields, "receivedDateTime"}, 1)
+        else:
+            projection = {"body": 0, "bodyText": 0}
+
+        db = await self.manager.connect()
+        docs = [
+            doc
+            async for doc in db.emails.find(filter_query, projection)
+            .sort([("receivedDateTime", DESCENDING), ("_id", DESCENDING)])
+            .limit(limit + 1)
+        ]
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1]["receivedDateTime"], docs[-1]["_id"])
+        return EmailPage(items=docs, next_cursor=next_cursor)
+
+    async def search_emails(
+        self,
+        text: str,
+        limit: int = 20,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> EmailPage:
+        """Text-index search, best matches first; each item carries its ``score``.
+
+        Pages continue after the (score, _id) of ``cursor``. Raises ValueError
+        for a malformed cursor.
+        """
+        if fields:
+            projection = dict.fromkeys(fields, 1)
+        else:
+            projection = {"body": 0, "bodyText": 0}
+        pipeline = [
+            {"$match": {"$text": {"$search": text}}},
+            {"$addFields": {"score": {"$meta": "textScore"}}},
+        ]
+        if cursor:
+            pipeline.append({"$match": search_keyset_filter(cursor)})
+        pipeline += [
+            {"$sort": {"score": -1, "_id": 1}},
+            {"$limit": limit + 1},
+            # "score" stays: a projection with inclusions keeps only what it names
+            {"$project": {**projection, "score": 1} if fields else projection},
+        ]
+
+        db = await self.manager.connect()
+        docs = [doc async for doc in db.emails.aggregate(pipeline)]
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_search_cursor(docs[-1]["score"], docs[-1]["_id"])
+        return EmailPage(items=docs, next_cursor=next_cursor)
+
     async def save_sent_email(self, email: EmailCreate) -> None:
         db = await self.manager.connect()
         await db.emails.insert_one(
@@ -47,36 +227,40 @@ class MongoEmailRepository(IEmailRepository):
             },
         )
 
-    async def get_create_update_user(
-        self,
-        email_address:str ,
-        new_contacts:list[str] 
-        ):
+    async def add_contacts(self, contacts: dict[str, set[str]]) -> None:
+        """Add contacts to many users in one unordered bulk_write.
+
+        Users that don't exist yet are created.
+        """
+        if not contacts:
+            return
         db = await self.manager.connect()
-       
-        result = await db.users.update_one(
-            {"_id": email_address},            # match criteria
-            {
-            # only on insert, initialize the document
-            "$setOnInsert": {
-                "email":   email_address,
-                "name":    "",
-                "phone":   "",
-                "country": "",
-                "contacts": []                    # start with empty if new
-            },
-            # add each contact, but only if it isn’t already in the array
-            "$addToSet": { 
-                "contacts": { "$each": new_contacts }
-            }
-            },
-            upsert=True
+        operations = [
+            UpdateOne(
+                {"_id": email_address},
+                {
+                    # Only on insert; "contacts" itself is created by $addToSet
+                    "$setOnInsert": {
+                        "email": email_address,
+                        "name": "",
+                        "phone": "",
+                        "country": "",
+                    },
+                    "$addToSet": {"contacts": {"$each": sorted(new_contacts)}},
+                },
+                upsert=True,
+            )
+            for email_address, new_contacts in contacts.items()
+        ]
+        result = await db.users.bulk_write(operations, ordered=False)
+        logger.debug(
+            f"Contact graph: {result.upserted_count} users created, "
+            f"{result.modified_count} updated",
         )
-        if result.upserted_id:
-            logger.info(f"Created user record for {email_address}")
-        else:
-            logger.debug(f"User {email_address} already exists")
-        
-        if len(new_contacts):
-            logger.info(f"added user contacts for {new_contacts}")
-  
\ No newline at end of file
+
+    async def get_create_update_user(
+        self,
+        email_address: str,
+        new_contacts: list[str],
+    ) -> None:
+        await self.add_contacts({email_address: set(new_contacts)})
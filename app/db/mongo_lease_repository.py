@@ -0,0 +1,65 @@
+from datetime import UTC, datetime, timedelta
+import logging
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.db.base import ILeaseRepository
+from app.db.connection.base import IConnectionManager
+from app.schemas.lease import Lease
+
+logger = logging.getLogger(__name__)
+
+
+class MongoLeaseRepository(ILeaseRepository):
+    """Named leases with a TTL in ``leases``, shared by every replica.
+
+    Documents are never deleted, only expired, so the fencing token keeps
+    growing across holders.
+    """
+
+    def __init__(self, manager: IConnectionManager):
+        self.manager = manager
+
+    async def acquire(self, name: str, owner: str, ttl_seconds: float) -> Lease | None:
+        now = datetime.now(UTC)
+        db = await self.manager.connect()
+        try:
+            doc = await db.leases.find_one_and_update(
+                {"_id": name, "$or": [{"expires_at": {"$lte": now}}, {"owner": owner}]},
+                {
+                    "$set": {
+                        "owner": owner,
+                        "expires_at": now + timedelta(seconds=ttl_seconds),
+                        "acquired_at": now,
+                    },
+                    "$inc": {"token": 1},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # The lease exists and another owner still holds it
+            return None
+        logger.info(f"Acquired lease {name} (token {doc['token']})")
+        return Lease(**doc)
+
+    async def renew(self, lease: Lease, ttl_seconds: float) -> Lease | None:
+        expires_at = datetime.now(UTC) + timedelta(seconds=ttl_seconds)
+        db = await self.manager.connect()
+        result = await db.leases.update_one(
+            {"_id": lease.name, "owner": lease.owner, "token": lease.token},
+            {"$set": {"expires_at": expires_at}},
+        )
+        if not result.matched_count:
+            logger.warning(f"Lease {lease.name} (token {lease.token}) was lost")
+            return None
+        return lease.model_copy(update={"expires_at": expires_at})
+
+    async def release(self, lease: Lease) -> None:
+        db = await self.manager.connect()
+        await db.leases.update_one(
+            {"_id": lease.name, "owner": lease.owner, "token": lease.token},
+            {"$set": {"expires_at": datetime.now(UTC)}},
+        )
+        logger.info(f"Released lease {lease.name}")
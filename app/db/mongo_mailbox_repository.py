@@ -0,0 +1,91 @@
+from datetime import UTC, datetime
+import logging
+
+from pymongo import ASCENDING, ReturnDocument
+
+from app.db.base import IMailboxRepository
+from app.db.connection.base import IConnectionManager
+from app.db.indexes import IndexSpec
+from app.schemas.mailbox import Mailbox
+from app.schemas.sync import SyncRunStats
+
+logger = logging.getLogger(__name__)
+
+MAILBOX_INDEXES = [
+    # Webhook notifications only carry the subscription id
+    IndexSpec(
+        "mailboxes",
+        (("subscription_id", ASCENDING),),
+        "subscription_id_1",
+        {"sparse": True},
+    ),
+]
+
+
+class MongoMailboxRepository(IMailboxRepository):
+    """Registry of the mailboxes to sync, one document per address in ``mailboxes``."""
+
+    def __init__(self, manager: IConnectionManager):
+        self.manager = manager
+
+    async def list_mailboxes(self, enabled_only: bool = True) -> list[Mailbox]:
+        db = await self.manager.connect()
+        query = {"enabled": True} if enabled_only else {}
+        cursor = db.mailboxes.find(query).sort("_id", 1)
+        return [Mailbox(**doc) async for doc in cursor]
+
+    async def get_mailbox(self, address: str) -> Mailbox | None:
+        db = await self.manager.connect()
+        doc = await db.mailboxes.find_one({"_id": address})
+        return Mailbox(**doc) if doc else None
+
+    async def register_mailbox(self, address: str, enabled: bool = True) -> Mailbox:
+        db = await self.manager.connect()
+        doc = await db.mailboxes.find_one_and_update(
+            {"_id": address},
+            {
+                "$set": {"enabled": enabled},
+                "$setOnInsert": {"created_at": datetime.now(UTC)},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        logger.info(f"Registered mailbox {address} (enabled={enabled})")
+        return Mailbox(**doc)
+
+    async def record_sync(
+        self,
+        address: str,
+        started_at: datetime,
+        stats: SyncRunStats | None = None,
+        error: str | None = None,
+    ) -> None:
+        update = {"last_sync_started_at": started_at, "last_error": error}
+        if error is None:
+            update["last_success_at"] = datetime.now(UTC)
+        if stats is not None:
+            update["last_stats"] = stats.model_dump()
+        db = await self.manager.connect()
+        await db.mailboxes.update_one({"_id": address}, {"$set": update})
+
+    async def save_subscription(
+        self,
+        address: str,
+        subscription_id: str | None,
+        expires_at: datetime | None,
+    ) -> None:
+        db = await self.manager.connect()
+        await db.mailboxes.update_one(
+            {"_id": address},
+            {
+                "$set": {
+                    "subscription_id": subscription_id,
+                    "subscription_expires_at": expires_at,
+                },
+            },
+        )
+
+    async def find_by_subscription(self, subscription_id: str) -> Mailbox | None:
+        db = await self.manager.connect()
+        doc = await db.mailboxes.find_one({"subscription_id": subscription_id})
+        return Mailbox(**doc) if doc else None
@@ -0,0 +1,187 @@
+from datetime import UTC, datetime, timedelta
+import logging
+import uuid
+
+from pymongo import ASCENDING, ReturnDocument
+
+from app.db.base import IOutboxRepository
+from app.db.connection.base import IConnectionManager
+from app.db.indexes import IndexSpec
+from app.schemas.email import EmailCreate
+from app.schemas.outbox import OutboxMessage, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_INDEXES = [
+    IndexSpec(
+        "outbox",
+        (("status", ASCENDING), ("next_attempt_at", ASCENDING)),
+        "status_1_next_attempt_at_1",
+    ),
+    IndexSpec(
+        "outbox",
+        (("status", ASCENDING), ("lease_expires_at", ASCENDING)),
+        "status_1_lease_expires_at_1",
+    ),
+]
+
+
+class MongoOutboxRepository(IOutboxRepository):
+    """Durable queue of outgoing mail in ``outbox``, drained by leased workers."""
+
+    def __init__(self, manager: IConnectionManager):
+        self.manager = manager
+
+    async def enqueue(
+        self,
+        mailbox: str,
+        email: EmailCreate,
+        max_attempts: int = 5,
+    ) -> OutboxMessage:
+        now = datetime.now(UTC)
+        message = OutboxMessage(
+            _id=uuid.uuid4().hex,
+            mailbox=mailbox,
+            email=email,
+            max_attempts=max_attempts,
+            next_attempt_at=now,
+            created_at=now,
+            updated_at=now,
+        )
+        db = await self.manager.connect()
+        doc = message.model_dump(by_alias=True)
+        doc["status"] = message.status.value
+        await db.outbox.insert_one(doc)
+        logger.info(f"Queued email {message.id} for {mailbox}")
+        return message
+
+    async def get(self, message_id: str) -> OutboxMessage | None:
+        db = await self.manager.connect()
+        doc = await db.outbox.find_one({"_id": message_id})
+        return OutboxMessage(**doc) if doc else None
+
+    async def claim(self, owner: str, lease_seconds: float) -> OutboxMessage | None:
+        """Lease the oldest due message, or one whose previous worker died."""
+        now = datetime.now(UTC)
+        db = await self.manager.connect()
+        doc = await db.outbox.find_one_and_update(
+            {
+                "$or": [
+                    {
+                        "status": OutboxStatus.QUEUED.value,
+                        "next_attempt_at": {"$lte": now},
+                    },
+                    {
+                        "status": OutboxStatus.SENDING.value,
+                        "lease_expires_at": {"$lte": now},
+                    },
+                ],
+            },
+            {
+                "$set": {
+                    "status": OutboxStatus.SENDING.value,
+                    "lease_owner": owner,
+                    "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                    "updated_at": now,
+                },
+            },
+            sort=[("next_attempt_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        return OutboxMessage(**doc) if doc else None
+
+    async def renew_lease(
+        self,
+        message_id: str,
+        owner: str,
+        lease_seconds: float,
+    ) -> bool:
+        """Extend ``owner``'s lease; False when another worker took the message over."""
+        now = datetime.now(UTC)
+        db = await self.manager.connect()
+        result = await db.outbox.update_one(
+            self._leased_by(message_id, owner),
+            {
+                "$set": {
+                    "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                    "updated_at": now,
+                },
+            },
+        )
+        return bool(result.matched_count)
+
+    @staticmethod
+    def _leased_by(message_id: str, owner: str) -> dict:
+        return {
+            "_id": message_id,
+            "lease_owner": owner,
+            "status": OutboxStatus.SENDING.value,
+        }
+
+    async def _finish(self, message_id: str, owner: str, update: dict) -> bool:
+        db = await self.manager.connect()
+        # Matching the lease owner keeps a worker whose lease expired from
+        # overwriting the outcome of the worker that took over
+        result = await db.outbox.update_one(
+            self._leased_by(message_id, owner),
+            update,
+        )
+        if not result.matched_count:
+            logger.warning(f"Lost lease on outbox message {message_id}")
+        return bool(result.matched_count)
+
+    async def mark_sent(self, message_id: str, owner: str) -> bool:
+        now = datetime.now(UTC)
+        return await self._finish(
+            message_id,
+            owner,
+            {
+                "$set": {
+                    "status": OutboxStatus.SENT.value,
+                    "sent_at": now,
+                    "updated_at": now,
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "last_error": None,
+                },
+                "$inc": {"attempts": 1},
+            },
+        )
+
+    async def mark_retry(
+        self,
+        message_id: str,
+        owner: str,
+        error: str,
+        retry_at: datetime,
+        attempted: bool = True,
+    ) -> bool:
+        update = {
+            "$set": {
+                "status": OutboxStatus.QUEUED.value,
+                "next_attempt_at": retry_at,
+                "updated_at": datetime.now(UTC),
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "last_error": error,
+            },
+        }
+        if attempted:
+            update["$inc"] = {"attempts": 1}
+        return await self._finish(message_id, owner, update)
+
+    async def mark_failed(self, message_id: str, owner: str, error: str) -> bool:
+        return await self._finish(
+            message_id,
+            owner,
+            {
+                "$set": {
+                    "status": OutboxStatus.FAILED.value,
+                    "updated_at": datetime.now(UTC),
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "last_error": error,
+                },
+                "$inc": {"attempts": 1},
+            },
+        )
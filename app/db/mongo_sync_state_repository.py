@@ -0,0 +1,83 @@
+from datetime import UTC, datetime
+import logging
+
+from pymongo.errors import DuplicateKeyError
+
+from app.db.base import ISyncStateRepository, LeaseLostError
+from app.db.connection.base import IConnectionManager
+from app.schemas.lease import Lease
+from app.schemas.sync import SyncCheckpoint, SyncRunStats
+
+logger = logging.getLogger(__name__)
+
+
+class MongoSyncStateRepository(ISyncStateRepository):
+    """Per-mailbox sync bookkeeping, one document per mailbox in ``sync_state``."""
+
+    def __init__(self, manager: IConnectionManager):
+        self.manager = manager
+
+    async def _update(self, mailbox: str, fields: dict, fence: Lease | None) -> None:
+        query: dict = {"_id": mailbox}
+        fields = {**fields, "updated_at": datetime.now(UTC)}
+        if fence is not None:
+            # Reject writes from an earlier holder of the same lease
+            query["$or"] = [
+                {"fence.lease": {"$ne": fence.name}},
+                {"fence.token": {"$lte": fence.token}},
+            ]
+            fields["fence"] = {"lease": fence.name, "token": fence.token}
+        db = await self.manager.connect()
+        try:
+            await db.sync_state.update_one(query, {"$set": fields}, upsert=True)
+        except DuplicateKeyError:
+            # The document exists but the filter didn't match: a newer token wrote it
+            raise LeaseLostError(
+                f"Stale sync of {mailbox} (token {fence.token})",
+            ) from None
+
+    async def get_checkpoint(self, mailbox: str) -> SyncCheckpoint | None:
+        db = await self.manager.connect()
+        doc = await db.sync_state.find_one({"_id": mailbox})
+        return SyncCheckpoint(**doc) if doc else None
+
+    async def commit_checkpoint(
+        self,
+        mailbox: str,
+        high_water_mark: datetime,
+        high_water_ids: list[str],
+        fence: Lease | None = None,
+    ) -> None:
+        await self._update(
+            mailbox,
+            {"high_water_mark": high_water_mark, "high_water_ids": high_water_ids},
+            fence,
+        )
+
+    async def record_run(
+        self,
+        mailbox: str,
+        stats: SyncRunStats,
+        fence: Lease | None = None,
+    ) -> None:
+        await self._update(mailbox, {"last_run": stats.model_dump()}, fence)
+
+    async def get_delta_link(self, mailbox: str, folder: str) -> str | None:
+        db = await self.manager.connect()
+        doc = await db.sync_state.find_one(
+            {"_id": mailbox},
+            {f"delta_links.{folder}": 1},
+        )
+        if doc is None:
+            return None
+        return doc.get("delta_links", {}).get(folder)
+
+    async def save_delta_link(
+        self,
+        mailbox: str,
+        folder: str,
+        delta_link: str,
+        fence: Lease | None = None,
+    ) -> None:
+        await self._update(mailbox, {f"delta_links.{folder}": delta_link}, fence)
+        logger.info(f"Saved delta link for {mailbox}/{folder}")
@@ -0,0 +1,259 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+import logging
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from app.db.base import IThreadRepository
+from app.db.connection.base import IConnectionManager
+from app.db.indexes import IndexSpec
+from app.db.pagination import encode_cursor, keyset_filter
+from app.schemas.thread import Thread, ThreadPage
+
+logger = logging.getLogger(__name__)
+
+THREAD_INDEXES = [
+    IndexSpec(
+        "threads",
+        (("last_activity_at", DESCENDING), ("_id", DESCENDING)),
+        "last_activity_at_-1__id_-1",
+    ),
+    IndexSpec(
+        "threads",
+        (
+            ("participants", ASCENDING),
+            ("last_activity_at", DESCENDING),
+            ("_id", DESCENDING),
+        ),
+        "participants_1_last_activity_at_-1__id_-1",
+    ),
+]
+
+
+@dataclass
+class _ThreadDelta:
+    message_count: int = 0
+    unread_count: int = 0
+    # Set when one of the conversation's messages was inserted or updated
+    subject: str | None = None
+    first_activity_at: datetime | None = None
+    last_activity_at: datetime | None = None
+    participants: set[str] = field(default_factory=set)
+    has_new_message: bool = False
+
+    def touch(self, email: dict) -> None:
+        received = email["receivedDateTime"]
+        if self.first_activity_at is None or received < self.first_activity_at:
+            self.first_activity_at = received
+            self.subject = email.get("subject")
+        if self.last_activity_at is None or received > self.last_activity_at:
+            self.last_activity_at = received
+        recipients = [
+            email.get("sender"),
+            *(email.get("toRecipients") or []),
+            *(email.get("ccRecipients") or []),
+        ]
+        for recipient in recipients:
+            if recipient and recipient["emailAddress"]["address"]:
+                self.participants.add(recipient["emailAddress"]["address"])
+
+
+def _unread(is_read: bool | None) -> int:
+    return 1 if is_read is False else 0
+
+
+class MongoThreadRepository(IThreadRepository):
+    """Per-conversation summaries in ``threads``, maintained incrementally.
+
+    Each stored page becomes one unordered bulk write of ``$inc``/``$max``/
+    ``$min``/``$addToSet`` updates, so reading a thread list never has to
+    aggregate the messages themselves. Counters are best effort: a message
+    updated by two syncs at once can be counted twice, and ``rebuild``
+    recomputes every summary from ``emails``.
+    """
+
+    def __init__(self, manager: IConnectionManager):
+        self.manager = manager
+
+    async def snapshot(self, email_ids: list[str]) -> dict[str, dict]:
+        """Conversation and read state of the stored emails among ``email_ids``."""
+        if not email_ids:
+            return {}
+        db = await self.manager.connect()
+        cursor = db.emails.find(
+            {"_id": {"$in": email_ids}},
+            {"conversationId": 1, "isRead": 1},
+        )
+        return {doc["_id"]: doc async for doc in cursor}
+
+    async def apply(
+        self,
+        emails: list[dict],
+        inserted_ids: set[str],
+        previous: dict[str, dict],
+        removed_ids: list[str] | None = None,
+    ) -> None:
+        """Fold a stored page into the summaries.
+
+        ``inserted_ids`` are the emails the page created, ``previous`` the
+        ``snapshot`` taken before writing it. Emails in neither failed to
+        store and are left out.
+        """
+        deltas: dict[str, _ThreadDelta] = {}
+        for email in emails:
+            conversation_id = email.get("conversationId")
+            if not conversation_id:
+                continue
+            if email["_id"] in inserted_ids:
+                delta = deltas.setdefault(conversation_id, _ThreadDelta())
+                delta.message_count += 1
+                delta.unread_count += _unread(email.get("isRead"))
+                delta.has_new_message = True
+            elif email["_id"] in previous:
+                delta = deltas.setdefault(conversation_id, _ThreadDelta())
+                was_unread = _unread(previous[email["_id"]].get("isRead"))
+                delta.unread_count += _unread(email.get("isRead")) - was_unread
+            else:
+                continue
+            delta.touch(email)
+
+        emptied = set()
+        for email_id in removed_ids or []:
+            old = previous.get(email_id)
+            if not old or not old.get("conversationId"):
+                continue
+            delta = deltas.setdefault(old["conversationId"], _ThreadDelta())
+            delta.message_count -= 1
+            delta.unread_count -= _unread(old.get("isRead"))
+            emptied.add(old["conversationId"])
+
+        operations = []
+        for conversation_id, delta in deltas.items():
+            update: dict = {}
+            if delta.message_count or delta.unread_count:
+                update["$inc"] = {
+                    "message_count": delta.message_count,
+                    "unread_count": delta.unread_count,
+                }
+            if delta.last_activity_at is not None:
+                update["$max"] = {"last_activity_at": delta.last_activity_at}
+                update["$min"] = {"first_activity_at": delta.first_activity_at}
+                update["$addToSet"] = {
+                    "participants": {"$each": sorted(delta.participants)},
+                }
+                update["$setOnInsert"] = {"subject": delta.subject}
+            if update:
+                operations.append(
+                    UpdateOne(
+                        {"_id": conversation_id},
+                        update,
+                        upsert=delta.has_new_message,
+                    ),
+                )
+        if not operations:
+            return
+
+        db = await self.manager.connect()
+        await db.threads.bulk_write(operations, ordered=False)
+        if emptied:
+            await db.threads.delete_many(
+                {"_id": {"$in": sorted(emptied)}, "message_count": {"$lte": 0}},
+            )
+        logger.debug(f"Updated {len(operations)} thread summaries")
+
+    async def list_threads(
+        self,
+        participant: str | None = None,
+        unread_only: bool = False,
+        limit: int = 50,
+        cursor: str | None = None,
+    ) -> ThreadPage:
+        """Threads with the latest activity first.
+
+        Raises ValueError for a malformed cursor.
+        """
+        filter_query: dict = {}
+        if participant:
+            filter_query["participants"] = participant
+        if unread_only:
+            filter_query["unread_count"] = {"$gt": 0}
+        if cursor:
+            filter_query.update(keyset_filter(cursor, date_field="last_activity_at"))
+
+        db = await self.manager.connect()
+        docs = [
+            doc
+            async for doc in db.threads.find(filter_query)
+            .sort([("last_activity_at", DESCENDING), ("_id", DESCENDING)])
+            .limit(limit + 1)
+        ]
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1]["last_activity_at"], docs[-1]["_id"])
+        return ThreadPage(
+            items=[Thread(**doc) for doc in docs],
+            next_cursor=next_cursor,
+        )
+
+    async def is_empty(self) -> bool:
+        db = await self.manager.connect()
+        return await db.threads.find_one({}, {"_id": 1}) is None
+
+    async def rebuild(self) -> int:
+        """Recompute every summary from the stored emails; returns the thread count."""
+        pipeline = [
+            {"$match": {"conversationId": {"$ne": None}}},
+            {"$sort": {"receivedDateTime": ASCENDING}},
+            {
+                "$group": {
+                    "_id": "$conversationId",
+                    "subject": {"$first": "$subject"},
+                    "message_count": {"$sum": 1},
+                    "unread_count": {
+                        "$sum": {"$cond": [{"$eq": ["$isRead", False]}, 1, 0]},
+                    },
+                    "first_activity_at": {"$min": "$receivedDateTime"},
+                    "last_activity_at": {"$max": "$receivedDateTime"},
+                    "people": {
+                        "$push": {
+                            "$concatArrays": [
+                                ["$sender.emailAddress.address"],
+                                {"$ifNull": ["$toRecipients.emailAddress.address", []]},
+                                {"$ifNull": ["$ccRecipients.emailAddress.address", []]},
+                            ],
+                        },
+                    },
+                },
+            },
+            {
+                "$set": {
+                    "participants": {
+                        "$setDifference": [
+                            {
+                                "$reduce": {
+                                    "input": "$people",
+                                    "initialValue": [],
+                                    "in": {"$setUnion": ["$$value", "$$this"]},
+                                },
+                            },
+                            [None],
+                        ],
+                    },
+                },
+            },
+            {"$unset": "people"},
+            {
+                "$merge": {
+                    "into": "threads",
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert",
+                },
+            },
+        ]
+        db = await self.manager.connect()
+        async for _ in db.emails.aggregate(pipeline, allowDiskUse=True):
+            pass
+        count = await db.threads.count_documents({})
+        logger.info(f"Rebuilt {count} thread summaries")
+        return count
@@ -0,0 +1,94 @@
+from datetime import UTC, datetime
+import logging
+import time
+
+from pymongo.errors import DuplicateKeyError
+
+from app.auth.base import ITokenCacheStore
+from app.db.connection.base import IConnectionManager
+
+logger = logging.getLogger(__name__)
+
+
+class MongoTokenCacheStore(ITokenCacheStore):
+    """MSAL cache shared by every worker and replica through MongoDB.
+
+    Writes are version-stamped: a save only lands if nobody else wrote since
+    our last read, otherwise it is rejected and the next load picks up the
+    winner's cache for the caller to merge its change into. Reads are
+    cached in-process for ``read_ttl_seconds`` and only transfer the payload
+    when the stored version moved.
+    """
+
+    def __init__(
+        self,
+        manager: IConnectionManager,
+        key: str,
+        collection: str = "token_cache",
+        read_ttl_seconds: float = 5,
+    ):
+        self.manager = manager
+        self.key = key
+        self.collection = collection
+        self.read_ttl_seconds = read_ttl_seconds
+        self._version = 0
+        self._serialized: str | None = None
+        self._read_at: float | None = None
+
+    async def load(self) -> str | None:
+        now = time.monotonic()
+        if self._read_at is not None and now - self._read_at < self.read_ttl_seconds:
+            return self._serialized
+
+        db = await self.manager.connect()
+        # Matches nothing (and transfers nothing) while our copy is current
+        doc = await db[self.collection].find_one(
+            {"_id": self.key, "version": {"$ne": self._version}},
+        )
+        if doc is not None:
+            self._version = doc["version"]
+            self._serialized = doc["cache"]
+            logger.info(f"Loaded shared token cache version {self._version}")
+        self._read_at = now
+        return self._serialized
+
+    async def save(self, serialized: str) -> bool:
+        db = await self.manager.connect()
+        collection = db[self.collection]
+        now = datetime.now(UTC)
+
+        if self._version == 0:
+            try:
+                await collection.insert_one(
+                    {
+                        "_id": self.key,
+                        "version": 1,
+                        "cache": serialized,
+                        "updated_at": now,
+                    },
+                )
+            except DuplicateKeyError:
+                return self._conflict()
+        else:
+            result = await collection.update_one(
+                {"_id": self.key, "version": self._version},
+                {
+                    "$set": {"cache": serialized, "updated_at": now},
+                    "$inc": {"version": 1},
+                },
+            )
+            if result.matched_count == 0:
+                return self._conflict()
+
+        self._version += 1
+        self._serialized = serialized
+        self._read_at = time.monotonic()
+        return True
+
+    def _conflict(self) -> bool:
+        logger.warning(
+            f"Token cache version {self._version} is stale, another worker saved first",
+        )
+        # Force the next load to go to MongoDB
+        self._read_at = None
+        return False
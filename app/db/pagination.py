@@ -0,0 +1,69 @@
+# app/db/pagination.py
+import base64
+from datetime import datetime
+import json
+from typing import Any
+
+
+def _encode(values: list[Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list[Any]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(received_date_time: datetime, id_: str) -> str:
+    """Opaque cursor pointing just past the (receivedDateTime, _id) of the last item."""
+    return _encode([received_date_time.isoformat(), id_])
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError for anything it didn't produce."""
+    try:
+        received, id_ = _decode(cursor)
+        return datetime.fromisoformat(received), str(id_)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def keyset_filter(cursor: str, date_field: str = "receivedDateTime") -> dict:
+    """Items strictly after the cursor in (``date_field`` desc, _id desc) order.
+
+    Equivalent to a range scan on the compound index, so a page costs the
+    same at any depth, unlike skip/limit.
+    """
+    received, id_ = decode_cursor(cursor)
+    return {
+        "$or": [
+            {date_field: {"$lt": received}},
+            {date_field: received, "_id": {"$lt": id_}},
+        ],
+    }
+
+
+def encode_search_cursor(score: float, id_: str) -> str:
+    """Cursor past the (relevance score, _id) of the last search hit."""
+    # JSON keeps the float's shortest repr, which round-trips exactly
+    return _encode([score, id_])
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        score, id_ = _decode(cursor)
+        return float(score), str(id_)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def search_keyset_filter(cursor: str) -> dict:
+    """Hits strictly after the cursor in (score desc, _id asc) order."""
+    score, id_ = decode_search_cursor(cursor)
+    return {
+        "$or": [
+            {"score": {"$lt": score}},
+            {"score": score, "_id": {"$gt": id_}},
+        ],
+    }
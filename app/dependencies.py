@@ -1,21 +1,131 @@
 from functools import lru_cache
+import logging
 
+from fastapi import HTTPException, status
+
+from app.auth.device_code_login import DeviceCodeLogin
 from app.auth.ms_device_code_flow import DeviceCodeFlow
+from app.auth.token_cache_store import FileTokenCacheStore
+from app.auth.token_provider import CachedTokenProvider
+from app.auth.token_refresher import TokenRefresher
 from app.core.config import settings
+from app.db.cached_email_repository import CachedEmailRepository
 from app.db.connection.mongo import MongoConnectionManager
-from app.db.mongo_email_repository import MongoEmailRepository
-from app.mail.ms_graph_client import GraphMailClient
+from app.db.mongo_email_repository import (
+    EMAIL_INDEXES,
+    USER_INDEXES,
+    MongoEmailRepository,
+)
+from app.db.mongo_lease_repository import MongoLeaseRepository
+from app.db.mongo_mailbox_repository import MAILBOX_INDEXES, MongoMailboxRepository
+from app.db.mongo_outbox_repository import OUTBOX_INDEXES, MongoOutboxRepository
+from app.db.mongo_sync_state_repository import MongoSyncStateRepository
+from app.db.mongo_thread_repository import THREAD_INDEXES, MongoThreadRepository
+from app.db.mongo_token_cache_store import MongoTokenCacheStore
+from app.db.read_cache import ReadThroughCache
+from app.mail.http_transport import GraphHttpTransport
+from app.mail.ms_graph_client import GraphMailClient, mailbox_api_url
+from app.mail.rate_limiter import GraphRateLimiter
+from app.schemas.email import EmailCreate
+from app.services.contact_graph import ContactGraphWriter
 from app.services.email_manager import EmailManager
+from app.services.lease_keeper import LeaseKeeper
+from app.services.notification_processor import NotificationProcessor
+from app.services.outbox_worker import OutboxWorkerPool
+from app.services.parse_pool import ParsePool
+from app.services.poll_scheduler import AdaptivePollScheduler
+from app.services.subscription_manager import SubscriptionManager
+from app.services.sync_engine import MailboxSyncEngine
+
+logger = logging.getLogger(__name__)
 
 # 1. Core dependencies
 mongo_mgr = MongoConnectionManager(settings.MONGO_URI, settings.DATABASE_NAME)
-auth_flow = DeviceCodeFlow(settings.CLIENT_ID, settings.TENANT_ID, settings.SCOPES,settings.MS_GRAPH_AUTH_URL)
+if settings.TOKEN_CACHE_BACKEND == "mongo":
+    token_cache_store = MongoTokenCacheStore(
+        mongo_mgr,
+        key=f"msal:{settings.CLIENT_ID}:{settings.USER_EMAIL}",
+        read_ttl_seconds=settings.TOKEN_CACHE_READ_TTL_SECONDS,
+    )
+else:
+    token_cache_store = FileTokenCacheStore(settings.TOKEN_CACHE_FILE)
+auth_flow = DeviceCodeFlow(
+    settings.CLIENT_ID,
+    settings.TENANT_ID,
+    settings.SCOPES,
+    settings.MS_GRAPH_AUTH_URL,
+    cache_store=token_cache_store,
+)
+token_provider = CachedTokenProvider(
+    auth_flow,
+    refresh_skew_seconds=settings.TOKEN_REFRESH_SKEW_SECONDS,
+)
+device_login = DeviceCodeLogin(auth_flow, token_provider)
+token_refresher = TokenRefresher(
+    token_provider,
+    lead_seconds=settings.TOKEN_BACKGROUND_REFRESH_LEAD_SECONDS,
+    max_backoff_seconds=settings.TOKEN_REFRESH_MAX_BACKOFF_SECONDS,
+)
+# Indexes reconciled by reconcile_database at startup
+INDEX_SPECS = [
+    *EMAIL_INDEXES,
+    *USER_INDEXES,
+    *OUTBOX_INDEXES,
+    *MAILBOX_INDEXES,
+    *THREAD_INDEXES,
+]
+http_transport = GraphHttpTransport(
+    pool_size=settings.GRAPH_HTTP_POOL_SIZE,
+    connect_timeout=settings.GRAPH_HTTP_CONNECT_TIMEOUT,
+    read_timeout=settings.GRAPH_HTTP_READ_TIMEOUT,
+    http2=settings.GRAPH_HTTP2,
+)
+graph_rate_limiter = GraphRateLimiter(
+    rate_per_second=settings.GRAPH_RATE_LIMIT_PER_SECOND,
+    burst=settings.GRAPH_RATE_LIMIT_BURST,
+    send_reserve=settings.GRAPH_RATE_LIMIT_SEND_RESERVE,
+)
 
 
 # 2. Factory functions
+def require_graph_auth():
+    """Fail fast on Graph routes while no device-code login has completed."""
+    if not device_login.is_authenticated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=(
+                "Microsoft Graph is not authenticated "
+                f"(state: {device_login.state.value}), "
+                f"POST {settings.API_V1_STR}/auth/start to log in"
+            ),
+        )
+
+
+def require_push_enabled():
+    """Hide the notification webhook unless GRAPH_WEBHOOK_URL/CLIENT_STATE are set."""
+    if not settings.PUSH_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
+@lru_cache(maxsize=None)
+def get_mailbox_client(mailbox: str):
+    api_url = settings.MS_GRAPH_API_URL
+    if mailbox != settings.USER_EMAIL:
+        api_url = mailbox_api_url(settings.MS_GRAPH_API_URL, mailbox)
+    return GraphMailClient(
+        token_provider,
+        mailbox,
+        api_url,
+        transport=http_transport,
+        page_size=settings.GRAPH_PAGE_SIZE,
+        rate_limiter=graph_rate_limiter,
+        max_retries=settings.GRAPH_MAX_RETRIES,
+    )
+
+
 @lru_cache
 def get_mail_client():
-    return GraphMailClient(auth_flow, settings.USER_EMAIL,settings.MS_GRAPH_API_URL)
+    return get_mailbox_client(settings.USER_EMAIL)
 
 
 @lru_cache
@@ -24,17 +134,200 @@ def get_email_repo():
 
 
 @lru_cache
-def get_email_manager():
+def get_email_read_cache():
+    return ReadThroughCache(
+        max_entries=settings.EMAIL_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.EMAIL_CACHE_TTL_SECONDS,
+    )
+
+
+@lru_cache
+def get_cached_email_repo():
+    """Email repository for API reads and syncs; writes invalidate the read cache."""
+    if settings.EMAIL_CACHE_TTL_SECONDS <= 0:
+        return get_email_repo()
+    return CachedEmailRepository(get_email_repo(), get_email_read_cache())
+
+
+@lru_cache
+def get_contact_writer():
+    return ContactGraphWriter(get_email_repo(), cache_size=settings.CONTACT_CACHE_SIZE)
+
+
+@lru_cache
+def get_parse_pool():
+    """Shared by every mailbox; None when pages are parsed on the event loop."""
+    if settings.SYNC_PARSE_WORKERS <= 0:
+        return None
+    return ParsePool(
+        settings.SYNC_PARSE_WORKERS,
+        chunk_size=settings.SYNC_PARSE_CHUNK_SIZE,
+    )
+
+
+@lru_cache
+def get_thread_repo():
+    return MongoThreadRepository(mongo_mgr)
+
+
+@lru_cache
+def get_sync_state_repo():
+    return MongoSyncStateRepository(mongo_mgr)
+
+
+@lru_cache
+def get_outbox_repo():
+    return MongoOutboxRepository(mongo_mgr)
+
+
+@lru_cache
+def get_mailbox_repo():
+    return MongoMailboxRepository(mongo_mgr)
+
+
+@lru_cache
+def get_lease_repo():
+    return MongoLeaseRepository(mongo_mgr)
+
+
+@lru_cache(maxsize=None)
+def get_mailbox_manager(mailbox: str):
     return EmailManager(
-        mail_client=get_mail_client(),
-        email_repo=get_email_repo(),
-        user_email=settings.USER_EMAIL
+        mail_client=get_mailbox_client(mailbox),
+        email_repo=get_cached_email_repo(),
+        user_email=mailbox,
+        sync_state_repo=get_sync_state_repo(),
+        sync_mode=settings.EMAIL_SYNC_MODE,
+        sync_folder=settings.EMAIL_SYNC_FOLDER,
+        outbox_repo=get_outbox_repo(),
+        outbox_max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+        contact_writer=get_contact_writer(),
+        thread_repo=get_thread_repo(),
+        parse_pool=get_parse_pool(),
+    )
+
+
+@lru_cache
+def get_email_manager():
+    return get_mailbox_manager(settings.USER_EMAIL)
+
+
+async def send_from_mailbox(mailbox: str, email: EmailCreate) -> bool:
+    return await get_mailbox_manager(mailbox).send_email(email)
+
+
+@lru_cache
+def get_outbox_workers():
+    return OutboxWorkerPool(
+        get_outbox_repo(),
+        send_from_mailbox,
+        workers=settings.OUTBOX_WORKERS,
+        lease_seconds=settings.OUTBOX_LEASE_SECONDS,
+        poll_interval_seconds=settings.OUTBOX_POLL_INTERVAL_SECONDS,
     )
 
 
+@lru_cache
+def get_lease_keeper():
+    return LeaseKeeper(get_lease_repo(), ttl_seconds=settings.SYNC_LEASE_TTL_SECONDS)
+
+
+@lru_cache
+def get_poll_scheduler():
+    return AdaptivePollScheduler(
+        initial_seconds=settings.EMAIL_RETRIEVAL_INTERVAL_MINUTES * 60,
+        min_seconds=settings.SYNC_MIN_INTERVAL_SECONDS,
+        max_seconds=settings.SYNC_MAX_INTERVAL_SECONDS,
+        throttled_count=graph_rate_limiter.throttled_count,
+    )
+
+
+@lru_cache
+def get_sync_engine():
+    return MailboxSyncEngine(
+        get_mailbox_repo(),
+        get_mailbox_manager,
+        max_concurrency=settings.SYNC_MAX_CONCURRENCY,
+        lease_keeper=get_lease_keeper(),
+        lease_scope=settings.SYNC_LEASE_SCOPE,
+        poll_scheduler=(
+            get_poll_scheduler() if settings.ADAPTIVE_POLLING_ENABLED else None
+        ),
+    )
+
+
+@lru_cache
+def get_subscription_manager():
+    return SubscriptionManager(
+        get_mailbox_repo(),
+        get_mailbox_client,
+        settings.GRAPH_WEBHOOK_URL,
+        settings.GRAPH_WEBHOOK_CLIENT_STATE,
+        ttl_minutes=settings.GRAPH_SUBSCRIPTION_TTL_MINUTES,
+        folder=settings.EMAIL_SYNC_FOLDER,
+        lease_keeper=get_lease_keeper(),
+    )
+
+
+@lru_cache
+def get_notification_processor():
+    return NotificationProcessor(
+        get_mailbox_manager,
+        workers=settings.NOTIFICATION_WORKERS,
+        queue_size=settings.NOTIFICATION_QUEUE_SIZE,
+        on_gap=get_sync_engine().sync_mailbox,
+    )
+
+
+async def register_default_mailbox():
+    """Make sure the configured USER_EMAIL is part of the registry."""
+    repo = get_mailbox_repo()
+    if await repo.get_mailbox(settings.USER_EMAIL) is None:
+        await repo.register_mailbox(settings.USER_EMAIL)
+
+
 async def run_email_sync():
+    if not device_login.is_authenticated:
+        logger.info("Skipping email sync, Graph login not completed")
+        return
     try:
-        manager = get_email_manager()
-        await manager.sync_and_store_emails()
+        # Adaptive polling ticks often and only syncs the mailboxes that are due
+        await get_sync_engine().run_once(due_only=settings.ADAPTIVE_POLLING_ENABLED)
     except Exception as e:
         print(f"CRON JOB ERROR: {e}")
+
+
+async def run_subscription_renewal():
+    if not device_login.is_authenticated:
+        logger.info("Skipping subscription renewal, Graph login not completed")
+        return
+    try:
+        await get_subscription_manager().ensure_all()
+    except Exception as e:
+        logger.error(f"Subscription renewal failed: {e}")
+
+
+async def reconcile_database():
+    """Create missing collections and indexes; drifted indexes are only reported."""
+    try:
+        index_report = await mongo_mgr.ensure_database(
+            settings.COLLECTIONS,
+            INDEX_SPECS,
+        )
+    except Exception as e:
+        logger.error(f"Index reconciliation failed: {e}")
+        return
+    if index_report.drifted:
+        logger.warning(
+            f"Indexes differ from their specs: {sorted(index_report.drifted)}",
+        )
+
+
+async def backfill_threads():
+    """Build the thread summaries from stored mail the first time they're needed."""
+    repo = get_thread_repo()
+    try:
+        if await repo.is_empty():
+            await repo.rebuild()
+    except Exception as e:
+        logger.error(f"Thread summary backfill failed: {e}")
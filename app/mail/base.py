@@ -1,12 +1,67 @@
 # app/mail/base.py
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from datetime import datetime
 from typing import Protocol
 
-from app.schemas.email import EmailCreate
+from app.schemas.email import EmailCreate, SendResult
+
+
+@dataclass
+class MessagePage:
+    messages: list[dict] = field(default_factory=list)
+    next_link: str | None = None
+    # Delta sync only: ids reported under @removed and, on the last page, the link
+    # to resume from next time
+    removed_ids: list[str] = field(default_factory=list)
+    delta_link: str | None = None
 
 
 class IMailClient(Protocol):
     async def send_email(self, email: EmailCreate) -> bool:
         pass
 
-    async def fetch_emails(self, top: int) -> list[dict]:
+    async def send_emails_batch(self, emails: list[EmailCreate]) -> list[SendResult]:
+        pass
+
+    def iter_email_pages(
+        self,
+        since: datetime | None = None,
+        page_size: int | None = None,
+    ) -> AsyncIterator[MessagePage]:
+        pass
+
+    def iter_delta_pages(
+        self,
+        folder: str,
+        delta_link: str | None = None,
+        page_size: int | None = None,
+        since: datetime | None = None,
+    ) -> AsyncIterator[MessagePage]:
+        pass
+
+    async def get_message(self, message_id: str) -> dict | None:
+        pass
+
+    async def create_subscription(
+        self,
+        notification_url: str,
+        client_state: str,
+        expires_at: datetime,
+        folder: str = "inbox",
+        lifecycle_url: str | None = None,
+    ) -> dict:
+        pass
+
+    async def renew_subscription(
+        self,
+        subscription_id: str,
+        expires_at: datetime,
+    ) -> dict | None:
+        pass
+
+    async def delete_subscription(self, subscription_id: str) -> None:
+        pass
+
+    async def fetch_emails(self) -> list[dict]:
         pass
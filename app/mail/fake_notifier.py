@@ -0,0 +1,79 @@
+# app/mail/fake_notifier.py
+import logging
+import uuid
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class FakeGraphNotifier:
+    """Plays Graph's side of change notifications against a local webhook.
+
+    Pass ``app`` to call the ASGI app in-process (tests), or leave it out to
+    post to a running server at ``notification_url``.
+    """
+
+    def __init__(self, notification_url: str, client_state: str, app=None):
+        self.notification_url = notification_url
+        self.client_state = client_state
+        self.app = app
+
+    def _client(self) -> httpx.AsyncClient:
+        if self.app is not None:
+            return httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=self.app),
+                base_url="http://testserver",
+            )
+        return httpx.AsyncClient()
+
+    async def validate(self) -> bool:
+        """Run the handshake Graph performs when a subscription is created."""
+        token = uuid.uuid4().hex
+        async with self._client() as client:
+            response = await client.post(
+                self.notification_url,
+                params={"validationToken": token},
+            )
+        return response.status_code == 200 and response.text == token
+
+    def payload(
+        self,
+        subscription_id: str,
+        message_ids: list[str],
+        change_type: str = "created",
+        client_state: str | None = None,
+    ) -> dict:
+        return {
+            "value": [
+                {
+                    "subscriptionId": subscription_id,
+                    "clientState": (
+                        self.client_state if client_state is None else client_state
+                    ),
+                    "changeType": change_type,
+                    "resource": f"Users/fake/Messages/{message_id}",
+                    "resourceData": {
+                        "@odata.type": "#Microsoft.Graph.Message",
+                        "id": message_id,
+                    },
+                    "tenantId": "fake-tenant",
+                }
+                for message_id in message_ids
+            ],
+        }
+
+    async def notify(
+        self,
+        subscription_id: str,
+        message_ids: list[str],
+        change_type: str = "created",
+        client_state: str | None = None,
+    ) -> httpx.Response:
+        async with self._client() as client:
+            return await client.post(
+                self.notification_url,
+                json=self.payload(
+                    subscription_id, message_ids, change_type, client_state,
+                ),
+            )
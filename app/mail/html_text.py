@@ -0,0 +1,55 @@
+# app/mail/html_text.py
+from html.parser import HTMLParser
+import re
+
+# Longer bodies are cut: the tail of a long thread adds index size, not findability
+MAX_BODY_TEXT_CHARS = 32000
+
+_SKIPPED_TAGS = {"script", "style", "head", "title"}
+_BLOCK_TAGS = {
+    "br", "p", "div", "li", "tr", "td", "th", "table",
+    "h1", "h2", "h3", "h4", "h5", "h6",
+}
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIPPED_TAGS:
+            self._skipping += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS and self._skipping:
+            self._skipping -= 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """Visible text of an HTML body, whitespace collapsed, entities decoded."""
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return _WHITESPACE.sub(" ", "".join(extractor.parts)).strip()
+
+
+def body_text(content_type: str | None, content: str | None) -> str | None:
+    """Plain text of a Graph message body, as stored in ``bodyText`` for search."""
+    if not content:
+        return None
+    if (content_type or "").lower() == "html":
+        text = html_to_text(content)
+    else:
+        text = _WHITESPACE.sub(" ", content).strip()
+    return text[:MAX_BODY_TEXT_CHARS]
@@ -0,0 +1,63 @@
+# app/mail/http_transport.py
+import logging
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class GraphHttpTransport:
+    """Process-wide keep-alive connection pool used for every Graph call."""
+
+    def __init__(
+        self,
+        pool_size: int = 20,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        http2: bool = False,
+    ):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.http2 = http2
+        self._client: httpx.AsyncClient | None = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size,
+            ),
+            timeout=httpx.Timeout(
+                connect=self.connect_timeout,
+                read=self.read_timeout,
+                write=self.read_timeout,
+                pool=self.connect_timeout,
+            ),
+        )
+
+    @property
+    def is_open(self) -> bool:
+        return self._client is not None and not self._client.is_closed
+
+    async def open(self) -> None:
+        if self.is_open:
+            return
+        self._client = self._build_client()
+        logger.info(
+            f"Opened Graph HTTP pool (size={self.pool_size}, http2={self.http2})",
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Graph HTTP pool closed")
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        if not self.is_open:
+            # Lazily open so clients used outside the app lifecycle still work
+            await self.open()
+        return await self._client.request(method, url, **kwargs)
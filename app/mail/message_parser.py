@@ -0,0 +1,157 @@
+# app/mail/message_parser.py
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+import logging
+from typing import Annotated, Any
+
+from pydantic import AfterValidator, TypeAdapter, ValidationError
+from pydantic.networks import validate_email
+from typing_extensions import NotRequired, Required, TypedDict
+
+from app.schemas.email import EmailInDB
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=8192)
+def _normalized_address(address: str) -> str:
+    # What EmailStr does, memoized: email-validator is most of the parsing
+    # cost and a mailbox sees the same few correspondents over and over
+    return validate_email(address)[1]
+
+
+_Address = Annotated[str, AfterValidator(_normalized_address)]
+
+
+# Plain-dict mirrors of EmailInDB keyed by the stored (Graph) field names, so a
+# validated message is already the document MongoDB stores.
+class _EmailAddress(TypedDict):
+    name: str | None
+    address: _Address | None
+
+
+class _Recipient(TypedDict):
+    emailAddress: _EmailAddress
+
+
+class _Body(TypedDict):
+    contentType: str
+    content: str
+
+
+GraphMessage = TypedDict(
+    "GraphMessage",
+    {
+        "@odata.etag": NotRequired[str | None],
+        # Graph sends ``id``; ``_id`` is accepted like EmailInDB does
+        "id": NotRequired[str],
+        "_id": NotRequired[str],
+        "createdDateTime": Required[datetime],
+        "lastModifiedDateTime": Required[datetime],
+        "changeKey": Required[str],
+        "categories": Required[list[str]],
+        "receivedDateTime": Required[datetime],
+        "sentDateTime": Required[datetime],
+        "hasAttachments": Required[bool],
+        "internetMessageId": NotRequired[str | None],
+        "subject": Required[str | None],
+        "bodyPreview": NotRequired[str | None],
+        "importance": Required[str | None],
+        "parentFolderId": NotRequired[str | None],
+        "conversationId": NotRequired[str | None],
+        "conversationIndex": NotRequired[str | None],
+        "isDeliveryReceiptRequested": NotRequired[bool | None],
+        "isReadReceiptRequested": NotRequired[bool | None],
+        "isRead": NotRequired[bool | None],
+        "isDraft": NotRequired[bool | None],
+        "webLink": NotRequired[str | None],
+        "inferenceClassification": NotRequired[str | None],
+        "body": Required[_Body | None],
+        "sender": Required[_Recipient | None],
+        "from": NotRequired[_Recipient | None],
+        "toRecipients": NotRequired[list[_Recipient] | None],
+        "ccRecipients": NotRequired[list[_Recipient] | None],
+        "bccRecipients": NotRequired[list[_Recipient] | None],
+        "replyTo": NotRequired[list[_Recipient] | None],
+        "flag": Required[dict[str, Any] | None],
+        "bodyText": NotRequired[str | None],
+    },
+)
+
+# Built once: constructing an adapter compiles the validator
+_PAGE_ADAPTER = TypeAdapter(list[GraphMessage])
+
+# Optional fields a message may omit, stored as None like EmailInDB.model_dump does
+_DEFAULTS = {
+    field_info.alias or name: None
+    for name, field_info in EmailInDB.model_fields.items()
+    if not field_info.is_required()
+}
+
+
+@dataclass
+class MessageError:
+    index: int
+    message_id: str | None
+    errors: list[dict[str, Any]]
+
+    def __str__(self) -> str:
+        details = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'message'}: "
+            f"{error['msg']}"
+            for error in self.errors
+        )
+        return f"message {self.message_id or f'#{self.index}'}: {details}"
+
+
+@dataclass
+class ParsedPage:
+    # Ready to store: stored field names, ``_id`` set, optional fields defaulted
+    documents: list[dict[str, Any]] = field(default_factory=list)
+    errors: list[MessageError] = field(default_factory=list)
+
+
+def _message_id(raw: Any) -> str | None:
+    if isinstance(raw, dict):
+        return raw.get("id") or raw.get("_id")
+    return None
+
+
+def parse_messages(messages: list[Any]) -> ParsedPage:
+    """Validate a page of Graph messages in one call.
+
+    Accepts exactly what ``EmailInDB(**raw)`` accepts. Invalid messages are
+    reported individually in ``errors``; when any are found the remaining
+    ones are validated again as a batch, so a bad message costs one extra
+    pass rather than a per-message fallback.
+    """
+    parsed = ParsedPage()
+    try:
+        validated = _PAGE_ADAPTER.validate_python(messages)
+        kept = range(len(messages))
+    except ValidationError as e:
+        rejected: dict[int, list[dict[str, Any]]] = {}
+        for error in e.errors(include_url=False, include_input=False):
+            index, *loc = error["loc"]
+            rejected.setdefault(index, []).append({**error, "loc": tuple(loc)})
+        parsed.errors = [
+            MessageError(index, _message_id(messages[index]), errors)
+            for index, errors in sorted(rejected.items())
+        ]
+        kept = [index for index in range(len(messages)) if index not in rejected]
+        validated = _PAGE_ADAPTER.validate_python([messages[index] for index in kept])
+
+    for index, message in zip(kept, validated):
+        document = {**_DEFAULTS, **message}
+        message_id = document.pop("id", None) or document.get("_id")
+        if message_id is None:
+            parsed.errors.append(MessageError(
+                index,
+                None,
+                [{"type": "missing", "loc": ("id",), "msg": "Field required"}],
+            ))
+            continue
+        document["_id"] = message_id
+        parsed.documents.append(document)
+    return parsed
@@ -1,55 +1,164 @@
 # app/mail/ms_graph_client.py
+import asyncio
+from collections.abc import AsyncIterator
 from datetime import UTC, datetime, timedelta
 import logging
+import random
+from urllib.parse import quote, urlsplit
 
-import requests
+import httpx
 
-from app.auth.base import IAuthFlow
-from app.mail.base import IMailClient
-from app.schemas.email import EmailCreate
+from app.auth.base import ITokenProvider, TokenAcquisitionError
+from app.mail.base import IMailClient, MessagePage
+from app.mail.http_transport import GraphHttpTransport
+from app.mail.rate_limiter import GraphRateLimiter, Lane, parse_retry_after
+from app.schemas.email import EmailCreate, SendResult
 
 logger = logging.getLogger(__name__)
 
+# Graph rejects $batch requests with more than 20 operations
+GRAPH_BATCH_LIMIT = 20
+# Transient statuses worth retrying; only 429 guarantees the request was not executed
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Failures that happen before the request reaches Graph, safe to retry for any method
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def split_api_url(api_url: str) -> tuple[str, str]:
+    """Split ``https://host/v1.0/me`` into ``https://host/v1.0`` and ``/me``."""
+    parts = urlsplit(api_url.rstrip("/"))
+    version, _, resource = parts.path.lstrip("/").partition("/")
+    root = f"{parts.scheme}://{parts.netloc}/{version}"
+    return root, f"/{resource}" if resource else ""
+
+
+def mailbox_api_url(api_url: str, mailbox: str) -> str:
+    """Base URL for another user's mailbox, next to the configured ``api_url``."""
+    root, _ = split_api_url(api_url)
+    # Escaped so a stray "?", "#" or "/" can't change the request
+    return f"{root}/users/{quote(mailbox, safe='@')}"
+
 
 class GraphMailClient(IMailClient):
-    def __init__(self, auth_flow: IAuthFlow, user_email: str , api_url:str):
+    def __init__(
+        self,
+        token_provider: ITokenProvider,
+        user_email: str,
+        api_url: str,
+        transport: GraphHttpTransport | None = None,
+        page_size: int = 50,
+        rate_limiter: GraphRateLimiter | None = None,
+        max_retries: int = 3,
+        min_backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 30,
+    ):
         logger.info("=" * 50)
-        logger.info("Initializing Microsoft GraphAPIService with auth flow")
-        self.auth_flow = auth_flow
+        logger.info("Initializing Microsoft GraphAPIService with token provider")
+        self.token_provider = token_provider
         self.user_email = user_email
-        self.last_fetch_time: str | None = None
-        self.token = self.auth_flow.acquire_token()
         self.api_url = api_url
+        self.transport = transport or GraphHttpTransport()
+        self.page_size = page_size
+        self.rate_limiter = rate_limiter or GraphRateLimiter()
+        self.max_retries = max_retries
+        self.min_backoff_seconds = min_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        # "/me" or "/users/{mailbox}" relative to the versioned Graph root
+        self.graph_root, self.batch_resource = split_api_url(api_url)
+        self.batch_url = f"{self.graph_root}/$batch"
+
+    def _backoff(self, attempt: int) -> float:
+        # Exponential backoff with full jitter
+        cap = min(self.max_backoff_seconds, self.min_backoff_seconds * 2 ** attempt)
+        return random.uniform(0, cap)
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        lane: Lane,
+        idempotent: bool,
+        extra_headers: dict | None = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """Issue a Graph call through the mailbox rate limiter, retrying when safe.
 
+        Reads are retried on any transient status or network error. Writes are
+        only retried when Graph cannot have executed them: a 429, or a
+        connection that was never established.
+        """
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire(self.user_email, lane)
+            headers = await self._get_headers()
+            if extra_headers:
+                headers.update(extra_headers)
+            try:
+                response = await self.transport.request(
+                    method, url, headers=headers, **kwargs,
+                )
+            except httpx.TransportError as e:
+                safe = idempotent or isinstance(e, UNSENT_ERRORS)
+                if attempt >= self.max_retries or not safe:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(
+                    f"Graph {method} failed ({e!r}), retrying in {delay:.1f}s",
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            status_code = response.status_code
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if status_code in (429, 503) and retry_after is not None:
+                # Graph throttles per mailbox, so hold every caller, not just this one
+                self.rate_limiter.throttle(self.user_email, retry_after)
+            retryable = status_code == 429 or (
+                idempotent and status_code in RETRYABLE_STATUSES
+            )
+            if not retryable or attempt >= self.max_retries:
+                return response
+            if retry_after is None:
+                delay = self._backoff(attempt)
+                logger.warning(
+                    f"Graph {method} answered {status_code}, "
+                    f"retrying in {delay:.1f}s",
+                )
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _send_mail_payload(email: EmailCreate) -> dict:
+        return {
+            "message": {
+                "subject": email.subject,
+                "body": {"contentType": "HTML", "content": email.body},
+                "toRecipients": [
+                    {"emailAddress": {"address": addr}} for addr in email.recipients
+                ],
+            },
+        }
 
-    def _get_headers(self):
-        logger.info(f"token accquired {self.token['access_token']}")
-        self.token = self.auth_flow.acquire_token()
-        logger.info(f"token accquired {self.token['access_token']}")
+    async def _get_headers(self):
+        access_token = await self.token_provider.get_token()
         return {
-            "Authorization": f"Bearer {self.token['access_token']}",
+            "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json",
         }
 
     async def send_email(self, email: EmailCreate) -> bool:
         try:
-            payload = {
-                "message": {
-                    "subject": email.subject,
-                    "body": {"contentType": "HTML", "content": email.body},
-                    "toRecipients": [
-                        {"emailAddress": {"address": addr}} for addr in email.recipients
-                    ],
-                },
-            }
-            headers = self._get_headers()
+            payload = self._send_mail_payload(email)
             logger.info("--" * 60)
             logger.info(f"Sending email using user: {self.user_email}")
             logger.info(f"Message: {payload}")
 
-            response = requests.post(
+            response = await self._request(
+                "POST",
                 f'{self.api_url}/sendMail',
-                headers=headers,
+                Lane.SEND,
+                idempotent=False,
                 json=payload,
             )
             logger.info(f"Response: {response}")
@@ -59,51 +168,342 @@ class GraphMailClient(IMailClient):
                 return True
             logger.error(f"Failed to send: {response.status_code} - {response.text}")
             return False
+        except TokenAcquisitionError:
+            raise
         except Exception as e:
             logger.error(f"Error sending email: {e!s}")
             return False
 
-    async def fetch_emails(self) -> list[dict]:
-        try:
-            logger.info(f"Retrieving emails for user: {self.user_email}")
-            headers = self._get_headers()
-
-            # Ensure the datetime has timezone info
-            if self.last_fetch_time is not None:
-                fetch_time_dt = self.last_fetch_time
-                if fetch_time_dt.tzinfo is None:
-                    fetch_time_dt = fetch_time_dt.replace(tzinfo=UTC)
-            else:
-                fetch_time_dt = datetime.utcnow().replace(tzinfo=UTC) - timedelta(
-                    days=1,
+    async def send_emails_batch(self, emails: list[EmailCreate]) -> list[SendResult]:
+        """Send many emails through JSON $batch, up to 20 sendMail calls per request.
+
+        Results come back in the order of ``emails``; a failed chunk marks
+        each of its messages as failed rather than raising.
+        """
+        results: list[SendResult] = []
+        for start in range(0, len(emails), GRAPH_BATCH_LIMIT):
+            chunk = emails[start:start + GRAPH_BATCH_LIMIT]
+            results.extend(await self._send_batch_chunk(chunk, start))
+        sent = sum(result.sent for result in results)
+        logger.info(f"Batch send for {self.user_email}: {sent}/{len(emails)} sent")
+        return results
+
+    async def _send_batch_chunk(
+        self,
+        chunk: list[EmailCreate],
+        offset: int,
+    ) -> list[SendResult]:
+        pending = {offset + i: email for i, email in enumerate(chunk)}
+        results: dict[int, SendResult] = {}
+        for attempt in range(self.max_retries + 1):
+            body = {
+                "requests": [
+                    {
+                        "id": str(i),
+                        "method": "POST",
+                        "url": f"{self.batch_resource}/sendMail",
+                        "headers": {"Content-Type": "application/json"},
+                        "body": self._send_mail_payload(email),
+                    }
+                    for i, email in pending.items()
+                ],
+            }
+            try:
+                response = await self._request(
+                    "POST",
+                    self.batch_url,
+                    Lane.SEND,
+                    idempotent=False,
+                    json=body,
                 )
+            except TokenAcquisitionError:
+                raise
+            except Exception as e:
+                logger.error(f"Error sending email batch: {e!s}")
+                results.update(
+                    (i, SendResult(index=i, status_code=0, sent=False, error=str(e)))
+                    for i in pending
+                )
+                break
 
-            fetch_time = fetch_time = (
-                fetch_time_dt.replace(microsecond=0)
-                .astimezone(UTC)
-                .strftime("%Y-%m-%dT%H:%M:%SZ")
-            )
+            if response.status_code != 200:
+                logger.error(
+                    f"Batch rejected: {response.status_code} - {response.text}",
+                )
+                results.update(
+                    (
+                        i,
+                        SendResult(
+                            index=i,
+                            status_code=response.status_code,
+                            sent=False,
+                            error=response.text,
+                        ),
+                    )
+                    for i in pending
+                )
+                break
 
-            logger.info(f"Using fetch time: {fetch_time}")
-            filter_query = f"receivedDateTime ge {fetch_time}"
+            # Graph may answer the operations in any order
+            replies = response.json().get("responses", [])
+            by_id = {item.get("id"): item for item in replies}
+            throttled: dict[int, EmailCreate] = {}
+            retry_after: float | None = None
+            for i, email in pending.items():
+                item = by_id.get(str(i))
+                if item is None:
+                    results[i] = SendResult(
+                        index=i,
+                        status_code=0,
+                        sent=False,
+                        error="missing from batch response",
+                    )
+                    continue
+                status_code = item.get("status", 0)
+                if status_code == 429 and attempt < self.max_retries:
+                    # Throttled operations were never executed, resend them
+                    throttled[i] = email
+                    item_headers = item.get("headers") or {}
+                    item_retry = parse_retry_after(item_headers.get("Retry-After"))
+                    if item_retry is not None:
+                        retry_after = max(retry_after or 0.0, item_retry)
+                    continue
+                error = None
+                if status_code != 202:
+                    reply = item.get("body") or {}
+                    error = (
+                        reply.get("error", {}).get("message") or f"HTTP {status_code}"
+                    )
+                results[i] = SendResult(
+                    index=i,
+                    status_code=status_code,
+                    sent=status_code == 202,
+                    error=error,
+                )
 
-            url = f'{self.api_url}/messages?$filter={filter_query}&$orderby=receivedDateTime asc'
+            if not throttled:
+                break
+            if retry_after is None:
+                retry_after = self._backoff(attempt)
+            self.rate_limiter.throttle(self.user_email, retry_after)
+            pending = throttled
+        return [results[i] for i in sorted(results)]
 
-            response = requests.get(url, headers=headers)
+    def _fetch_window_start(self, since: datetime | None) -> str:
+        # Ensure the datetime has timezone info
+        if since is not None:
+            fetch_time_dt = since
+            if fetch_time_dt.tzinfo is None:
+                fetch_time_dt = fetch_time_dt.replace(tzinfo=UTC)
+        else:
+            fetch_time_dt = datetime.utcnow().replace(tzinfo=UTC) - timedelta(
+                days=1,
+            )
 
-            if response.status_code == 200:
-                messages = response.json().get("value", [])
-                logger.info(f"fetched {len(messages)} new emails")
-                if messages:
-                    # Update last_fetch_time based on the latest email received
-                    latest_time_str = messages[-1]["receivedDateTime"]
-                    self.last_fetch_time = datetime.fromisoformat(
-                        latest_time_str.replace("Z", "+00:00"),
-                    )
-                return messages
+        return (
+            fetch_time_dt.replace(microsecond=0)
+            .astimezone(UTC)
+            .strftime("%Y-%m-%dT%H:%M:%SZ")
+        )
 
-            logger.error(f"Failed to fetch: {response.status_code} - {response.text}")
-            return []
+    async def _get_page(
+        self,
+        url: str,
+        params: dict | None,
+        extra_headers: dict | None = None,
+    ) -> httpx.Response | None:
+        try:
+            return await self._request(
+                "GET",
+                url,
+                Lane.FETCH,
+                idempotent=True,
+                extra_headers=extra_headers,
+                params=params,
+            )
+        except TokenAcquisitionError:
+            raise
         except Exception as e:
             logger.error(f"Error retrieving emails: {e!s}")
-            return []
+            return None
+
+    async def iter_email_pages(
+        self,
+        since: datetime | None = None,
+        page_size: int | None = None,
+    ) -> AsyncIterator[MessagePage]:
+        """Yield messages received at or after ``since``, following @odata.nextLink.
+
+        Without ``since`` the window starts one day back. Pages come oldest
+        first, so callers can checkpoint after each one.
+        """
+        logger.info(f"Retrieving emails for user: {self.user_email}")
+        fetch_time = self._fetch_window_start(since)
+        logger.info(f"Using fetch time: {fetch_time}")
+
+        url: str | None = f'{self.api_url}/messages'
+        params: dict | None = {
+            "$filter": f"receivedDateTime ge {fetch_time}",
+            "$orderby": "receivedDateTime asc",
+            "$top": page_size or self.page_size,
+        }
+        while url:
+            response = await self._get_page(url, params)
+            if response is None:
+                return
+            if response.status_code != 200:
+                logger.error(
+                    f"Failed to fetch: {response.status_code} - {response.text}",
+                )
+                return
+
+            data = response.json()
+            messages = data.get("value", [])
+            next_link = data.get("@odata.nextLink")
+            logger.info(f"fetched page of {len(messages)} new emails")
+            yield MessagePage(messages=messages, next_link=next_link)
+
+            # nextLink already carries the original query options
+            url, params = next_link, None
+
+    async def iter_delta_pages(
+        self,
+        folder: str,
+        delta_link: str | None = None,
+        page_size: int | None = None,
+        since: datetime | None = None,
+    ) -> AsyncIterator[MessagePage]:
+        """Yield only what changed in ``folder`` since ``delta_link``.
+
+        Without a delta link a new delta round starts, bounded to messages
+        received at or after ``since`` like the filter mode. The last page carries the
+        @odata.deltaLink to resume from on the next run.
+        """
+        logger.info(f"Delta sync of '{folder}' for user: {self.user_email}")
+        url: str | None = delta_link
+        params: dict | None = None
+        if url is None:
+            url = f'{self.api_url}/mailFolders/{folder}/messages/delta'
+            window_start = self._fetch_window_start(since)
+            params = {"$filter": f"receivedDateTime ge {window_start}"}
+        # Delta ignores $top, the page size is negotiated through Prefer
+        prefer = {"Prefer": f"odata.maxpagesize={page_size or self.page_size}"}
+
+        while url:
+            response = await self._get_page(url, params, prefer)
+            if response is None:
+                return
+            if response.status_code == 410 and delta_link is not None:
+                # Delta token expired or was reset by Graph, start a new round
+                logger.warning(f"Delta link for '{folder}' expired, resyncing")
+                async for page in self.iter_delta_pages(folder, None, page_size, since):
+                    yield page
+                return
+            if response.status_code != 200:
+                logger.error(
+                    f"Failed to fetch: {response.status_code} - {response.text}",
+                )
+                return
+
+            data = response.json()
+            page = MessagePage(
+                next_link=data.get("@odata.nextLink"),
+                delta_link=data.get("@odata.deltaLink"),
+            )
+            for item in data.get("value", []):
+                if "@removed" in item:
+                    page.removed_ids.append(item["id"])
+                else:
+                    page.messages.append(item)
+            logger.info(
+                f"delta page: {len(page.messages)} changed, "
+                f"{len(page.removed_ids)} removed",
+            )
+            yield page
+
+            url, params = page.next_link, None
+
+    async def get_message(self, message_id: str) -> dict | None:
+        """One message by id, or None when it no longer exists."""
+        # Errors propagate: treating them as "gone" would delete the stored copy
+        response = await self._request(
+            "GET",
+            f"{self.api_url}/messages/{message_id}",
+            Lane.FETCH,
+            idempotent=True,
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    async def create_subscription(
+        self,
+        notification_url: str,
+        client_state: str,
+        expires_at: datetime,
+        folder: str = "inbox",
+        lifecycle_url: str | None = None,
+    ) -> dict:
+        """Subscribe to created/updated messages of ``folder`` in this mailbox.
+
+        Graph validates ``notification_url`` (and ``lifecycle_url``, where
+        subscriptionRemoved/reauthorizationRequired/missed events go) before
+        answering, so the webhook must already be reachable.
+        """
+        resource = f"{self.batch_resource.lstrip('/')}/mailFolders('{folder}')/messages"
+        body = {
+            "changeType": "created,updated",
+            "notificationUrl": notification_url,
+            "resource": resource,
+            "expirationDateTime": expires_at.astimezone(UTC).isoformat(),
+            "clientState": client_state,
+        }
+        if lifecycle_url:
+            body["lifecycleNotificationUrl"] = lifecycle_url
+        response = await self._request(
+            "POST",
+            f"{self.graph_root}/subscriptions",
+            Lane.FETCH,
+            idempotent=False,
+            json=body,
+        )
+        response.raise_for_status()
+        logger.info(f"Created Graph subscription for {self.user_email} on {resource}")
+        return response.json()
+
+    async def renew_subscription(
+        self,
+        subscription_id: str,
+        expires_at: datetime,
+    ) -> dict | None:
+        """Push back the expiry; None when Graph no longer knows the subscription."""
+        response = await self._request(
+            "PATCH",
+            f"{self.graph_root}/subscriptions/{subscription_id}",
+            Lane.FETCH,
+            idempotent=True,
+            json={"expirationDateTime": expires_at.astimezone(UTC).isoformat()},
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    async def delete_subscription(self, subscription_id: str) -> None:
+        response = await self._request(
+            "DELETE",
+            f"{self.graph_root}/subscriptions/{subscription_id}",
+            Lane.FETCH,
+            idempotent=True,
+        )
+        if response.status_code not in (204, 404):
+            response.raise_for_status()
+
+    async def fetch_emails(self) -> list[dict]:
+        """Buffer every page; prefer iter_email_pages for large mailboxes."""
+        return [
+            message
+            async for page in self.iter_email_pages()
+            for message in page.messages
+        ]
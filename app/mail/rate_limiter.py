@@ -0,0 +1,139 @@
+# app/mail/rate_limiter.py
+import asyncio
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from enum import Enum
+import logging
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class Lane(str, Enum):
+    """Traffic class of a Graph call; sends go ahead of sync traffic."""
+
+    SEND = "send"
+    FETCH = "fetch"
+
+
+@dataclass
+class _Bucket:
+    tokens: float
+    updated_at: float
+    blocked_until: float = 0.0
+    waiting: dict[Lane, int] = field(default_factory=lambda: {lane: 0 for lane in Lane})
+    throttled_count: int = 0
+    granted: dict[Lane, int] = field(default_factory=lambda: {lane: 0 for lane in Lane})
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max(0.0, (retry_at - datetime.now(UTC)).total_seconds())
+
+
+class GraphRateLimiter:
+    """Per-mailbox token bucket shared by every Graph call.
+
+    Fetch traffic leaves ``send_reserve`` tokens in the bucket and yields to
+    queued sends, so a long sync cannot starve interactive sends. A throttled
+    response blocks the whole mailbox until its Retry-After has passed.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float = 10,
+        burst: int = 20,
+        send_reserve: int = 2,
+    ):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.send_reserve = min(send_reserve, burst - 1)
+        self._buckets: dict[str, _Bucket] = {}
+
+    def _bucket(self, mailbox: str) -> _Bucket:
+        bucket = self._buckets.get(mailbox)
+        if bucket is None:
+            bucket = self._buckets[mailbox] = _Bucket(self.burst, time.monotonic())
+        return bucket
+
+    def _tokens_at(self, bucket: _Bucket, now: float) -> float:
+        refilled = (now - bucket.updated_at) * self.rate_per_second
+        return min(self.burst, bucket.tokens + refilled)
+
+    def _refill(self, bucket: _Bucket, now: float) -> None:
+        bucket.tokens = self._tokens_at(bucket, now)
+        bucket.updated_at = now
+
+    def _delay(self, bucket: _Bucket, lane: Lane, now: float) -> float:
+        """Seconds until ``lane`` may take a token, 0 when it can take one now."""
+        if bucket.blocked_until > now:
+            return bucket.blocked_until - now
+        needed = 1.0
+        if lane is Lane.FETCH:
+            if bucket.waiting[Lane.SEND]:
+                return 1 / self.rate_per_second
+            needed += self.send_reserve
+        if bucket.tokens >= needed:
+            return 0.0
+        return (needed - bucket.tokens) / self.rate_per_second
+
+    async def acquire(self, mailbox: str, lane: Lane = Lane.FETCH) -> float:
+        """Wait for a token; returns the seconds spent waiting."""
+        bucket = self._bucket(mailbox)
+        started = time.monotonic()
+        bucket.waiting[lane] += 1
+        try:
+            while True:
+                now = time.monotonic()
+                self._refill(bucket, now)
+                delay = self._delay(bucket, lane, now)
+                if delay <= 0:
+                    bucket.tokens -= 1
+                    bucket.granted[lane] += 1
+                    return now - started
+                await asyncio.sleep(delay)
+        finally:
+            bucket.waiting[lane] -= 1
+
+    def throttle(self, mailbox: str, retry_after_seconds: float) -> None:
+        """Hold every lane of ``mailbox`` until Graph's Retry-After has passed."""
+        bucket = self._bucket(mailbox)
+        until = time.monotonic() + retry_after_seconds
+        bucket.blocked_until = max(bucket.blocked_until, until)
+        bucket.tokens = 0
+        bucket.throttled_count += 1
+        logger.warning(
+            f"Graph throttled {mailbox}, pausing for {retry_after_seconds:.1f}s",
+        )
+
+    def throttled_count(self, mailbox: str) -> int:
+        """How often Graph has throttled ``mailbox`` so far."""
+        bucket = self._buckets.get(mailbox)
+        return bucket.throttled_count if bucket else 0
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            mailbox: {
+                "tokens": round(self._tokens_at(bucket, now), 2),
+                "blocked_for_seconds": round(max(0.0, bucket.blocked_until - now), 2),
+                "throttled_count": bucket.throttled_count,
+                "waiting": {lane.value: n for lane, n in bucket.waiting.items()},
+                "granted": {lane.value: n for lane, n in bucket.granted.items()},
+            }
+            for mailbox, bucket in self._buckets.items()
+        }
@@ -1,13 +1,35 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
 import logging
 import sys
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from app.api.auth_endpoints import router as auth_router
 from app.api.endpoints import router as email_router
+from app.api.mailbox_endpoints import router as mailbox_router
+from app.api.metrics_endpoints import router as metrics_router
+from app.api.notification_endpoints import router as notification_router
+from app.api.thread_endpoints import router as thread_router
+from app.auth.base import TokenAcquisitionError
 from app.core.config import settings
-from app.dependencies import mongo_mgr, run_email_sync
+from app.dependencies import (
+    backfill_threads,
+    device_login,
+    get_notification_processor,
+    get_outbox_workers,
+    get_parse_pool,
+    http_transport,
+    mongo_mgr,
+    reconcile_database,
+    register_default_mailbox,
+    run_email_sync,
+    run_subscription_renewal,
+    token_refresher,
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -41,25 +63,75 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+
+@app.exception_handler(TokenAcquisitionError)
+async def token_acquisition_error_handler(request: Request, exc: TokenAcquisitionError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": f"Microsoft Graph is not authenticated: {exc}"},
+    )
+
+
 # Scheduler for periodic email retrieval
 scheduler = AsyncIOScheduler()
+# One-off startup work; referenced so the tasks aren't garbage collected
+background_tasks: set[asyncio.Task] = set()
 
 
 @app.on_event("startup")
 async def startup():
-    await mongo_mgr.ensure_database(settings.COLLECTIONS)
+    # Index builds on a large collection can take a while; serve meanwhile
+    for work in (reconcile_database(), backfill_threads()):
+        task = asyncio.create_task(work)
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+    await register_default_mailbox()
+    await http_transport.open()
+    await device_login.bootstrap()
+    token_refresher.start()
+    get_outbox_workers().start()
+    if settings.PUSH_ENABLED:
+        get_notification_processor().start()
+        scheduler.add_job(
+            run_subscription_renewal,
+            "interval",
+            minutes=settings.GRAPH_SUBSCRIPTION_RENEW_INTERVAL_MINUTES,
+            # Subscribe right away instead of one interval after startup
+            next_run_time=datetime.now(timezone.utc) + timedelta(seconds=5),
+            max_instances=1,
+            coalesce=True,
+        )
+    if settings.ADAPTIVE_POLLING_ENABLED:
+        poll_every = {"seconds": settings.SYNC_SCHEDULER_TICK_SECONDS}
+    elif settings.PUSH_ENABLED:
+        # With push on, polling only reconciles notifications that got lost
+        poll_every = {"minutes": settings.EMAIL_PUSH_RECONCILE_INTERVAL_MINUTES}
+    else:
+        poll_every = {"minutes": settings.EMAIL_RETRIEVAL_INTERVAL_MINUTES}
     scheduler.add_job(
         run_email_sync,
         "interval",
-        minutes=settings.EMAIL_RETRIEVAL_INTERVAL_MINUTES,
+        **poll_every,
+        # Late ticks collapse into one; the engine skips mailboxes still syncing
+        max_instances=1,
+        coalesce=True,
     )
     scheduler.start()
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    await token_refresher.stop()
+    await get_outbox_workers().stop()
+    if settings.PUSH_ENABLED:
+        await get_notification_processor().stop()
+    await device_login.stop()
     await mongo_mgr.close()
+    await http_transport.close()
     scheduler.shutdown()
+    if get_parse_pool() is not None:
+        get_parse_pool().shutdown()
 
 
 # Include routers
@@ -68,6 +140,32 @@ app.include_router(
     prefix=f"{settings.API_V1_STR}/emails",
     tags=["emails"],
 )
+app.include_router(
+    auth_router,
+    prefix=f"{settings.API_V1_STR}/auth",
+    tags=["auth"],
+)
+app.include_router(
+    mailbox_router,
+    prefix=f"{settings.API_V1_STR}/mailboxes",
+    tags=["mailboxes"],
+)
+app.include_router(
+    thread_router,
+    prefix=f"{settings.API_V1_STR}/threads",
+    tags=["threads"],
+)
+app.include_router(
+    notification_router,
+    prefix=f"{settings.API_V1_STR}/notifications",
+    tags=["notifications"],
+    include_in_schema=settings.PUSH_ENABLED,
+)
+app.include_router(
+    metrics_router,
+    prefix=f"{settings.API_V1_STR}/metrics",
+    tags=["metrics"],
+)
 
 
 @app.get("/")
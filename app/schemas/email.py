@@ -15,6 +15,15 @@ class EmailCreate(EmailBase):
     pass
 
 
+class SendResult(BaseModel):
+    """Outcome of one message of a batched send, ``index`` points into the request."""
+
+    index: int
+    status_code: int
+    sent: bool
+    error: str | None = None
+
+
 class EmailAddress(BaseModel):
     name: str | None
     address: EmailStr | None
@@ -72,7 +81,41 @@ class EmailInDB(BaseModel):
     bcc_recipients: list[Recipient] | None = Field(None, alias="bccRecipients")
     reply_to: list[Recipient] | None = Field(None, alias="replyTo")
     flag: dict[str, Any] | None
+    # Not a Graph field: plain text of ``body``, filled in on write for the text index
+    body_text: str | None = Field(None, alias="bodyText")
 
     class Config:
         populate_by_name = True
         allow_population_by_field_name = True
+
+
+# Stored field names of EmailInDB, the only ones a query may project
+EMAIL_FIELDS = frozenset(
+    field.alias or name for name, field in EmailInDB.model_fields.items()
+)
+
+
+class EmailQuery(BaseModel):
+    """Filters of GET /emails; None means "don't filter on it"."""
+
+    sender: str | None = None
+    conversation_id: str | None = None
+    folder_id: str | None = None
+    is_read: bool | None = None
+
+    def to_filter(self) -> dict[str, Any]:
+        conditions = {
+            "sender.emailAddress.address": self.sender,
+            "conversationId": self.conversation_id,
+            "parentFolderId": self.folder_id,
+            "isRead": self.is_read,
+        }
+        return {
+            field: value for field, value in conditions.items() if value is not None
+        }
+
+
+class EmailPage(BaseModel):
+    items: list[dict[str, Any]]
+    # Pass back as ``cursor`` for the next page; None on the last page
+    next_cursor: str | None = None
@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class Lease(BaseModel):
+    name: str = Field(..., alias="_id")
+    owner: str
+    # Fencing token, incremented on every acquisition so writes from an
+    # earlier holder can be told apart and rejected
+    token: int
+    expires_at: datetime
+
+    class Config:
+        populate_by_name = True
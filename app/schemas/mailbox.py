@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+from app.schemas.sync import SyncRunStats
+
+
+class Mailbox(BaseModel):
+    address: str = Field(..., alias="_id")
+    enabled: bool = True
+    created_at: datetime | None = None
+    last_sync_started_at: datetime | None = None
+    last_success_at: datetime | None = None
+    last_error: str | None = None
+    last_stats: SyncRunStats | None = None
+    # Graph change-notification subscription feeding push sync
+    subscription_id: str | None = None
+    subscription_expires_at: datetime | None = None
+
+    class Config:
+        populate_by_name = True
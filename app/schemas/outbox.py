@@ -0,0 +1,33 @@
+from datetime import datetime
+from enum import Enum
+
+from pydantic import BaseModel, Field
+
+from app.schemas.email import EmailCreate
+
+
+class OutboxStatus(str, Enum):
+    QUEUED = "queued"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class OutboxMessage(BaseModel):
+    id: str = Field(..., alias="_id")
+    mailbox: str
+    email: EmailCreate
+    status: OutboxStatus = OutboxStatus.QUEUED
+    attempts: int = 0
+    max_attempts: int = 5
+    next_attempt_at: datetime
+    # Set while a worker holds the message; an expired lease makes it claimable again
+    lease_owner: str | None = None
+    lease_expires_at: datetime | None = None
+    last_error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+    sent_at: datetime | None = None
+
+    class Config:
+        populate_by_name = True
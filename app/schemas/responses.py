@@ -1,19 +1,62 @@
+from datetime import datetime
+
 from pydantic import BaseModel
 
-from app.schemas.email import EmailCreate
+from app.schemas.email import EmailCreate, SendResult
+from app.schemas.outbox import OutboxStatus
+from app.schemas.sync import SyncRunStats
 
 
 class SendEmailResponse(BaseModel):
     status_code: int
     email: EmailCreate
     message : str
+    id: str | None = None
     class Config:
         allow_population_by_field_name = True
 
 
+class BulkSendEmailResponse(BaseModel):
+    sent: int
+    failed: int
+    results: list[SendResult]
+
+
 class FetchEmailsResponse(BaseModel):
     status_code: int
     count: int
 
     class Config:
         allow_population_by_field_name = True
+
+
+class AuthStatusResponse(BaseModel):
+    state: str
+    user_code: str | None = None
+    verification_uri: str | None = None
+    message: str | None = None
+    expires_at: datetime | None = None
+    error: str | None = None
+
+
+class OutboxStatusResponse(BaseModel):
+    id: str
+    status: OutboxStatus
+    attempts: int
+    last_error: str | None = None
+    created_at: datetime
+    sent_at: datetime | None = None
+
+
+class MailboxUpdate(BaseModel):
+    enabled: bool = True
+
+
+class MailboxStatusResponse(BaseModel):
+    address: str
+    enabled: bool
+    last_success_at: datetime | None = None
+    # Seconds since the last successful sync, None if it never synced
+    lag_seconds: float | None = None
+    last_error: str | None = None
+    last_stats: SyncRunStats | None = None
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class BulkUpsertResult(BaseModel):
+    inserted: int = 0
+    modified: int = 0
+    matched: int = 0
+    failed: int = 0
+    upserted_ids: list[str] = []
+    # Ids of the emails whose write failed, in step with ``errors``
+    failed_ids: list[str] = []
+    errors: list[str] = []
+
+
+class SyncRunStats(BaseModel):
+    mode: str
+    started_at: datetime
+    finished_at: datetime | None = None
+    pages: int = 0
+    fetched: int = 0
+    stored: int = 0
+    inserted: int = 0
+    modified: int = 0
+    failed: int = 0
+    removed: int = 0
+    skipped: int = 0
+
+
+class SyncCheckpoint(BaseModel):
+    mailbox: str = Field(..., alias="_id")
+    # receivedDateTime of the newest stored message, and the ids stored at exactly
+    # that instant, so a resumed `ge` query doesn't rewrite them
+    high_water_mark: datetime | None = None
+    high_water_ids: list[str] = []
+    delta_links: dict[str, str] = {}
+    last_run: SyncRunStats | None = None
+    updated_at: datetime | None = None
+
+    class Config:
+        populate_by_name = True
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class Thread(BaseModel):
+    """Summary of one conversation, kept up to date as its messages are synced."""
+
+    conversation_id: str = Field(..., alias="_id")
+    subject: str | None = None
+    message_count: int = 0
+    unread_count: int = 0
+    participants: list[str] = Field(default_factory=list)
+    first_activity_at: datetime | None = None
+    last_activity_at: datetime | None = None
+
+    class Config:
+        populate_by_name = True
+
+
+class ThreadPage(BaseModel):
+    items: list[Thread]
+    # Pass back as ``cursor`` for the next page; None on the last page
+    next_cursor: str | None = None
@@ -0,0 +1,97 @@
+# app/services/contact_graph.py
+from collections import OrderedDict
+from collections.abc import Iterable
+import logging
+from typing import Any
+
+from app.db.base import IEmailRepository
+
+logger = logging.getLogger(__name__)
+
+
+def _addresses(recipients: list[dict] | None) -> set[str]:
+    return {
+        address
+        for recipient in recipients or []
+        if recipient and (address := recipient["emailAddress"]["address"])
+    }
+
+
+class ContactGraphWriter:
+    """Records who exchanged mail with whom in the ``users`` contact lists.
+
+    Every call becomes at most one bulk write; (user, contact) pairs already
+    written are remembered in an LRU of ``cache_size`` entries so repeated
+    sends to the same people don't reach MongoDB at all. Write errors are
+    logged, never raised: contacts must not fail a send or a sync.
+    """
+
+    def __init__(self, email_repo: IEmailRepository, cache_size: int = 10000):
+        self.email_repo = email_repo
+        self.cache_size = cache_size
+        self._known: OrderedDict[tuple[str, str], None] = OrderedDict()
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.write_count = 0
+        self.failure_count = 0
+
+    async def record_send(self, sender: str, recipients: Iterable[str]) -> int:
+        pairs = set()
+        for recipient in recipients:
+            pairs.add((sender, recipient))
+            pairs.add((recipient, sender))
+        return await self.add(pairs)
+
+    async def record_received(self, owner: str, emails: list[dict]) -> int:
+        """Link ``owner`` with the senders of its mail and the recipients of its own."""
+        pairs = set()
+        for email in emails:
+            sender = _addresses([email.get("sender")])
+            if owner in sender:
+                recipients = _addresses(email.get("toRecipients"))
+                correspondents = recipients | _addresses(email.get("ccRecipients"))
+            else:
+                correspondents = sender
+            for contact in correspondents - {owner}:
+                pairs.add((owner, contact))
+                pairs.add((contact, owner))
+        return await self.add(pairs)
+
+    async def add(self, pairs: Iterable[tuple[str, str]]) -> int:
+        """Write the pairs not seen before; returns how many were written."""
+        contacts: dict[str, set[str]] = {}
+        new_pairs = []
+        for pair in pairs:
+            if pair in self._known:
+                self._known.move_to_end(pair)
+                self.cache_hits += 1
+                continue
+            self.cache_misses += 1
+            new_pairs.append(pair)
+            user, contact = pair
+            contacts.setdefault(user, set()).add(contact)
+        if not new_pairs:
+            return 0
+
+        try:
+            await self.email_repo.add_contacts(contacts)
+        except Exception as e:
+            self.failure_count += 1
+            logger.warning(f"Could not update contacts of {sorted(contacts)}: {e}")
+            return 0
+        self.write_count += 1
+        for pair in new_pairs:
+            self._known[pair] = None
+        while len(self._known) > self.cache_size:
+            self._known.popitem(last=False)
+        return len(new_pairs)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "cached_pairs": len(self._known),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "write_count": self.write_count,
+            "failure_count": self.failure_count,
+        }
@@ -1,45 +1,313 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from datetime import UTC, datetime
 import logging
 
-from app.db.base import IEmailRepository
-from app.mail.base import IMailClient
-from app.schemas.email import EmailCreate, EmailInDB , Recipient
+from app.db.base import (
+    IEmailRepository,
+    IOutboxRepository,
+    ISyncStateRepository,
+    IThreadRepository,
+)
+from app.mail.base import IMailClient, MessagePage
+from app.mail.message_parser import ParsedPage, parse_messages
+from app.schemas.email import EmailCreate, Recipient, SendResult
+from app.schemas.lease import Lease
+from app.schemas.outbox import OutboxMessage
+from app.schemas.sync import SyncCheckpoint, SyncRunStats
+from app.services.contact_graph import ContactGraphWriter
+from app.services.parse_pool import ParsePool
 logger = logging.getLogger(__name__)
 
 
 class EmailManager:
-    def __init__(self, mail_client: IMailClient, email_repo: IEmailRepository , user_email: str ):
+    def __init__(
+        self,
+        mail_client: IMailClient,
+        email_repo: IEmailRepository,
+        user_email: str,
+        sync_state_repo: ISyncStateRepository | None = None,
+        sync_mode: str = "filter",
+        sync_folder: str = "inbox",
+        outbox_repo: IOutboxRepository | None = None,
+        outbox_max_attempts: int = 5,
+        contact_writer: ContactGraphWriter | None = None,
+        thread_repo: IThreadRepository | None = None,
+        parse_pool: ParsePool | None = None,
+    ):
         self.mail_client = mail_client
         self.email_repo = email_repo
         self.user_email = user_email
+        self.sync_state_repo = sync_state_repo
+        self.sync_mode = sync_mode
+        self.sync_folder = sync_folder
+        self.outbox_repo = outbox_repo
+        self.outbox_max_attempts = outbox_max_attempts
+        self.contact_writer = contact_writer
+        self.thread_repo = thread_repo
+        self.parse_pool = parse_pool
 
-    def _email_recipients_parser( self , list_of_recipients : list[Recipient] = []  ):
+    def _email_recipients_parser(
+        self,
+        list_of_recipients: list[Recipient] | None = None,
+    ) -> set[str]:
         emails = set()
-        if len( list_of_recipients ):
-            for recipient in list_of_recipients:
-                set.add(recipient.email_address.address)
+        for recipient in list_of_recipients or []:
+            if recipient.email_address.address:
+                emails.add(recipient.email_address.address)
         return emails
 
-    async def sync_and_store_emails(self) -> list[EmailInDB]:
-        """Fetch emails via IMailClient, and store them in IEmailRepository."""
-        logger.info("Fetching new emails from mail client...")
-        emails_raw = await self.mail_client.fetch_emails()
-        stored = []
-        for raw in emails_raw:
+    def _parse_page(
+        self,
+        page: MessagePage,
+        stats: SyncRunStats,
+        parsed: ParsedPage | None = None,
+    ) -> list[dict]:
+        """Validate the page in one pass into documents ready for the bulk write."""
+        if parsed is None:
+            parsed = parse_messages(page.messages)
+        for error in parsed.errors:
+            stats.failed += 1
+            logger.warning(f"Failed to parse email: {error}")
+        return parsed.documents
+
+    async def _store_page(
+        self,
+        page: MessagePage,
+        stats: SyncRunStats,
+        skip_ids: set[str] | None = None,
+        parsed: ParsedPage | None = None,
+    ) -> tuple[list[dict], set[str]]:
+        """Store one page; returns its parsed emails and the ids that failed."""
+        stats.pages += 1
+        stats.fetched += len(page.messages)
+        emails = self._parse_page(page, stats, parsed)
+        batch = [
+            email for email in emails if not (skip_ids and email["_id"] in skip_ids)
+        ]
+        stats.skipped += len(emails) - len(batch)
+        previous = await self._thread_snapshot(batch, page.removed_ids)
+        inserted_ids: set[str] = set()
+        failed_ids: set[str] = set()
+        if batch:
+            # Raised storage errors propagate; per-email write errors hold
+            # the checkpoint
+            result = await self.email_repo.upsert_emails(batch)
+            stats.stored += len(batch) - result.failed
+            stats.inserted += result.inserted
+            stats.modified += result.modified
+            stats.failed += result.failed
+            inserted_ids = set(result.upserted_ids)
+            failed_ids = set(result.failed_ids)
+            for error in result.errors:
+                logger.warning(f"Failed to store email: {error}")
+            if self.contact_writer is not None:
+                await self.contact_writer.record_received(self.user_email, batch)
+        if page.removed_ids:
+            stats.removed += await self.email_repo.delete_emails(page.removed_ids)
+        if previous is not None:
             try:
-                email = EmailInDB(**raw)  # assumes static constructor exists
-                await self.email_repo.upsert_email(email)
-                stored.append(email)
+                await self.thread_repo.apply(
+                    batch, inserted_ids, previous, page.removed_ids,
+                )
             except Exception as e:
-                logger.warning(f"Failed to parse or store email: {e}")
-        logger.info(f"Stored {len(stored)} emails to repository.")
-        return stored
+                # Summaries are derived data; never hold the checkpoint back for them
+                logger.warning(f"Could not update thread summaries: {e}")
+        logger.info(f"Stored page of {len(page.messages)} emails")
+        return emails, failed_ids
+
+    async def _thread_snapshot(
+        self,
+        batch: list[dict],
+        removed_ids: list[str],
+    ) -> dict[str, dict] | None:
+        """State of the page's emails before it is written, for the thread counters."""
+        if self.thread_repo is None or not (batch or removed_ids):
+            return None
+        try:
+            ids = [e["_id"] for e in batch] + list(removed_ids)
+            return await self.thread_repo.snapshot(ids)
+        except Exception as e:
+            logger.warning(f"Could not read thread state, skipping summaries: {e}")
+            return None
+
+    def _parsed_pages(
+        self,
+        pages: AsyncIterator[MessagePage],
+    ) -> AsyncIterator[tuple[MessagePage, ParsedPage | None]]:
+        """Pages paired with their parse; None means "parse when storing it"."""
+        if self.parse_pool is not None:
+            return self.parse_pool.pipeline(pages)
+        return self._unparsed_pages(pages)
+
+    @staticmethod
+    async def _unparsed_pages(
+        pages: AsyncIterator[MessagePage],
+    ) -> AsyncIterator[tuple[MessagePage, None]]:
+        async for page in pages:
+            yield page, None
+
+    async def sync_and_store_emails(self, fence: Lease | None = None) -> SyncRunStats:
+        """Stream pages from IMailClient into IEmailRepository, checkpointing them.
+
+        ``fence`` is the sync lease held by the caller; checkpoints written
+        under an outdated lease are rejected with LeaseLostError.
+        """
+        stats = SyncRunStats(mode=self.sync_mode, started_at=datetime.now(UTC))
+        checkpoint = None
+        if self.sync_state_repo is not None:
+            checkpoint = await self.sync_state_repo.get_checkpoint(self.user_email)
+
+        if self.sync_mode == "delta" and self.sync_state_repo is not None:
+            await self._sync_delta(stats, checkpoint, fence)
+        else:
+            await self._sync_window(stats, checkpoint, fence)
+
+        stats.finished_at = datetime.now(UTC)
+        if self.sync_state_repo is not None:
+            await self.sync_state_repo.record_run(self.user_email, stats, fence=fence)
+        logger.info(f"Stored {stats.stored} emails to repository.")
+        return stats
+
+    @staticmethod
+    def _high_water_mark(checkpoint: SyncCheckpoint | None) -> datetime | None:
+        since = checkpoint.high_water_mark if checkpoint else None
+        if since is not None and since.tzinfo is None:
+            # MongoDB hands datetimes back naive; they are UTC
+            since = since.replace(tzinfo=UTC)
+        return since
+
+    async def _sync_window(
+        self,
+        stats: SyncRunStats,
+        checkpoint: SyncCheckpoint | None,
+        fence: Lease | None = None,
+    ) -> None:
+        logger.info("Fetching new emails from mail client...")
+        since = self._high_water_mark(checkpoint)
+        since_ids = set(checkpoint.high_water_ids) if checkpoint else set()
+
+        checkpoint_held = False
+        pages = self._parsed_pages(self.mail_client.iter_email_pages(since=since))
+        async with aclosing(pages):
+            async for page, parsed in pages:
+                emails, failed_ids = await self._store_page(
+                    page, stats, skip_ids=since_ids, parsed=parsed,
+                )
+                if checkpoint_held or self.sync_state_repo is None:
+                    continue
+                if failed_ids:
+                    # The next run only re-reads mail from the checkpoint on, so
+                    # it must stay before the oldest email that failed to store,
+                    # for the whole run
+                    cutoff = min(
+                        e["receivedDateTime"] for e in emails if e["_id"] in failed_ids
+                    )
+                    emails = [e for e in emails if e["receivedDateTime"] < cutoff]
+                    checkpoint_held = True
+                if not emails:
+                    continue
+
+                latest = max(email["receivedDateTime"] for email in emails)
+                latest_ids = {
+                    e["_id"] for e in emails if e["receivedDateTime"] == latest
+                }
+                if latest == since:
+                    # Several messages share the instant across pages
+                    latest_ids |= since_ids
+                since, since_ids = latest, latest_ids
+                await self.sync_state_repo.commit_checkpoint(
+                    self.user_email,
+                    latest,
+                    sorted(latest_ids),
+                    fence=fence,
+                )
+
+    async def _sync_delta(
+        self,
+        stats: SyncRunStats,
+        checkpoint: SyncCheckpoint | None,
+        fence: Lease | None = None,
+    ) -> None:
+        folder = self.sync_folder
+        delta_link = checkpoint.delta_links.get(folder) if checkpoint else None
+        logger.info(f"Delta sync of {folder}, resuming: {delta_link is not None}")
+        # Bounds a new round (no link yet, or Graph expired it) like the filter mode
+        since = self._high_water_mark(checkpoint)
+        pages = self._parsed_pages(
+            self.mail_client.iter_delta_pages(folder, delta_link, since=since),
+        )
+        round_failed = False
+        async with aclosing(pages):
+            async for page, parsed in pages:
+                _, failed_ids = await self._store_page(page, stats, parsed=parsed)
+                round_failed = round_failed or bool(failed_ids)
+                if page.delta_link and round_failed:
+                    # The next round only returns changes made after the saved link,
+                    # so resume from the old one until every email is stored
+                    logger.warning(f"Keeping the delta link of {folder}: writes failed")
+                elif page.delta_link:
+                    # Only reached once every page of the round has been stored
+                    await self.sync_state_repo.save_delta_link(
+                        self.user_email,
+                        folder,
+                        page.delta_link,
+                        fence=fence,
+                    )
+
+    async def store_messages_by_id(self, message_ids: list[str]) -> SyncRunStats:
+        """Fetch and store the messages a change notification pointed at.
+
+        Ids Graph no longer knows are removed from the repository. The sync
+        checkpoint is left alone, polling still reconciles anything missed.
+        """
+        stats = SyncRunStats(mode="push", started_at=datetime.now(UTC))
+        fetched = await asyncio.gather(
+            *(self.mail_client.get_message(message_id) for message_id in message_ids),
+        )
+        page = MessagePage(
+            messages=[message for message in fetched if message is not None],
+            removed_ids=[
+                message_id
+                for message_id, message in zip(message_ids, fetched)
+                if message is None
+            ],
+        )
+        await self._store_page(page, stats)
+        stats.finished_at = datetime.now(UTC)
+        return stats
 
     async def send_email(self, email: EmailCreate) -> bool:
         """Send an email and record it in the repository."""
         logger.info(f"Sending email to: {email.recipients}")
 
-        self.email_repo.get_create_update_user( self.user_email , email.recipients )
-        for recipient in email.recipients:
-            self.email_repo.get_create_update_user( recipient , [self.user_email] )
         success = await self.mail_client.send_email(email)
+        if success and self.contact_writer is not None:
+            await self.contact_writer.record_send(self.user_email, email.recipients)
         return success
+
+    async def queue_email(self, email: EmailCreate) -> OutboxMessage:
+        """Persist an email to the outbox; the send workers deliver it."""
+        return await self.outbox_repo.enqueue(
+            self.user_email,
+            email,
+            max_attempts=self.outbox_max_attempts,
+        )
+
+    async def get_outbox_message(self, message_id: str) -> OutboxMessage | None:
+        return await self.outbox_repo.get(message_id)
+
+    async def send_emails_batch(self, emails: list[EmailCreate]) -> list[SendResult]:
+        """Send a burst of emails through the mail client's batched path."""
+        logger.info(f"Sending batch of {len(emails)} emails")
+        results = await self.mail_client.send_emails_batch(emails)
+        if self.contact_writer is not None:
+            recipients = {
+                recipient
+                for result in results
+                if result.sent
+                for recipient in emails[result.index].recipients
+            }
+            await self.contact_writer.record_send(self.user_email, recipients)
+        return results
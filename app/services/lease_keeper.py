@@ -0,0 +1,88 @@
+# app/services/lease_keeper.py
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+import os
+import socket
+from typing import TypeVar
+import uuid
+
+from app.db.base import ILeaseRepository, LeaseLostError
+from app.schemas.lease import Lease
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def replica_id() -> str:
+    """Identity of this process among every replica sharing the database."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaseKeeper:
+    """Acquires leases for this replica and keeps them alive while work runs.
+
+    A holder that dies simply stops renewing; once ``ttl_seconds`` pass the
+    lease can be acquired by another replica.
+    """
+
+    def __init__(
+        self,
+        lease_repo: ILeaseRepository,
+        owner: str | None = None,
+        ttl_seconds: float = 120,
+        renew_interval_seconds: float | None = None,
+    ):
+        self.lease_repo = lease_repo
+        self.owner = owner or replica_id()
+        self.ttl_seconds = ttl_seconds
+        self.renew_interval_seconds = renew_interval_seconds or ttl_seconds / 3
+
+    async def acquire(self, name: str) -> Lease | None:
+        return await self.lease_repo.acquire(name, self.owner, self.ttl_seconds)
+
+    async def run(self, lease: Lease, work: Callable[[], Awaitable[T]]) -> T:
+        """Run ``work`` while heartbeating ``lease``, then release it.
+
+        If a renewal fails the work is cancelled and LeaseLostError raised,
+        so a replica that lost its lease stops instead of racing the new holder.
+        """
+        task = asyncio.ensure_future(work())
+        lost = asyncio.Event()
+        heartbeat = asyncio.create_task(self._heartbeat(lease, task, lost))
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if lost.is_set():
+                raise LeaseLostError(f"Lease {lease.name} lost while working") from None
+            raise
+        finally:
+            heartbeat.cancel()
+            task.cancel()
+            if not lost.is_set():
+                try:
+                    await self.lease_repo.release(lease)
+                except Exception as e:
+                    # It expires on its own after the TTL
+                    logger.warning(f"Could not release lease {lease.name}: {e}")
+
+    async def _heartbeat(
+        self,
+        lease: Lease,
+        task: asyncio.Future,
+        lost: asyncio.Event,
+    ) -> None:
+        while True:
+            await asyncio.sleep(self.renew_interval_seconds)
+            try:
+                renewed = await self.lease_repo.renew(lease, self.ttl_seconds)
+            except Exception as e:
+                # Keep working, the next beat may get through before the TTL runs out
+                logger.warning(f"Could not renew lease {lease.name}: {e}")
+                continue
+            if renewed is None:
+                lost.set()
+                task.cancel()
+                return
+            lease = renewed
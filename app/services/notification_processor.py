@@ -0,0 +1,126 @@
+# app/services/notification_processor.py
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+from typing import Any
+
+from app.services.email_manager import EmailManager
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationProcessor:
+    """In-memory queue of changed message ids, drained by asyncio workers.
+
+    Workers take up to ``batch_size`` notifications at a time and fetch only
+    those messages. Anything lost (full queue, failed fetch, restart) is left
+    to ``on_gap``, a full sync of the mailbox, and to the polling fallback.
+    """
+
+    def __init__(
+        self,
+        manager_factory: Callable[[str], EmailManager],
+        workers: int = 2,
+        queue_size: int = 10000,
+        batch_size: int = 20,
+        on_gap: Callable[[str], Awaitable[Any]] | None = None,
+    ):
+        self.manager_factory = manager_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.on_gap = on_gap
+        self.queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue(maxsize=queue_size)
+        self._tasks: list[asyncio.Task] = []
+        self._gap_tasks: set[asyncio.Task] = set()
+
+        self.received_count = 0
+        self.stored_count = 0
+        self.dropped_count = 0
+        self.failed_count = 0
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"notification-worker-{n}")
+            for n in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} notification workers")
+
+    async def stop(self) -> None:
+        for task in [*self._tasks, *self._gap_tasks]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._gap_tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, mailbox: str, message_id: str) -> bool:
+        self.received_count += 1
+        try:
+            self.queue.put_nowait((mailbox, message_id))
+            return True
+        except asyncio.QueueFull:
+            self.dropped_count += 1
+            logger.warning(f"Notification queue full, dropping change of {message_id}")
+            self.request_resync(mailbox)
+            return False
+
+    def request_resync(self, mailbox: str) -> None:
+        """Catch up on ``mailbox`` with a regular sync, e.g. after missed changes."""
+        if self.on_gap is None:
+            return
+        task = asyncio.create_task(self._resync(mailbox))
+        self._gap_tasks.add(task)
+        task.add_done_callback(self._gap_tasks.discard)
+
+    async def _resync(self, mailbox: str) -> None:
+        try:
+            await self.on_gap(mailbox)
+        except Exception as e:
+            logger.error(f"Catch-up sync of {mailbox} failed: {e}")
+
+    async def _next_batch(self) -> list[tuple[str, str]]:
+        batch = [await self.queue.get()]
+        while len(batch) < self.batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self.process(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def process(self, batch: list[tuple[str, str]]) -> None:
+        by_mailbox: dict[str, dict[str, None]] = {}
+        for mailbox, message_id in batch:
+            # An ordered set: a burst of updates to one message is fetched once
+            by_mailbox.setdefault(mailbox, {})[message_id] = None
+
+        for mailbox, ids in by_mailbox.items():
+            try:
+                manager = self.manager_factory(mailbox)
+                stats = await manager.store_messages_by_id(list(ids))
+                self.stored_count += stats.stored
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed_count += len(ids)
+                logger.error(f"Storing notified messages of {mailbox} failed: {e}")
+                self.request_resync(mailbox)
+
+    async def drain(self) -> None:
+        """Wait until every queued notification has been processed."""
+        await self.queue.join()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": sum(not task.done() for task in self._tasks),
+            "queue_depth": self.queue.qsize(),
+            "received_count": self.received_count,
+            "stored_count": self.stored_count,
+            "dropped_count": self.dropped_count,
+            "failed_count": self.failed_count,
+        }
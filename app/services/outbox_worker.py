@@ -0,0 +1,187 @@
+# app/services/outbox_worker.py
+import asyncio
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+import logging
+import random
+from typing import Any
+import uuid
+
+from app.auth.base import TokenAcquisitionError
+from app.db.base import IOutboxRepository
+from app.schemas.email import EmailCreate
+from app.schemas.outbox import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxWorkerPool:
+    """asyncio workers that lease queued mail from the outbox and send it."""
+
+    def __init__(
+        self,
+        outbox_repo: IOutboxRepository,
+        send: Callable[[str, EmailCreate], Awaitable[bool]],
+        workers: int = 4,
+        lease_seconds: float = 60,
+        poll_interval_seconds: float = 2,
+        min_backoff_seconds: float = 2,
+        max_backoff_seconds: float = 300,
+    ):
+        self.outbox_repo = outbox_repo
+        self.send = send
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.min_backoff_seconds = min_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+        self.sent_count = 0
+        self.retry_count = 0
+        self.failed_count = 0
+        self.last_error: str | None = None
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(
+                self._run(f"outbox-{uuid.uuid4().hex[:8]}-{n}"),
+                name=f"outbox-worker-{n}",
+            )
+            for n in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} outbox workers")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        # A cancelled worker's message is picked up again once its lease expires
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._tasks:
+            logger.info("Outbox workers stopped")
+        self._tasks = []
+
+    def wake(self) -> None:
+        """Signal idle workers that new mail was queued."""
+        self._wakeup.set()
+
+    def _backoff(self, attempts: int) -> float:
+        # Exponential backoff with full jitter
+        floor = self.min_backoff_seconds
+        cap = min(self.max_backoff_seconds, floor * 2 ** max(attempts - 1, 0))
+        return random.uniform(floor, max(cap, floor))
+
+    async def process_one(self, owner: str) -> bool:
+        """Claim and send one message; False when nothing was due."""
+        message = await self.outbox_repo.claim(owner, self.lease_seconds)
+        if message is None:
+            return False
+
+        try:
+            sent = await self._send_leased(message, owner)
+            if sent is None:
+                logger.error(
+                    f"Lost lease on outbox message {message.id} mid-send, "
+                    "leaving it to its new owner",
+                )
+                return True
+            error = None if sent else "Graph rejected the message"
+        except TokenAcquisitionError as e:
+            # Not the message's fault, wait for the login without spending an attempt
+            await self._retry(message, owner, str(e), attempted=False)
+            return True
+        except Exception as e:
+            sent, error = False, str(e)
+
+        if sent:
+            await self.outbox_repo.mark_sent(message.id, owner)
+            self.sent_count += 1
+            logger.info(f"Sent outbox message {message.id}")
+        elif message.attempts + 1 >= message.max_attempts:
+            await self.outbox_repo.mark_failed(message.id, owner, error)
+            self.failed_count += 1
+            self.last_error = error
+            logger.error(f"Giving up on outbox message {message.id}: {error}")
+        else:
+            await self._retry(message, owner, error, attempted=True)
+        return True
+
+    async def _send_leased(self, message: OutboxMessage, owner: str) -> bool | None:
+        """Send while renewing the lease; None when the lease was lost first.
+
+        sendMail is not idempotent: a lease running out mid-send (rate-limit
+        waits, retries, slow reads) would let another worker send it again.
+        """
+        send = asyncio.ensure_future(self.send(message.mailbox, message.email))
+        keeper = asyncio.ensure_future(self._keep_lease(message, owner))
+        try:
+            await asyncio.wait({send, keeper}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            keeper.cancel()
+            lease_lost = not send.done()
+            if lease_lost:
+                send.cancel()
+                await asyncio.gather(send, return_exceptions=True)
+        return None if lease_lost else send.result()
+
+    async def _keep_lease(self, message: OutboxMessage, owner: str) -> None:
+        """Renew every third of the lease; returns once it is lost."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await self.outbox_repo.renew_lease(
+                    message.id, owner, self.lease_seconds,
+                )
+                if not renewed:
+                    return
+            except Exception as e:
+                # Keep trying: the lease still has two thirds left
+                logger.warning(
+                    f"Could not renew lease on outbox message {message.id}: {e}",
+                )
+
+    async def _retry(
+        self,
+        message: OutboxMessage,
+        owner: str,
+        error: str,
+        attempted: bool,
+    ) -> None:
+        delay = self._backoff(message.attempts + 1)
+        await self.outbox_repo.mark_retry(
+            message.id,
+            owner,
+            error,
+            datetime.now(UTC) + timedelta(seconds=delay),
+            attempted=attempted,
+        )
+        self.retry_count += 1
+        self.last_error = error
+        logger.warning(f"Retrying outbox message {message.id} in {delay:.1f}s: {error}")
+
+    async def _run(self, owner: str) -> None:
+        while True:
+            try:
+                if await self.process_one(owner):
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox worker {owner} failed: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": sum(not task.done() for task in self._tasks),
+            "sent_count": self.sent_count,
+            "retry_count": self.retry_count,
+            "failed_count": self.failed_count,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,159 @@
+# app/services/parse_pool.py
+import asyncio
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import logging
+import multiprocessing
+import time
+from typing import Any
+
+from app.mail.base import MessagePage
+from app.mail.html_text import body_text
+from app.mail.message_parser import MessageError, ParsedPage, parse_messages
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_chunk(messages: list[dict]) -> ParsedPage:
+    """Runs in a worker process: validate and fill in ``bodyText``."""
+    parsed = parse_messages(messages)
+    for document in parsed.documents:
+        if document.get("bodyText") is None:
+            body = document.get("body") or {}
+            document["bodyText"] = body_text(
+                body.get("contentType"), body.get("content")
+            )
+    return parsed
+
+
+class ParsePool:
+    """Process pool that turns raw Graph pages into documents ready to store.
+
+    Validation and HTML-to-text extraction are CPU bound; on a backfill they
+    would otherwise serialize on the event loop. Each page is split into
+    chunks of ``chunk_size`` messages spread over ``workers`` processes.
+    ``pipeline`` keeps fetching the next pages while earlier ones are parsed
+    and written, up to ``max_pages_in_flight`` ahead.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        chunk_size: int = 50,
+        max_pages_in_flight: int | None = None,
+    ):
+        self.workers = workers
+        self.chunk_size = max(1, chunk_size)
+        self.max_pages_in_flight = max_pages_in_flight or 2 * workers
+        self._executor: ProcessPoolExecutor | None = None
+
+        self.pages = 0
+        self.messages = 0
+        self.chunks = 0
+        self.parse_seconds = 0.0
+        self.broken_count = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs Motor and httpx threads isn't safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Started parse pool with {self.workers} workers")
+        return self._executor
+
+    async def parse(self, messages: list[dict]) -> ParsedPage:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        offsets = range(0, len(messages), self.chunk_size)
+        started = time.monotonic()
+        try:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(
+                    executor,
+                    _parse_chunk,
+                    messages[offset:offset + self.chunk_size],
+                )
+                for offset in offsets
+            ))
+        except BrokenProcessPool as e:
+            # A worker died (OOM kill, crash): start a fresh pool for the next
+            # page and parse this one here rather than fail the sync
+            self.broken_count += 1
+            logger.error(f"Parse pool broke, restarting it: {e}")
+            self._discard(executor)
+            offsets, results = [0], [_parse_chunk(messages)]
+        self.parse_seconds += time.monotonic() - started
+        self.pages += 1
+        self.messages += len(messages)
+        self.chunks += len(results)
+
+        page = ParsedPage()
+        for offset, chunk in zip(offsets, results):
+            page.documents.extend(chunk.documents)
+            page.errors.extend(
+                MessageError(offset + error.index, error.message_id, error.errors)
+                for error in chunk.errors
+            )
+        return page
+
+    async def pipeline(
+        self,
+        pages: AsyncIterator[MessagePage],
+    ) -> AsyncIterator[tuple[MessagePage, ParsedPage]]:
+        """Yield ``pages`` in order, parsed, while the next ones are fetched and parsed.
+
+        Close it (``contextlib.aclosing``) when stopping early so the fetch
+        behind it is cancelled.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_pages_in_flight)
+
+        async def produce() -> None:
+            try:
+                async for page in pages:
+                    parsed = asyncio.ensure_future(self.parse(page.messages))
+                    await queue.put((page, parsed))
+            except Exception as e:
+                await queue.put(e)
+            else:
+                await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (item := await queue.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                page, parsing = item
+                yield page, await parsing
+        finally:
+            producer.cancel()
+            while not queue.empty():
+                item = queue.get_nowait()
+                if isinstance(item, tuple):
+                    item[1].cancel()
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        # Pages parsing concurrently may have recreated it already
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("Parse pool stopped")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "chunk_size": self.chunk_size,
+            "running": self._executor is not None,
+            "pages": self.pages,
+            "messages": self.messages,
+            "chunks": self.chunks,
+            "parse_seconds": round(self.parse_seconds, 3),
+            "broken_count": self.broken_count,
+        }
@@ -0,0 +1,114 @@
+# app/services/poll_scheduler.py
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+import logging
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PollState:
+    interval_seconds: float
+    next_due: float = 0.0
+    throttled_count: int = 0
+    history: deque = field(default_factory=deque)
+
+
+class AdaptivePollScheduler:
+    """Per-mailbox polling interval that follows the observed mail arrival rate.
+
+    After every sync the interval is halved when messages arrived, grown by
+    half when the sync was empty and doubled when Graph throttled the mailbox
+    meanwhile, always within ``[min_seconds, max_seconds]``. Failed or skipped
+    syncs leave it unchanged.
+    """
+
+    def __init__(
+        self,
+        initial_seconds: float,
+        min_seconds: float = 30,
+        max_seconds: float = 900,
+        throttled_count: Callable[[str], int] | None = None,
+        history_size: int = 20,
+    ):
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.initial_seconds = self._clamp(initial_seconds)
+        self.throttled_count = throttled_count
+        self.history_size = history_size
+        self._states: dict[str, PollState] = {}
+
+    def _clamp(self, seconds: float) -> float:
+        return min(self.max_seconds, max(self.min_seconds, seconds))
+
+    def _state(self, mailbox: str) -> PollState:
+        state = self._states.get(mailbox)
+        if state is None:
+            state = self._states[mailbox] = PollState(
+                interval_seconds=self.initial_seconds,
+                throttled_count=(
+                    self.throttled_count(mailbox) if self.throttled_count else 0
+                ),
+                history=deque(maxlen=self.history_size),
+            )
+        return state
+
+    def due(self, mailboxes: list[str]) -> list[str]:
+        """The mailboxes whose next poll is due; unseen mailboxes are due at once."""
+        now = time.monotonic()
+        return [
+            mailbox for mailbox in mailboxes if self._state(mailbox).next_due <= now
+        ]
+
+    def observe(self, mailbox: str, stored: int | None, failed: bool = False) -> float:
+        """Adjust ``mailbox``'s interval after a sync and schedule its next poll."""
+        state = self._state(mailbox)
+        throttled = False
+        if self.throttled_count is not None:
+            count = self.throttled_count(mailbox)
+            throttled = count > state.throttled_count
+            state.throttled_count = count
+
+        if throttled:
+            factor, reason = 2.0, "throttled"
+        elif failed or stored is None:
+            factor, reason = 1.0, "failed" if failed else "skipped"
+        elif stored > 0:
+            factor, reason = 0.5, "messages"
+        else:
+            factor, reason = 1.5, "empty"
+
+        previous = state.interval_seconds
+        state.interval_seconds = self._clamp(previous * factor)
+        state.next_due = time.monotonic() + state.interval_seconds
+        state.history.append({
+            "at": datetime.now(UTC),
+            "reason": reason,
+            "stored": stored,
+            "interval_seconds": state.interval_seconds,
+        })
+        if state.interval_seconds != previous:
+            logger.debug(
+                f"Poll interval of {mailbox}: {previous:.0f}s -> "
+                f"{state.interval_seconds:.0f}s ({reason})",
+            )
+        return state.interval_seconds
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "min_seconds": self.min_seconds,
+            "max_seconds": self.max_seconds,
+            "mailboxes": {
+                mailbox: {
+                    "interval_seconds": state.interval_seconds,
+                    "due_in_seconds": round(max(0.0, state.next_due - now), 1),
+                    "history": list(state.history),
+                }
+                for mailbox, state in self._states.items()
+            },
+        }
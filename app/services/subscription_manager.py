@@ -0,0 +1,200 @@
+# app/services/subscription_manager.py
+import asyncio
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+import hmac
+import logging
+from typing import Any
+
+from app.db.base import IMailboxRepository
+from app.mail.base import IMailClient
+from app.schemas.mailbox import Mailbox
+from app.services.lease_keeper import LeaseKeeper
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionManager:
+    """Keeps one Graph change-notification subscription alive per registered mailbox.
+
+    Subscriptions are renewed once less than a third of their lifetime is
+    left, and recreated when Graph has dropped them. Graph's lifecycle
+    notifications (sent to ``lifecycle_url``, the webhook by default) make
+    that happen right away instead of at the next renewal pass.
+    """
+
+    def __init__(
+        self,
+        mailbox_repo: IMailboxRepository,
+        client_factory: Callable[[str], IMailClient],
+        notification_url: str,
+        client_state: str,
+        ttl_minutes: int = 4200,
+        folder: str = "inbox",
+        lease_keeper: LeaseKeeper | None = None,
+        lifecycle_url: str | None = None,
+    ):
+        self.mailbox_repo = mailbox_repo
+        self.client_factory = client_factory
+        self.notification_url = notification_url
+        self.lifecycle_url = lifecycle_url or notification_url
+        self.client_state = client_state
+        self.ttl = timedelta(minutes=ttl_minutes)
+        self.folder = folder
+        self.lease_keeper = lease_keeper
+        self._mailbox_by_subscription: dict[str, str] = {}
+        # Lifecycle events handled off the webhook's request path
+        self._tasks: set[asyncio.Task] = set()
+
+        self.created_count = 0
+        self.renewed_count = 0
+        self.removed_count = 0
+        self.failure_count = 0
+        self.last_error: str | None = None
+
+    async def ensure_all(self) -> None:
+        """Create or renew the subscription of every enabled mailbox."""
+        if self.lease_keeper is None:
+            await self._ensure_all()
+            return
+        # One replica manages subscriptions, others would create duplicates
+        lease = await self.lease_keeper.acquire("subscriptions")
+        if lease is None:
+            return
+        await self.lease_keeper.run(lease, self._ensure_all)
+
+    async def _ensure_all(self) -> None:
+        for mailbox in await self.mailbox_repo.list_mailboxes():
+            try:
+                await self.ensure(mailbox)
+            except Exception as e:
+                self.failure_count += 1
+                self.last_error = str(e)
+                logger.error(f"Could not subscribe to {mailbox.address}: {e}")
+
+    async def ensure(self, mailbox: Mailbox, force: bool = False) -> None:
+        """Subscribe ``mailbox`` or renew its subscription.
+
+        ``force`` renews even a subscription that is still fresh.
+        """
+        now = datetime.now(UTC)
+        expires_at = mailbox.subscription_expires_at
+        if expires_at is not None and expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=UTC)
+        fresh = (
+            mailbox.subscription_id
+            and expires_at
+            and expires_at - now > self.ttl / 3
+        )
+        if fresh and not force:
+            self._mailbox_by_subscription[mailbox.subscription_id] = mailbox.address
+            return
+
+        client = self.client_factory(mailbox.address)
+        new_expiry = now + self.ttl
+        if mailbox.subscription_id:
+            renewed = await client.renew_subscription(
+                mailbox.subscription_id,
+                new_expiry,
+            )
+            if renewed is not None:
+                await self._save(mailbox.address, mailbox.subscription_id, new_expiry)
+                self.renewed_count += 1
+                logger.info(f"Renewed subscription of {mailbox.address}")
+                return
+            logger.warning(f"Subscription of {mailbox.address} is gone, recreating")
+
+        created = await client.create_subscription(
+            self.notification_url,
+            self.client_state,
+            new_expiry,
+            folder=self.folder,
+            lifecycle_url=self.lifecycle_url,
+        )
+        await self._save(mailbox.address, created["id"], new_expiry)
+        self.created_count += 1
+
+    def handle_lifecycle(self, address: str, subscription_id: str, event: str) -> None:
+        """Act on a lifecycle notification in the background.
+
+        The webhook has to answer Graph fast.
+        """
+        task = asyncio.create_task(
+            self._handle_lifecycle(address, subscription_id, event),
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _handle_lifecycle(
+        self,
+        address: str,
+        subscription_id: str,
+        event: str,
+    ) -> None:
+        try:
+            if event == "subscriptionRemoved":
+                # Forget it, or ensure() would trust the stored expiry for days
+                self._mailbox_by_subscription.pop(subscription_id, None)
+                await self.mailbox_repo.save_subscription(address, None, None)
+                self.removed_count += 1
+                logger.warning(f"Graph removed the subscription of {address}")
+            elif event == "reauthorizationRequired":
+                logger.info(f"Reauthorizing the subscription of {address}")
+            else:
+                # "missed": the subscription itself is fine
+                return
+            await self._resubscribe(address)
+        except Exception as e:
+            self.failure_count += 1
+            self.last_error = str(e)
+            logger.error(f"Could not handle {event} for {address}: {e}")
+
+    async def _resubscribe(self, address: str) -> None:
+        """Renew (which also reauthorizes) or recreate ``address``'s subscription."""
+        mailbox = await self.mailbox_repo.get_mailbox(address)
+        if mailbox is None:
+            return
+        if self.lease_keeper is None:
+            await self.ensure(mailbox, force=True)
+            return
+        lease = await self.lease_keeper.acquire("subscriptions")
+        if lease is None:
+            # The replica holding it manages subscriptions; its next pass fixes this one
+            return
+        await self.lease_keeper.run(lease, lambda: self.ensure(mailbox, force=True))
+
+    async def _save(
+        self,
+        address: str,
+        subscription_id: str,
+        expires_at: datetime,
+    ) -> None:
+        await self.mailbox_repo.save_subscription(address, subscription_id, expires_at)
+        self._mailbox_by_subscription[subscription_id] = address
+
+    def verify_client_state(self, client_state: str | None) -> bool:
+        if client_state is None:
+            return False
+        return hmac.compare_digest(client_state, self.client_state)
+
+    async def mailbox_for(self, subscription_id: str | None) -> str | None:
+        """Mailbox a notification belongs to, also for other replicas' subscriptions."""
+        if not subscription_id:
+            return None
+        address = self._mailbox_by_subscription.get(subscription_id)
+        if address is None:
+            mailbox = await self.mailbox_repo.find_by_subscription(subscription_id)
+            if mailbox is None:
+                return None
+            address = self._mailbox_by_subscription[subscription_id] = mailbox.address
+        return address
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "subscriptions": len(self._mailbox_by_subscription),
+            "created_count": self.created_count,
+            "renewed_count": self.renewed_count,
+            "removed_count": self.removed_count,
+            "failure_count": self.failure_count,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,59 @@
+# app/services/sync_coordinator.py
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SyncCoordinator:
+    """Single-flight guard: concurrent sync triggers for a key share one run.
+
+    The first caller starts the work; anyone arriving while it is in flight
+    awaits the same result (or exception) instead of starting another run.
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.started_count = 0
+        self.coalesced_count = 0
+        self.skipped_count = 0
+
+    def is_running(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def run(self, key: str, work: Callable[[], Awaitable[T]]) -> T:
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced_count += 1
+            logger.info(f"Sync of {key} already running, joining it")
+            return await asyncio.shield(inflight)
+
+        task = asyncio.ensure_future(work())
+        self._inflight[key] = task
+        self.started_count += 1
+        task.add_done_callback(lambda done: self._finished(key, done))
+        # Shielded so one caller going away doesn't cancel the run for the others
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            task.exception()
+
+    def record_skip(self, key: str) -> None:
+        self.skipped_count += 1
+        logger.info(f"Previous {key} run still in progress, skipping this tick")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "in_flight": sorted(self._inflight),
+            "started_count": self.started_count,
+            "coalesced_count": self.coalesced_count,
+            "skipped_count": self.skipped_count,
+        }
@@ -0,0 +1,298 @@
+# app/services/sync_engine.py
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from functools import partial
+import logging
+import time
+from typing import Any
+
+from app.db.base import IMailboxRepository, LeaseLostError
+from app.schemas.lease import Lease
+from app.schemas.mailbox import Mailbox
+from app.schemas.sync import SyncRunStats
+from app.services.email_manager import EmailManager
+from app.services.lease_keeper import LeaseKeeper
+from app.services.poll_scheduler import AdaptivePollScheduler
+from app.services.sync_coordinator import SyncCoordinator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MailboxSyncState:
+    running: bool = False
+    runs: int = 0
+    failures: int = 0
+    # Runs skipped because another replica held the mailbox's lease
+    lease_skips: int = 0
+    lease_losses: int = 0
+    last_started_at: datetime | None = None
+    last_success_at: datetime | None = None
+    last_duration_ms: float | None = None
+    last_stored: int | None = None
+    last_error: str | None = None
+
+
+class MailboxSyncEngine:
+    """Syncs every enabled mailbox of the registry, ``max_concurrency`` at a time.
+
+    ``run_once`` doesn't wait for the syncs it starts: each mailbox syncs in
+    its own task, so one long backfill only holds its own slot, and a
+    mailbox still syncing is skipped by the next ticks instead of queued
+    twice. The start of the queue rotates on every run so that, under the
+    cap, the same mailboxes don't always get the first slots. With a
+    ``lease_keeper`` only the replica holding a mailbox's lease
+    (``lease_scope="mailbox"``), or the single global lease (``"global"``),
+    syncs it. With a ``poll_scheduler`` ``run_once(due_only=True)`` only
+    syncs the mailboxes whose adaptive interval has elapsed.
+    """
+
+    def __init__(
+        self,
+        mailbox_repo: IMailboxRepository,
+        manager_factory: Callable[[str], EmailManager],
+        max_concurrency: int = 4,
+        lease_keeper: LeaseKeeper | None = None,
+        lease_scope: str = "mailbox",
+        coordinator: SyncCoordinator | None = None,
+        poll_scheduler: AdaptivePollScheduler | None = None,
+    ):
+        self.mailbox_repo = mailbox_repo
+        self.manager_factory = manager_factory
+        self.max_concurrency = max_concurrency
+        self.lease_keeper = lease_keeper
+        self.lease_scope = lease_scope
+        self.coordinator = coordinator or SyncCoordinator()
+        self.poll_scheduler = poll_scheduler
+        self.global_lease_skips = 0
+        # Held while this replica acquires the global lease: re-acquiring it
+        # would bump its token and fence out the holder's own writes
+        self._global_lock = asyncio.Lock()
+        # The global lease while this replica leads, until its syncs drain
+        self._global_fence: Lease | None = None
+        self._leader: asyncio.Task | None = None
+        # Shared by every tick, so the cap holds across overlapping runs
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._cursor = 0
+        self._states: dict[str, MailboxSyncState] = {}
+
+    def _round_robin(self, mailboxes: list[Mailbox]) -> list[Mailbox]:
+        if not mailboxes:
+            return []
+        start = self._cursor % len(mailboxes)
+        self._cursor += 1
+        return mailboxes[start:] + mailboxes[:start]
+
+    async def run_once(self, due_only: bool = False) -> list[str]:
+        """Start syncing every enabled mailbox that isn't syncing yet.
+
+        Returns the addresses it started. The syncs run in the background
+        (``drain`` waits for them); a failing mailbox doesn't stop the others.
+        """
+        if self.lease_keeper is None or self.lease_scope != "global":
+            return await self._dispatch(None, due_only)
+        if self._global_fence is not None:
+            # This replica leads already: add to the syncs running under its lease
+            return await self._dispatch(self._global_fence, due_only)
+        if not self._global_lock.locked():
+            async with self._global_lock:
+                lease = await self.lease_keeper.acquire("sync:all")
+                if lease is not None:
+                    self._global_fence = lease
+            if lease is not None:
+                started = await self._dispatch(lease, due_only)
+                self._leader = asyncio.create_task(self._lead(lease))
+                return started
+        self.global_lease_skips += 1
+        logger.info("Another sync holds the global sync lease, skipping")
+        return []
+
+    async def _lead(self, lease: Lease) -> None:
+        """Keep the global lease alive until every sync started under it is done."""
+        try:
+            await self.lease_keeper.run(lease, self.drain)
+        except LeaseLostError as e:
+            # Syncs still running under it get their writes fenced off
+            logger.error(f"Lost the global sync lease: {e}")
+        finally:
+            self._global_fence = None
+
+    async def _dispatch(self, fence: Lease | None, due_only: bool) -> list[str]:
+        mailboxes = await self.mailbox_repo.list_mailboxes()
+        if due_only and self.poll_scheduler is not None:
+            addresses = [mailbox.address for mailbox in mailboxes]
+            due = set(self.poll_scheduler.due(addresses))
+            mailboxes = [mailbox for mailbox in mailboxes if mailbox.address in due]
+        started = []
+        for mailbox in self._round_robin(mailboxes):
+            address = mailbox.address
+            key = f"mailbox:{address}"
+            if address in self._in_flight or self.coordinator.is_running(key):
+                self.coordinator.record_skip(key)
+                continue
+            task = asyncio.ensure_future(
+                self.coordinator.run(key, partial(self._queued, address, fence)),
+            )
+            self._in_flight[address] = task
+            task.add_done_callback(partial(self._settled, address))
+            started.append(address)
+        if started:
+            logger.info(f"Started syncing {len(started)}/{len(mailboxes)} mailboxes")
+        return started
+
+    async def _queued(self, address: str, fence: Lease | None) -> SyncRunStats | None:
+        async with self._slots:
+            return await self._sync_leased(address, fence)
+
+    def _settled(self, address: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(address) is task:
+            del self._in_flight[address]
+        if not task.cancelled():
+            # Already logged and recorded against the mailbox
+            task.exception()
+
+    async def drain(self) -> None:
+        """Wait for the syncs started by ``run_once``, and any started meanwhile."""
+        while self._in_flight:
+            await asyncio.wait(list(self._in_flight.values()))
+
+    async def sync_mailbox(
+        self,
+        address: str,
+        fence: Lease | None = None,
+    ) -> SyncRunStats | None:
+        """Sync one mailbox, joining the run already in flight for it if any.
+
+        Returns None when another replica holds the mailbox's lease; sync
+        errors propagate to every caller sharing the run.
+        """
+        return await self.coordinator.run(
+            f"mailbox:{address}",
+            lambda: self._sync_leased(address, fence),
+        )
+
+    async def _sync_leased(
+        self,
+        address: str,
+        fence: Lease | None,
+    ) -> SyncRunStats | None:
+        state = self._states.setdefault(address, MailboxSyncState())
+        if fence is not None or self.lease_keeper is None:
+            return await self._sync(address, state, fence)
+        if self.lease_scope == "global":
+            # An on-demand sync (GET /emails/fetch) outside the scheduled run takes
+            # the same lease, or it could race the leader and move the checkpoint back
+            if self._global_fence is not None or self._global_lock.locked():
+                self._lease_skip(address, state)
+                return None
+            async with self._global_lock:
+                fence = await self.lease_keeper.acquire("sync:all")
+                if fence is None:
+                    self._lease_skip(address, state)
+                    return None
+                return await self._sync_fenced(address, state, fence)
+
+        fence = await self.lease_keeper.acquire(f"sync:{address}")
+        if fence is None:
+            self._lease_skip(address, state)
+            return None
+        return await self._sync_fenced(address, state, fence)
+
+    def _lease_skip(self, address: str, state: MailboxSyncState) -> None:
+        state.lease_skips += 1
+        logger.info(f"Another sync holds the lease for {address}, skipping")
+        if self.poll_scheduler is not None:
+            self.poll_scheduler.observe(address, None)
+
+    async def _sync_fenced(
+        self,
+        address: str,
+        state: MailboxSyncState,
+        fence: Lease,
+    ) -> SyncRunStats | None:
+        try:
+            return await self.lease_keeper.run(
+                fence,
+                lambda: self._sync(address, state, fence),
+            )
+        except LeaseLostError as e:
+            state.lease_losses += 1
+            logger.error(f"Sync of {address} stopped: {e}")
+            raise
+
+    async def _sync(
+        self,
+        address: str,
+        state: MailboxSyncState,
+        fence: Lease | None,
+    ) -> SyncRunStats | None:
+        state.running = True
+        state.last_started_at = datetime.now(UTC)
+        started = time.perf_counter()
+        stats, error, failure = None, None, None
+        try:
+            manager = self.manager_factory(address)
+            stats = await manager.sync_and_store_emails(fence=fence)
+        except Exception as e:
+            failure = e
+            error = str(e) or type(e).__name__
+            logger.error(f"Sync of {address} failed: {error}")
+        finally:
+            state.running = False
+            state.runs += 1
+            state.last_duration_ms = (time.perf_counter() - started) * 1000
+
+        if error is None:
+            state.last_success_at = datetime.now(UTC)
+            state.last_stored = stats.stored if stats else None
+        else:
+            state.failures += 1
+        state.last_error = error
+        if self.poll_scheduler is not None:
+            self.poll_scheduler.observe(
+                address,
+                stats.stored if stats else None,
+                failed=error is not None,
+            )
+        try:
+            await self.mailbox_repo.record_sync(
+                address, state.last_started_at, stats, error,
+            )
+        except Exception as e:
+            logger.warning(f"Could not record sync of {address}: {e}")
+        if failure is not None:
+            raise failure
+        return stats
+
+    def stats(self) -> dict[str, Any]:
+        now = datetime.now(UTC)
+        return {
+            "max_concurrency": self.max_concurrency,
+            "lease_scope": self.lease_scope if self.lease_keeper else None,
+            "global_lease_skips": self.global_lease_skips,
+            "in_flight": sorted(self._in_flight),
+            "single_flight": self.coordinator.stats(),
+            "polling": self.poll_scheduler.stats() if self.poll_scheduler else None,
+            "mailboxes": {
+                address: {
+                    "running": state.running,
+                    "runs": state.runs,
+                    "failures": state.failures,
+                    "lease_skips": state.lease_skips,
+                    "lease_losses": state.lease_losses,
+                    "last_success_at": state.last_success_at,
+                    # Seconds since this mailbox was last brought up to date
+                    "lag_seconds": (
+                        (now - state.last_success_at).total_seconds()
+                        if state.last_success_at else None
+                    ),
+                    "last_duration_ms": state.last_duration_ms,
+                    "last_stored": state.last_stored,
+                    "last_error": state.last_error,
+                }
+                for address, state in self._states.items()
+            },
+        }
@@ -0,0 +1,193 @@
+"""Per-message model parsing vs. the batched parse_messages, on synthetic pages.
+
+Times what a sync does with each page before the bulk write: the old path
+builds ``EmailInDB(**raw)`` per message and dumps it again with
+``model_dump(by_alias=True)``, the new one validates the page in one
+``TypeAdapter`` call straight into documents. "batched, cold" clears the
+address cache before every page to separate the two gains; ``--contacts``
+sets how many distinct correspondents the pages draw from. With
+``--workers N`` the pages also go through ParsePool's pipeline, which
+additionally extracts ``bodyText`` like a sync does. No MongoDB or network
+needed.
+
+    python scripts/bench/parse_page.py --page-size 50 --pages 200 \
+        --contacts 100 --invalid 0.01
+"""
+import argparse
+import asyncio
+from pathlib import Path
+import random
+import sys
+import time
+import warnings
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+warnings.filterwarnings("ignore", category=UserWarning)
+
+from app.mail.base import MessagePage  # noqa: E402
+from app.mail.message_parser import _normalized_address, parse_messages  # noqa: E402
+from app.schemas.email import EmailInDB  # noqa: E402
+from app.services.parse_pool import ParsePool  # noqa: E402
+
+
+def _recipient(n: int) -> dict:
+    return {
+        "emailAddress": {"name": f"Person {n}", "address": f"person{n}@example.com"},
+    }
+
+
+def _message(i: int, rng: random.Random, contacts: int, invalid: float) -> dict:
+    at = f"2024-05-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:00Z"
+    message = {
+        "@odata.etag": f'W/"CQAAABYAAAB{i}"',
+        "id": f"AAMkAGI2TG93AAA{i:08d}=",
+        "createdDateTime": at,
+        "lastModifiedDateTime": at,
+        "changeKey": f"CQAAABYAAAB{i}",
+        "categories": ["Blue category"] if i % 7 == 0 else [],
+        "receivedDateTime": at,
+        "sentDateTime": at,
+        "hasAttachments": i % 5 == 0,
+        "internetMessageId": f"<msg{i}@example.com>",
+        "subject": f"Quarterly report {i}",
+        "bodyPreview": "Hi team, please find attached the quarterly numbers. " * 2,
+        "importance": "normal",
+        "parentFolderId": "AQMkAGI2TG93AAA-inbox",
+        "conversationId": f"AAQkAGI2TG93conv{i // 4}",
+        "conversationIndex": "AQHSxyz==",
+        "isDeliveryReceiptRequested": False,
+        "isReadReceiptRequested": False,
+        "isRead": i % 3 == 0,
+        "isDraft": False,
+        "webLink": f"https://outlook.office365.com/owa/?ItemID=AAMk{i}",
+        "inferenceClassification": "focused",
+        "body": {"contentType": "html", "content": "<p>Hi team,</p>" * 20},
+        "sender": _recipient(rng.randrange(contacts)),
+        "from": _recipient(rng.randrange(contacts)),
+        "toRecipients": [
+            _recipient(rng.randrange(contacts)) for _ in range(rng.randint(1, 4))
+        ],
+        "ccRecipients": [
+            _recipient(rng.randrange(contacts)) for _ in range(rng.randint(0, 3))
+        ],
+        "bccRecipients": [],
+        "replyTo": [],
+        "flag": {"flagStatus": "notFlagged"},
+    }
+    if rng.random() < invalid:
+        message["receivedDateTime"] = "not a date"
+    return message
+
+
+def parse_per_message(messages: list[dict]) -> list[dict]:
+    documents = []
+    for raw in messages:
+        try:
+            documents.append(EmailInDB(**raw).model_dump(by_alias=True))
+        except Exception:
+            pass
+    return documents
+
+
+def parse_batched(messages: list[dict]) -> list[dict]:
+    return parse_messages(messages).documents
+
+
+def parse_batched_cold(messages: list[dict]) -> list[dict]:
+    _normalized_address.cache_clear()
+    return parse_messages(messages).documents
+
+
+def _pool_parser(pool: ParsePool):
+    async def source(pages):
+        for page in pages:
+            yield MessagePage(messages=page)
+
+    async def run(pages):
+        async for _ in pool.pipeline(source(pages)):
+            pass
+
+    # Times all pages at once so the pool can overlap them, like a backfill
+    return lambda pages: asyncio.run(run(pages))
+
+
+def _time(parse, pages: list[list[dict]], rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for page in pages:
+            parse(page)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _time_once(run_all, pages: list[list[dict]]) -> float:
+    started = time.perf_counter()
+    run_all(pages)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--contacts", type=int, default=100)
+    parser.add_argument(
+        "--invalid", type=float, default=0.0, help="share of invalid messages"
+    )
+    parser.add_argument("--workers", type=int, default=0, help="also time a ParsePool")
+    parser.add_argument("--chunk-size", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [
+        [
+            _message(p * args.page_size + i, rng, args.contacts, args.invalid)
+            for i in range(args.page_size)
+        ]
+        for p in range(args.pages)
+    ]
+    total = args.page_size * args.pages
+
+    # Both paths must produce the same documents before their speed means anything
+    for page in pages[:10]:
+        assert parse_per_message(page) == parse_batched(page)
+
+    results = {}
+    variants = (
+        ("per-message", parse_per_message),
+        ("batched, cold", parse_batched_cold),
+        ("batched", parse_batched),
+    )
+    for name, parse in variants:
+        parse(pages[0])  # warm up
+        best = min(_time(parse, pages, args.rounds))
+        results[name] = best
+        print(
+            f"{name:>13}: {best * 1000:8.1f} ms for {total} messages "
+            f"({total / best:,.0f} msg/s, {best / args.pages * 1e6:,.0f} us/page)",
+        )
+    if args.workers:
+        pool = ParsePool(args.workers, chunk_size=args.chunk_size)
+        run_all = _pool_parser(pool)
+        run_all(pages[: args.workers])  # warm up: spawns the workers
+        name = f"pool x{args.workers}"
+        best = min(_time_once(run_all, pages) for _ in range(args.rounds))
+        results[name] = best
+        print(
+            f"{name:>13}: {best * 1000:8.1f} ms for {total} messages "
+            f"({total / best:,.0f} msg/s, {best / args.pages * 1e6:,.0f} us/page)",
+        )
+        pool.shutdown()
+
+    baseline = results["per-message"]
+    for name in [name for name in results if name != "per-message"]:
+        speedup = baseline / results[name]
+        print(f"{name:>13}: {speedup:.1f}x faster (best of {args.rounds} rounds)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Latency of GET /emails/search's query against a local MongoDB.
+
+Seeds a throwaway database with synthetic emails (1M by default), builds
+the declared email indexes the same way startup does, then times first
+pages and deep pages of text searches through MongoEmailRepository.
+
+    python scripts/bench/search_latency.py --uri mongodb://localhost:27017 \
+        --docs 1000000
+
+The database is reused between runs when it already holds enough
+documents; pass --drop to reseed.
+"""
+import argparse
+import asyncio
+from datetime import UTC, datetime, timedelta
+import os
+from pathlib import Path
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from app.db.indexes import reconcile_indexes  # noqa: E402
+from app.db.mongo_email_repository import EMAIL_INDEXES, MongoEmailRepository  # noqa: E402
+
+WORDS = [
+    "invoice", "meeting", "quarterly", "report", "budget", "review", "deadline",
+    "project", "update", "contract", "release", "customer", "renewal", "travel",
+    "expense", "offsite", "hiring", "roadmap", "incident", "migration", "security",
+    "audit", "payroll", "launch", "feedback", "survey", "vendor", "shipment",
+    "forecast", "pipeline", "webinar", "training",
+]
+QUERIES = [
+    "invoice",
+    "quarterly report",
+    "security audit",
+    "travel expense",
+    "roadmap launch",
+]
+
+
+class _Manager:
+    def __init__(self, db):
+        self.db = db
+
+    async def connect(self):
+        return self.db
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    # Skewed choice so some terms are common and others rare, like real mail
+    return " ".join(
+        WORDS[min(int(rng.paretovariate(1.2)) - 1, len(WORDS) - 1)] for _ in range(n)
+    )
+
+
+def _document(rng: random.Random, i: int, start: datetime) -> dict:
+    received = start + timedelta(seconds=i * 7)
+    body = _sentence(rng, 60)
+    return {
+        "_id": f"bench-{i:08d}",
+        "subject": _sentence(rng, 6),
+        "bodyPreview": body[:255],
+        "bodyText": body,
+        "body": {"contentType": "html", "content": f"<p>{body}</p>"},
+        "receivedDateTime": received,
+        "sentDateTime": received,
+        "sender": {
+            "emailAddress": {"name": "Bench", "address": f"user{i % 5000}@example.com"},
+        },
+        "isRead": rng.random() < 0.7,
+    }
+
+
+async def seed(db, docs: int, batch_size: int = 10000) -> None:
+    existing = await db.emails.estimated_document_count()
+    if existing >= docs:
+        print(f"Reusing {existing} existing documents")
+        return
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1, tzinfo=UTC)
+    started = time.perf_counter()
+    for offset in range(existing, docs, batch_size):
+        stop = min(offset + batch_size, docs)
+        batch = [_document(rng, i, start) for i in range(offset, stop)]
+        await db.emails.insert_many(batch, ordered=False)
+        print(f"\rSeeded {offset + len(batch)}/{docs}", end="", flush=True)
+    print(f"\nSeeding took {time.perf_counter() - started:.1f}s")
+
+
+def _summary(label: str, samples: list[float]) -> str:
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]  # noqa: E731
+    return (
+        f"{label:<28} n={len(samples):<4} p50={statistics.median(samples):7.1f}ms "
+        f"p95={pick(0.95):7.1f}ms p99={pick(0.99):7.1f}ms max={samples[-1]:7.1f}ms"
+    )
+
+
+async def run(args) -> None:
+    client = AsyncIOMotorClient(args.uri)
+    db = client[args.db]
+    try:
+        if args.drop:
+            await db.emails.drop()
+        await seed(db, args.docs)
+        started = time.perf_counter()
+        report = await reconcile_indexes(db, EMAIL_INDEXES)
+        elapsed = time.perf_counter() - started
+        print(f"Indexes created {report.created} in {elapsed:.1f}s")
+
+        repo = MongoEmailRepository(_Manager(db))
+        first, deep = [], []
+        for i in range(args.queries):
+            query = QUERIES[i % len(QUERIES)]
+            t = time.perf_counter()
+            page = await repo.search_emails(query, limit=args.limit, fields=["subject"])
+            first.append((time.perf_counter() - t) * 1000)
+
+            cursor = page.next_cursor
+            for _ in range(args.depth):
+                if cursor is None:
+                    break
+                t = time.perf_counter()
+                page = await repo.search_emails(
+                    query, limit=args.limit, cursor=cursor, fields=["subject"]
+                )
+                deep.append((time.perf_counter() - t) * 1000)
+                cursor = page.next_cursor
+
+        print(_summary("search, first page", first))
+        if deep:
+            print(_summary(f"search, pages 2..{args.depth + 1}", deep))
+    finally:
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uri", default=os.getenv("MONGO_TEST_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="ms_graph_service_search_bench")
+    parser.add_argument("--docs", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument(
+        "--depth", type=int, default=5, help="further pages to follow per query"
+    )
+    parser.add_argument("--drop", action="store_true", help="reseed from scratch")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
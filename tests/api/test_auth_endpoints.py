@@ -0,0 +1,52 @@
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.auth.device_code_login import AuthState
+from app.core.config import settings
+from app.dependencies import device_login
+from app.main import app
+
+AUTH_PREFIX = f"{settings.API_V1_STR}/auth"
+
+
+@pytest.fixture
+def async_client():
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://testserver")
+
+
+@pytest.mark.asyncio
+async def test_auth_status(async_client):
+    async with async_client as client:
+        response = await client.get(f"{AUTH_PREFIX}/status")
+    assert response.status_code == 200
+    assert response.json()["state"] == device_login.status()["state"]
+
+
+@pytest.mark.asyncio
+async def test_auth_start_returns_user_code(async_client):
+    status = {
+        "state": "polling",
+        "user_code": "ABC123",
+        "verification_uri": "https://microsoft.com/devicelogin",
+        "message": "Enter ABC123",
+        "expires_at": None,
+        "error": None,
+    }
+    with patch.object(device_login, "start", AsyncMock(return_value=status)):
+        async with async_client as client:
+            response = await client.post(f"{AUTH_PREFIX}/start")
+    assert response.status_code == 202
+    assert response.json()["user_code"] == "ABC123"
+
+
+@pytest.mark.asyncio
+async def test_graph_routes_fail_fast_when_not_authenticated(async_client, monkeypatch):
+    monkeypatch.setattr(device_login, "state", AuthState.NOT_STARTED)
+    async with async_client as client:
+        response = await client.get(f"{settings.API_V1_STR}/emails/fetch")
+        health = await client.get(f"{settings.API_V1_STR}/emails/health")
+    assert response.status_code == 503
+    assert "not authenticated" in response.json()["detail"]
+    assert health.status_code == 200
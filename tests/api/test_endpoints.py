@@ -4,11 +4,20 @@ import pytest
 import httpx
 from fastapi import status
 from fastapi.testclient import TestClient
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 from app.main import app
-from app.dependencies import get_email_manager
-from app.schemas.email import EmailCreate
+from app.dependencies import (
+    get_email_manager,
+    get_cached_email_repo,
+    get_outbox_workers,
+    get_sync_engine,
+    require_graph_auth,
+)
+from app.schemas.email import EmailCreate, EmailPage, SendResult
+from app.schemas.outbox import OutboxMessage, OutboxStatus
+from app.schemas.sync import SyncRunStats
+from datetime import datetime, timezone
 
 from app.core.config import settings
 
@@ -26,14 +35,46 @@ class MockEmailManager:
     async def send_email(self, email):
         return 200
 
+    async def queue_email(self, email):
+        now = datetime.now(timezone.utc)
+        return OutboxMessage(
+            _id="msg-1", mailbox="me@x.com", email=email,
+            next_attempt_at=now, created_at=now, updated_at=now,
+        )
+
+    async def get_outbox_message(self, message_id):
+        if message_id != "msg-1":
+            return None
+        now = datetime.now(timezone.utc)
+        return OutboxMessage(
+            _id="msg-1", mailbox="me@x.com",
+            email=EmailCreate(recipients=["someone@example.com"], subject="S", body="B"),
+            status=OutboxStatus.SENT, attempts=1,
+            next_attempt_at=now, created_at=now, updated_at=now, sent_at=now,
+        )
+
+    async def send_emails_batch(self, emails):
+        return [
+            SendResult(index=i, status_code=202 if i else 429, sent=bool(i))
+            for i in range(len(emails))
+        ]
+
     async def sync_and_store_emails(self):
-        return ["msg1", "msg2"]
+        return SyncRunStats(mode="filter", started_at=datetime.now(timezone.utc), stored=2)
+
+
+class MockSyncEngine:
+    async def sync_mailbox(self, address):
+        return await MockEmailManager().sync_and_store_emails()
 
 
 # Override the EmailManager dependency with a mock
 @pytest.fixture(autouse=True)
 def override_dependency():
     app.dependency_overrides[get_email_manager] = lambda: MockEmailManager()
+    app.dependency_overrides[require_graph_auth] = lambda: None
+    app.dependency_overrides[get_outbox_workers] = lambda: MagicMock()
+    app.dependency_overrides[get_sync_engine] = lambda: MockSyncEngine()
     yield
     app.dependency_overrides.clear()
 
@@ -56,13 +97,40 @@ async def test_send_email_success(async_client):
     }
     async with async_client as client:
         response = await client.post(url, json=payload)
-    assert response.status_code == 200
+    assert response.status_code == 202
     data = response.json()
-    assert data["status_code"] == 200
+    assert data["status_code"] == 202
+    assert data["id"] == "msg-1"
     assert 'subject' in data["email"] and data['email']['subject'] == payload['subject']
     assert 'body' in data["email"] and data['email']['body'] == payload['body']
     assert 'recipients' in data["email"] and data['email']['recipients'] == payload['recipients']
 
+@pytest.mark.asyncio
+async def test_send_status_reports_outbox_state(async_client):
+    async with async_client as client:
+        found = await client.get(f"{EMAIL_PREFIX}/send/msg-1")
+        missing = await client.get(f"{EMAIL_PREFIX}/send/nope")
+    assert found.status_code == 200
+    assert found.json()["status"] == "sent"
+    assert found.json()["attempts"] == 1
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_send_emails_bulk_reports_each_item(async_client):
+    url = f"{EMAIL_PREFIX}/send/bulk"
+    payload = [
+        {"subject": f"S{i}", "body": "B", "recipients": ["someone@example.com"]}
+        for i in range(3)
+    ]
+    async with async_client as client:
+        response = await client.post(url, json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["sent"], data["failed"]) == (2, 1)
+    assert data["results"][0]["status_code"] == 429
+
+
 @pytest.mark.asyncio
 async def test_fetch_emails(async_client):
     url = f"{EMAIL_PREFIX}/fetch"
@@ -71,4 +139,67 @@ async def test_fetch_emails(async_client):
     assert response.status_code == 200
     data = response.json()
     assert data["status_code"] == 200
-    assert data["count"] == 2
\ No newline at end of file
+    assert data["count"] == 2
+
+@pytest.fixture
+def email_repo():
+    repo = MagicMock()
+    repo.query_emails = AsyncMock(return_value=EmailPage(
+        items=[{"_id": "m1", "subject": "Hi", "receivedDateTime": datetime(2024, 5, 1)}],
+        next_cursor="abc",
+    ))
+    app.dependency_overrides[get_cached_email_repo] = lambda: repo
+    yield repo
+    app.dependency_overrides.pop(get_cached_email_repo, None)
+
+
+@pytest.mark.asyncio
+async def test_list_emails_passes_filters_and_projection(async_client, email_repo):
+    async with async_client as client:
+        response = await client.get(
+            EMAIL_PREFIX,
+            params={"limit": 10, "sender": "a@x.com", "is_read": "false", "fields": "subject, sender"},
+        )
+    assert response.status_code == 200
+    assert response.json()["next_cursor"] == "abc"
+    assert response.json()["items"][0]["subject"] == "Hi"
+    query = email_repo.query_emails.call_args[0][0]
+    assert (query.sender, query.is_read, query.folder_id) == ("a@x.com", False, None)
+    assert email_repo.query_emails.call_args.kwargs == {
+        "limit": 10, "cursor": None, "fields": ["subject", "sender"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_list_emails_rejects_unknown_fields_and_bad_cursor(async_client, email_repo):
+    email_repo.query_emails.side_effect = ValueError("Invalid cursor: 'x'")
+    async with async_client as client:
+        unknown = await client.get(EMAIL_PREFIX, params={"fields": "subject,password"})
+        bad_cursor = await client.get(EMAIL_PREFIX, params={"cursor": "x"})
+    assert unknown.status_code == 400
+    assert "password" in unknown.json()["detail"]
+    assert bad_cursor.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_email_by_id(async_client, email_repo):
+    email_repo.get_email = AsyncMock(return_value=None)
+    async with async_client as client:
+        missing = await client.get(f"{EMAIL_PREFIX}/unknown-id")
+        health = await client.get(f"{EMAIL_PREFIX}/health")
+    assert missing.status_code == 404
+    # Fixed routes keep precedence over the id route
+    assert health.status_code == 200
+    email_repo.get_email.assert_awaited_once_with("unknown-id")
+
+
+@pytest.mark.asyncio
+async def test_search_emails(async_client, email_repo):
+    email_repo.search_emails = AsyncMock(return_value=EmailPage(items=[{"_id": "m1", "score": 1.5}]))
+    async with async_client as client:
+        response = await client.get(f"{EMAIL_PREFIX}/search", params={"q": "report", "fields": "subject"})
+        missing_q = await client.get(f"{EMAIL_PREFIX}/search")
+    assert response.status_code == 200
+    assert response.json()["items"] == [{"_id": "m1", "score": 1.5}]
+    email_repo.search_emails.assert_awaited_once_with("report", limit=20, cursor=None, fields=["subject"])
+    assert missing_q.status_code == 422
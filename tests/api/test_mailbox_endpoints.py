@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.dependencies import get_mailbox_repo
+from app.main import app
+from app.schemas.mailbox import Mailbox
+
+MAILBOX_PREFIX = f"{settings.API_V1_STR}/mailboxes"
+
+
+@pytest.fixture
+def mailbox_repo():
+    repo = AsyncMock()
+    app.dependency_overrides[get_mailbox_repo] = lambda: repo
+    yield repo
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def async_client():
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://testserver")
+
+
+@pytest.mark.asyncio
+async def test_list_mailboxes_reports_lag(mailbox_repo, async_client):
+    mailbox_repo.list_mailboxes.return_value = [
+        Mailbox(_id="a@x.com", last_success_at=datetime.now(timezone.utc) - timedelta(minutes=5)),
+        Mailbox(_id="b@x.com", enabled=False),
+    ]
+    async with async_client as client:
+        response = await client.get(MAILBOX_PREFIX)
+
+    assert response.status_code == 200
+    a, b = response.json()
+    assert 299 <= a["lag_seconds"] < 310
+    assert b["lag_seconds"] is None and b["enabled"] is False
+    mailbox_repo.list_mailboxes.assert_awaited_once_with(enabled_only=False)
+
+
+@pytest.mark.asyncio
+async def test_put_mailbox_registers_it(mailbox_repo, async_client):
+    mailbox_repo.register_mailbox.return_value = Mailbox(_id="c@x.com", enabled=True)
+    async with async_client as client:
+        response = await client.put(f"{MAILBOX_PREFIX}/c@x.com", json={"enabled": True})
+
+    assert response.status_code == 200
+    assert response.json()["address"] == "c@x.com"
+    mailbox_repo.register_mailbox.assert_awaited_once_with("c@x.com", enabled=True)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("address", ["not-an-address", "a@x.com%3F$select=id"])
+async def test_put_mailbox_rejects_non_addresses(mailbox_repo, async_client, address):
+    async with async_client as client:
+        response = await client.put(f"{MAILBOX_PREFIX}/{address}", json={"enabled": True})
+
+    assert response.status_code == 400
+    mailbox_repo.register_mailbox.assert_not_awaited()
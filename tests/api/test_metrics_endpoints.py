@@ -0,0 +1,15 @@
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_metrics_reports_token_refresher():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        response = await client.get(f"{settings.API_V1_STR}/metrics")
+    assert response.status_code == 200
+    refresher = response.json()["token_refresher"]
+    assert {"refresh_count", "failure_count", "last_latency_ms"} <= refresher.keys()
@@ -0,0 +1,120 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.config import settings
+from app.dependencies import get_notification_processor, get_subscription_manager
+from app.mail.fake_notifier import FakeGraphNotifier
+from app.main import app
+from app.services.subscription_manager import SubscriptionManager
+
+NOTIFICATIONS_URL = f"{settings.API_V1_STR}/notifications"
+
+
+@pytest.fixture
+def subscriptions():
+    repo = MagicMock()
+    repo.find_by_subscription = AsyncMock(return_value=None)
+    subscriptions = SubscriptionManager(repo, MagicMock(), "https://hook", "secret")
+    subscriptions._mailbox_by_subscription["sub-1"] = "a@x.com"
+    subscriptions.handle_lifecycle = MagicMock()
+    return subscriptions
+
+
+@pytest.fixture
+def processor(subscriptions, monkeypatch):
+    monkeypatch.setattr(settings, "GRAPH_WEBHOOK_URL", "https://hook")
+    monkeypatch.setattr(settings, "GRAPH_WEBHOOK_CLIENT_STATE", "secret")
+    processor = MagicMock()
+    app.dependency_overrides[get_notification_processor] = lambda: processor
+    app.dependency_overrides[get_subscription_manager] = lambda: subscriptions
+    yield processor
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def notifier():
+    return FakeGraphNotifier(NOTIFICATIONS_URL, "secret", app=app)
+
+
+@pytest.mark.asyncio
+async def test_validation_handshake_echoes_token(processor, notifier):
+    assert await notifier.validate()
+
+
+@pytest.mark.asyncio
+async def test_notifications_are_queued_per_message(processor, notifier):
+    response = await notifier.notify("sub-1", ["m1", "m2"])
+
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 2, "rejected": 0}
+    assert [c.args for c in processor.submit.call_args_list] == [("a@x.com", "m1"), ("a@x.com", "m2")]
+
+
+@pytest.mark.asyncio
+async def test_wrong_client_state_or_unknown_subscription_is_rejected(processor, notifier):
+    response = await notifier.notify("sub-1", ["m1"], client_state="forged")
+    assert response.json() == {"accepted": 0, "rejected": 1}
+
+    response = await notifier.notify("sub-404", ["m1"])
+    assert response.json() == {"accepted": 0, "rejected": 1}
+    processor.submit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_missed_lifecycle_event_triggers_resync(processor, notifier):
+    payload = {"value": [{"subscriptionId": "sub-1", "clientState": "secret", "lifecycleEvent": "missed"}]}
+    async with notifier._client() as client:
+        response = await client.post(NOTIFICATIONS_URL, json=payload)
+
+    assert response.json() == {"accepted": 1, "rejected": 0}
+    processor.request_resync.assert_called_once_with("a@x.com")
+
+
+@pytest.mark.asyncio
+async def test_removed_subscription_is_handed_to_the_manager(processor, subscriptions, notifier):
+    payload = {"value": [{
+        "subscriptionId": "sub-1", "clientState": "secret", "lifecycleEvent": "subscriptionRemoved",
+    }]}
+    async with notifier._client() as client:
+        await client.post(NOTIFICATIONS_URL, json=payload)
+
+    subscriptions.handle_lifecycle.assert_called_once_with("a@x.com", "sub-1", "subscriptionRemoved")
+    processor.request_resync.assert_called_once_with("a@x.com")
+
+
+@pytest.mark.asyncio
+async def test_webhook_is_not_served_when_push_is_disabled(processor, notifier, monkeypatch):
+    monkeypatch.setattr(settings, "GRAPH_WEBHOOK_URL", "")
+
+    response = await notifier.notify("sub-1", ["m1"])
+
+    assert response.status_code == 404
+    processor.submit.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "body", [b"not json", b"[1, 2]", b'"value"', b'{"value": {"id": "x"}}'],
+)
+async def test_malformed_body_is_a_bad_request(processor, notifier, body):
+    async with notifier._client() as client:
+        response = await client.post(
+            NOTIFICATIONS_URL, content=body, headers={"Content-Type": "application/json"},
+        )
+
+    assert response.status_code == 400
+    processor.submit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_malformed_items_are_rejected(processor, notifier):
+    payload = {"value": [
+        "junk",
+        {"subscriptionId": "sub-1", "clientState": "secret", "resourceData": "x"},
+    ]}
+    async with notifier._client() as client:
+        response = await client.post(NOTIFICATIONS_URL, json=payload)
+
+    assert response.json() == {"accepted": 0, "rejected": 1}
+    processor.submit.assert_not_called()
@@ -0,0 +1,53 @@
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.dependencies import get_thread_repo
+from app.main import app
+from app.schemas.thread import Thread, ThreadPage
+
+THREADS_PREFIX = f"{settings.API_V1_STR}/threads"
+
+
+@pytest.fixture
+def thread_repo():
+    repo = AsyncMock()
+    app.dependency_overrides[get_thread_repo] = lambda: repo
+    yield repo
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def async_client():
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://testserver")
+
+
+@pytest.mark.asyncio
+async def test_list_threads(thread_repo, async_client):
+    thread_repo.list_threads.return_value = ThreadPage(
+        items=[Thread(_id="c1", message_count=3, unread_count=1, last_activity_at=datetime(2024, 5, 1))],
+        next_cursor="next",
+    )
+    async with async_client as client:
+        response = await client.get(THREADS_PREFIX, params={"unread_only": "true", "limit": 5})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["items"][0]["_id"] == "c1"
+    assert body["items"][0]["unread_count"] == 1
+    assert body["next_cursor"] == "next"
+    thread_repo.list_threads.assert_awaited_once_with(
+        participant=None, unread_only=True, limit=5, cursor=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_bad_cursor_is_rejected(thread_repo, async_client):
+    thread_repo.list_threads.side_effect = ValueError("Invalid cursor: 'x'")
+    async with async_client as client:
+        response = await client.get(THREADS_PREFIX, params={"cursor": "x"})
+    assert response.status_code == 400
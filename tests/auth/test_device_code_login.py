@@ -0,0 +1,148 @@
+import asyncio
+import time
+
+import pytest
+
+from app.auth.base import AuthenticationRequiredError, TokenAcquisitionError
+from app.auth.device_code_login import AuthState, DeviceCodeLogin
+from app.auth.token_provider import AccessToken
+
+
+class FakeDeviceFlow:
+    def __init__(self, init_error=None, login_error=None):
+        self.init_error = init_error
+        self.login_error = login_error
+        self.user_entered_code = asyncio.Event()
+
+    async def initiate_device_flow(self):
+        if self.init_error:
+            raise self.init_error
+        return {
+            "user_code": "ABC123",
+            "verification_uri": "https://microsoft.com/devicelogin",
+            "message": "Enter ABC123",
+            "expires_in": 900,
+        }
+
+    async def complete_device_flow(self, flow):
+        await asyncio.wait_for(self.user_entered_code.wait(), timeout=2)
+        if self.login_error:
+            raise self.login_error
+        return {"access_token": "device-token"}
+
+
+class FakeProvider:
+    def __init__(self, error=None):
+        self.error = error
+        self.token = None
+
+    async def get_token(self):
+        if self.error:
+            raise self.error
+        return "cached-token"
+
+    async def refresh(self):
+        now = time.monotonic()
+        self.token = AccessToken(value="device-token", expires_at=now + 3600, refresh_at=now + 3300)
+        return self.token
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_with_cached_session_is_authenticated():
+    login = DeviceCodeLogin(FakeDeviceFlow(), FakeProvider())
+    await login.bootstrap()
+    assert login.is_authenticated
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_without_session_waits_for_login():
+    provider = FakeProvider(error=AuthenticationRequiredError("no account"))
+    login = DeviceCodeLogin(FakeDeviceFlow(), provider)
+    await login.bootstrap()
+    assert login.state == AuthState.NOT_STARTED
+    assert not login.is_authenticated
+
+
+@pytest.mark.asyncio
+async def test_login_runs_in_background_until_user_enters_code():
+    device_flow = FakeDeviceFlow()
+    login = DeviceCodeLogin(device_flow, FakeProvider())
+
+    status = await login.start()
+    assert status["state"] == "polling"
+    assert status["user_code"] == "ABC123"
+
+    # The event loop stays responsive while the login is polling
+    await asyncio.sleep(0.01)
+    assert login.state == AuthState.POLLING
+    assert (await login.start())["user_code"] == "ABC123"
+
+    device_flow.user_entered_code.set()
+    await login._task
+    assert login.is_authenticated
+    assert login.status()["user_code"] is None
+
+
+@pytest.mark.asyncio
+async def test_failed_init_reports_error():
+    device_flow = FakeDeviceFlow(init_error=TokenAcquisitionError("Bad scope"))
+    login = DeviceCodeLogin(device_flow, FakeProvider())
+
+    status = await login.start()
+
+    assert status["state"] == "failed"
+    assert status["error"] == "Bad scope"
+
+
+@pytest.mark.asyncio
+async def test_failed_polling_reports_error():
+    device_flow = FakeDeviceFlow(login_error=TokenAcquisitionError("expired_token"))
+    device_flow.user_entered_code.set()
+    login = DeviceCodeLogin(device_flow, FakeProvider())
+
+    await login.start()
+    await login._task
+
+    assert login.state == AuthState.FAILED
+    assert login.error == "expired_token"
+
+
+@pytest.mark.asyncio
+async def test_expired_token_drops_authenticated_state():
+    provider = FakeProvider()
+    login = DeviceCodeLogin(FakeDeviceFlow(), provider)
+    await login.bootstrap()
+    now = time.monotonic()
+    provider.token = AccessToken(value="old", expires_at=now - 1, refresh_at=now - 10)
+
+    assert not login.is_authenticated
+    assert login.status()["state"] == "failed"
+
+
+@pytest.mark.asyncio
+async def test_refresh_after_expiry_restores_session():
+    provider = FakeProvider()
+    login = DeviceCodeLogin(FakeDeviceFlow(), provider)
+    await login.bootstrap()
+    now = time.monotonic()
+    provider.token = AccessToken(value="old", expires_at=now - 1, refresh_at=now - 10)
+    assert not login.is_authenticated
+
+    # TokenRefresher succeeds once the outage is over
+    await provider.refresh()
+
+    assert login.is_authenticated
+    assert login.status()["error"] is None
+
+
+@pytest.mark.asyncio
+async def test_transient_bootstrap_error_is_retried_by_refresh():
+    provider = FakeProvider(error=TokenAcquisitionError("connection reset"))
+    login = DeviceCodeLogin(FakeDeviceFlow(), provider)
+
+    await login.bootstrap()
+
+    assert login.state == AuthState.NOT_STARTED
+    assert login.status()["error"] == "connection reset"
+    await provider.refresh()
+    assert login.is_authenticated
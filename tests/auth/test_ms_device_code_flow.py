@@ -1,6 +1,8 @@
+import json
 import os
 import pytest
 from unittest.mock import patch, MagicMock
+from app.auth.base import AuthenticationRequiredError, TokenAcquisitionError
 from app.auth.ms_device_code_flow import DeviceCodeFlow
 
 @pytest.fixture
@@ -10,8 +12,9 @@ def tmp_cache_file(tmp_path, monkeypatch):
     monkeypatch.chdir(tmp_path)           # cwd so relative paths work
     return str(cache)
 
+@pytest.mark.asyncio
 @patch("app.auth.ms_device_code_flow.msal.PublicClientApplication")
-def test_acquire_token_silent_success(mock_pca, tmp_cache_file):
+async def test_acquire_token_silent_success(mock_pca, tmp_cache_file):
     # Arrange: PCA returns one account and a valid silent token
     mock_app = MagicMock()
     mock_app.get_accounts.return_value = ["acct1"]
@@ -27,17 +30,41 @@ def test_acquire_token_silent_success(mock_pca, tmp_cache_file):
     )
 
     # Act
-    result = flow.acquire_token()
+    result = await flow.acquire_token()
 
     # Assert
     assert result == {"access_token": "silent-token"}
-    mock_app.acquire_token_silent.assert_called_once_with(["s1"], account="acct1")
+    mock_app.acquire_token_silent.assert_called_once_with(
+        ["s1"], account="acct1", force_refresh=False
+    )
 
+@pytest.mark.asyncio
 @patch("app.auth.ms_device_code_flow.msal.PublicClientApplication")
-def test_acquire_token_device_flow_success(mock_pca, tmp_cache_file):
-    # Arrange: no accounts, device flow returns user_code, then returns a token
+async def test_acquire_token_without_account_requires_login(mock_pca, tmp_cache_file):
+    # Arrange: no cached account, silent acquisition is impossible
     mock_app = MagicMock()
     mock_app.get_accounts.return_value = []
+    mock_pca.return_value = mock_app
+
+    flow = DeviceCodeFlow(
+        client_id="cid",
+        tenant="tid",
+        scopes=["s1"],
+        auth_url="https://login",
+        cache_file=tmp_cache_file
+    )
+
+    # Act & Assert: never falls back to the blocking device flow
+    with pytest.raises(AuthenticationRequiredError):
+        await flow.acquire_token()
+    mock_app.initiate_device_flow.assert_not_called()
+    mock_app.acquire_token_by_device_flow.assert_not_called()
+
+@pytest.mark.asyncio
+@patch("app.auth.ms_device_code_flow.msal.PublicClientApplication")
+async def test_device_flow_success(mock_pca, tmp_cache_file):
+    # Arrange: device flow returns user_code, then returns a token
+    mock_app = MagicMock()
     device_flow_response = {"user_code": "ABC123", "message": "Use this code"}
     mock_app.initiate_device_flow.return_value = device_flow_response
     mock_app.acquire_token_by_device_flow.return_value = {"access_token": "device-token"}
@@ -52,18 +79,20 @@ def test_acquire_token_device_flow_success(mock_pca, tmp_cache_file):
     )
 
     # Act
-    result = flow.acquire_token()
+    device_flow = await flow.initiate_device_flow()
+    result = await flow.complete_device_flow(device_flow)
 
     # Assert
+    assert device_flow == device_flow_response
     assert result == {"access_token": "device-token"}
     mock_app.initiate_device_flow.assert_called_once_with(scopes=["s1"])
     mock_app.acquire_token_by_device_flow.assert_called_once_with(device_flow_response)
 
+@pytest.mark.asyncio
 @patch("app.auth.ms_device_code_flow.msal.PublicClientApplication")
-def test_acquire_token_device_flow_init_failure(mock_pca, tmp_cache_file):
-    # Arrange: no accounts, device flow returns error (no user_code)
+async def test_device_flow_init_failure(mock_pca, tmp_cache_file):
+    # Arrange: device flow returns error (no user_code)
     mock_app = MagicMock()
-    mock_app.get_accounts.return_value = []
     mock_app.initiate_device_flow.return_value = {
         "error": "invalid_request",
         "error_description": "Bad scope"
@@ -79,7 +108,116 @@ def test_acquire_token_device_flow_init_failure(mock_pca, tmp_cache_file):
     )
 
     # Act & Assert
-    with pytest.raises(Exception) as excinfo:
-        flow.acquire_token()
+    with pytest.raises(TokenAcquisitionError) as excinfo:
+        await flow.initiate_device_flow()
 
     assert "Device‑flow init failed: invalid_request — Bad scope" in str(excinfo.value)
+
+
+class RecordingStore:
+    def __init__(self, serialized=None):
+        self.serialized = serialized
+        self.saved = []
+
+    async def load(self):
+        return self.serialized
+
+    async def save(self, serialized):
+        self.saved.append(serialized)
+        return True
+
+
+@pytest.mark.asyncio
+@patch("app.auth.ms_device_code_flow.msal.PublicClientApplication")
+async def test_cache_store_is_only_written_when_state_changed(mock_pca):
+    mock_app = MagicMock()
+    mock_app.get_accounts.return_value = ["acct1"]
+    mock_app.acquire_token_silent.return_value = {"access_token": "silent-token"}
+    mock_pca.return_value = mock_app
+    store = RecordingStore()
+
+    flow = DeviceCodeFlow("cid", "tid", ["s1"], "https://login", cache_store=store)
+
+    flow.token_cache.has_state_changed = False
+    await flow.acquire_token()
+    assert store.saved == []
+
+    flow.token_cache.has_state_changed = True
+    await flow.acquire_token()
+    assert len(store.saved) == 1
+    assert flow.token_cache.has_state_changed is False
+
+
+@pytest.mark.asyncio
+@patch("app.auth.ms_device_code_flow.msal.PublicClientApplication")
+async def test_cache_store_contents_are_deserialized_once(mock_pca):
+    mock_app = MagicMock()
+    mock_app.get_accounts.return_value = ["acct1"]
+    mock_app.acquire_token_silent.return_value = {"access_token": "silent-token"}
+    mock_pca.return_value = mock_app
+    store = RecordingStore(serialized="{}")
+
+    flow = DeviceCodeFlow("cid", "tid", ["s1"], "https://login", cache_store=store)
+    flow.token_cache = MagicMock(has_state_changed=False)
+
+    await flow.acquire_token()
+    await flow.acquire_token()
+
+    flow.token_cache.deserialize.assert_called_once_with("{}")
+
+
+class RacingStore(RecordingStore):
+    """Rejects the first ``conflicts`` saves, as if another replica saved first."""
+
+    def __init__(self, serialized, conflicts):
+        super().__init__(serialized)
+        self.conflicts = conflicts
+
+    async def save(self, serialized):
+        if self.conflicts:
+            self.conflicts -= 1
+            return False
+        return await super().save(serialized)
+
+
+def refresh_tokens(serialized):
+    return sorted(json.loads(serialized)["RefreshToken"])
+
+
+@pytest.mark.asyncio
+@patch("app.auth.ms_device_code_flow.msal.PublicClientApplication")
+async def test_login_saved_after_losing_race_keeps_both_caches(mock_pca):
+    mock_pca.return_value = MagicMock()
+    elsewhere = json.dumps({"RefreshToken": {"replica-2": {"secret": "b"}}})
+    store = RacingStore(elsewhere, conflicts=1)
+    flow = DeviceCodeFlow("cid", "tid", ["s1"], "https://login", cache_store=store)
+    login = {"RefreshToken": {"login": {"secret": "a"}}}
+    flow.token_cache.deserialize(json.dumps(login))
+    flow.token_cache.has_state_changed = True
+
+    await flow._save_token_cache()
+
+    assert refresh_tokens(store.saved[0]) == ["login", "replica-2"]
+    assert refresh_tokens(flow.token_cache.serialize()) == ["login", "replica-2"]
+
+
+@pytest.mark.asyncio
+@patch("app.auth.ms_device_code_flow.msal.PublicClientApplication")
+async def test_unsaved_change_survives_the_next_load(mock_pca):
+    mock_pca.return_value = MagicMock()
+    elsewhere = json.dumps({"RefreshToken": {"replica-2": {"secret": "b"}}})
+    store = RacingStore(elsewhere, conflicts=5)
+    flow = DeviceCodeFlow("cid", "tid", ["s1"], "https://login", cache_store=store)
+    login = {"RefreshToken": {"login": {"secret": "a"}}}
+    flow.token_cache.deserialize(json.dumps(login))
+    flow.token_cache.has_state_changed = True
+
+    await flow._save_token_cache()
+    assert store.saved == [] and flow.token_cache.has_state_changed
+
+    store.serialized = json.dumps({"RefreshToken": {"replica-3": {"secret": "c"}}})
+    await flow._load_token_cache()
+
+    assert flow.token_cache.has_state_changed
+    merged = refresh_tokens(flow.token_cache.serialize())
+    assert merged == ["login", "replica-2", "replica-3"]
@@ -0,0 +1,33 @@
+import pytest
+
+from app.auth.token_cache_store import FileTokenCacheStore
+
+
+@pytest.mark.asyncio
+async def test_load_missing_file_returns_none(tmp_path):
+    store = FileTokenCacheStore(str(tmp_path / "token_cache.json"))
+    assert await store.load() is None
+
+
+@pytest.mark.asyncio
+async def test_save_then_load_round_trips(tmp_path):
+    cache_file = tmp_path / "token_cache.json"
+    store = FileTokenCacheStore(str(cache_file))
+
+    assert await store.save('{"AccessToken": {}}') is True
+
+    assert cache_file.read_text() == '{"AccessToken": {}}'
+    assert await FileTokenCacheStore(str(cache_file)).load() == '{"AccessToken": {}}'
+    assert not (tmp_path / "token_cache.json.tmp").exists()
+
+
+@pytest.mark.asyncio
+async def test_unchanged_file_returns_the_same_object(tmp_path):
+    cache_file = tmp_path / "token_cache.json"
+    cache_file.write_text("{}")
+    store = FileTokenCacheStore(str(cache_file))
+
+    first = await store.load()
+    second = await store.load()
+
+    assert first is second
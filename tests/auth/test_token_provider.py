@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import pytest
+
+from app.auth.base import TokenAcquisitionError
+from app.auth.token_provider import AccessToken, CachedTokenProvider
+
+
+class CountingAuthFlow:
+    """Fake MSAL-backed flow that counts calls and hands out numbered tokens."""
+    def __init__(self, expires_in=3600, delay=0.0):
+        self.calls = 0
+        self.expires_in = expires_in
+        self.delay = delay
+
+    async def acquire_token(self, force_refresh=False):
+        await asyncio.sleep(self.delay)
+        self.calls += 1
+        return {"access_token": f"token-{self.calls}", "expires_in": self.expires_in}
+
+
+@pytest.mark.asyncio
+async def test_token_is_served_from_memory_until_skew():
+    flow = CountingAuthFlow(expires_in=3600)
+    provider = CachedTokenProvider(flow, refresh_skew_seconds=60)
+
+    assert await provider.get_token() == "token-1"
+    assert await provider.get_token() == "token-1"
+    assert flow.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_token_is_renewed_once_inside_skew_window():
+    flow = CountingAuthFlow(expires_in=100)
+    provider = CachedTokenProvider(flow, refresh_skew_seconds=60)
+    await provider.get_token()
+
+    # Pretend we are past the refresh point
+    provider._token = AccessToken(
+        value="token-1",
+        expires_at=provider._token.expires_at,
+        refresh_at=time.monotonic() - 1,
+    )
+
+    assert await provider.get_token() == "token-2"
+    assert flow.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_a_single_refresh():
+    flow = CountingAuthFlow(delay=0.05)
+    provider = CachedTokenProvider(flow)
+
+    tokens = await asyncio.gather(*(provider.get_token() for _ in range(200)))
+
+    assert set(tokens) == {"token-1"}
+    assert flow.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_skew_never_exceeds_half_of_token_lifetime():
+    flow = CountingAuthFlow(expires_in=100)
+    provider = CachedTokenProvider(flow, refresh_skew_seconds=600)
+
+    await provider.get_token()
+    token = provider.token
+
+    assert token.expires_at - token.refresh_at == pytest.approx(50)
+
+
+@pytest.mark.asyncio
+async def test_missing_access_token_raises():
+    class FailingFlow:
+        async def acquire_token(self, force_refresh=False):
+            return {"error": "invalid_grant"}
+
+    provider = CachedTokenProvider(FailingFlow())
+
+    with pytest.raises(TokenAcquisitionError, match="invalid_grant"):
+        await provider.get_token()
+
+
+@pytest.mark.asyncio
+async def test_explicit_refresh_forces_a_new_token():
+    flow = CountingAuthFlow()
+    provider = CachedTokenProvider(flow)
+    await provider.get_token()
+
+    token = await provider.refresh()
+
+    assert token.value == "token-2"
+    assert await provider.get_token() == "token-2"
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import pytest
+
+from app.auth.token_provider import AccessToken
+from app.auth.token_refresher import TokenRefresher
+
+
+class FakeProvider:
+    def __init__(self, failures=0):
+        self.token = None
+        self.failures = failures
+        self.calls = 0
+
+    async def refresh(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise Exception("aad unavailable")
+        now = time.monotonic()
+        self.token = AccessToken(value=f"t{self.calls}", expires_at=now + 3600, refresh_at=now + 3300)
+        return self.token
+
+
+@pytest.mark.asyncio
+async def test_refresh_once_records_latency_and_resets_failures():
+    provider = FakeProvider()
+    refresher = TokenRefresher(provider)
+    refresher.consecutive_failures = 2
+
+    await refresher.refresh_once()
+
+    stats = refresher.stats()
+    assert stats["refresh_count"] == 1
+    assert stats["consecutive_failures"] == 0
+    assert stats["last_latency_ms"] is not None
+    assert stats["token_expires_in_seconds"] > 3500
+
+
+@pytest.mark.asyncio
+async def test_refresh_failure_is_counted_and_backs_off():
+    provider = FakeProvider(failures=1)
+    refresher = TokenRefresher(provider, min_backoff_seconds=2, max_backoff_seconds=10)
+
+    await refresher.refresh_once()
+
+    assert refresher.failure_count == 1
+    assert refresher.last_error == "aad unavailable"
+    assert refresher._next_delay() == 2
+
+    refresher.consecutive_failures = 10
+    for _ in range(20):
+        assert 2 <= refresher._next_delay() <= 10
+
+
+def test_next_delay_targets_lead_before_refresh_point():
+    provider = FakeProvider()
+    refresher = TokenRefresher(provider, lead_seconds=60)
+    assert refresher._next_delay() == 0
+
+    now = time.monotonic()
+    provider.token = AccessToken(value="t", expires_at=now + 3600, refresh_at=now + 3300)
+    assert refresher._next_delay() == pytest.approx(3240, abs=1)
+
+
+@pytest.mark.asyncio
+async def test_background_task_refreshes_and_stops():
+    provider = FakeProvider()
+    refresher = TokenRefresher(provider)
+
+    refresher.start()
+    await asyncio.sleep(0.01)
+    assert provider.calls == 1
+    assert refresher.stats()["running"] is True
+
+    await refresher.stop()
+    assert refresher.stats()["running"] is False
@@ -0,0 +1,59 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.db.cached_email_repository import CachedEmailRepository
+from app.db.read_cache import ReadThroughCache
+from app.schemas.email import EmailPage, EmailQuery
+from app.schemas.sync import BulkUpsertResult
+
+
+@pytest.fixture
+def inner():
+    repo = MagicMock()
+    repo.query_emails = AsyncMock(return_value=EmailPage(items=[]))
+    repo.get_email = AsyncMock(return_value=None)
+    repo.upsert_emails = AsyncMock(return_value=BulkUpsertResult(inserted=1))
+    repo.delete_emails = AsyncMock(return_value=1)
+    repo.add_contacts = AsyncMock()
+    return repo
+
+
+@pytest.mark.asyncio
+async def test_equivalent_queries_share_an_entry(inner):
+    repo = CachedEmailRepository(inner, ReadThroughCache())
+
+    await repo.query_emails(EmailQuery(sender="a@x.com"), limit=10, fields=["subject", "sender"])
+    await repo.query_emails(EmailQuery(sender="a@x.com"), limit=10, fields=["sender", "subject"])
+    await repo.query_emails(EmailQuery(sender="b@x.com"), limit=10)
+
+    assert inner.query_emails.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_email_writes_invalidate_but_contacts_do_not(inner):
+    cache = ReadThroughCache()
+    repo = CachedEmailRepository(inner, cache)
+
+    await repo.get_email("m1")
+    await repo.add_contacts({"a@x.com": {"b@x.com"}})
+    await repo.get_email("m1")
+    assert inner.get_email.await_count == 1
+
+    await repo.upsert_emails([MagicMock()])
+    await repo.get_email("m1")
+    await repo.delete_emails(["m1"])
+    await repo.get_email("m1")
+    assert inner.get_email.await_count == 3
+    assert cache.stats()["invalidations"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_bulk_write_still_invalidates(inner):
+    cache = ReadThroughCache()
+    inner.upsert_emails.side_effect = RuntimeError("partial write")
+    repo = CachedEmailRepository(inner, cache)
+
+    with pytest.raises(RuntimeError):
+        await repo.upsert_emails([MagicMock()])
+    assert cache.generation == 1
@@ -0,0 +1,179 @@
+import os
+
+import pytest
+
+from app.db.indexes import IndexSpec, explain_index, reconcile_indexes, winning_index
+from app.db.mongo_email_repository import EMAIL_INDEXES, USER_INDEXES
+
+
+class FakeCursor:
+    def __init__(self, plan):
+        self.plan = plan
+        self.sorted_by = None
+        self.limited_to = None
+
+    def sort(self, spec):
+        self.sorted_by = spec
+        return self
+
+    def limit(self, n):
+        self.limited_to = n
+        return self
+
+    async def explain(self):
+        return self.plan
+
+
+class FakeCollection:
+    def __init__(self, existing=None, plan=None):
+        self.existing = existing or {"_id_": {"key": [("_id", 1)], "v": 2}}
+        self.created = []
+        self.cursor = FakeCursor(plan or {})
+
+    async def index_information(self):
+        return self.existing
+
+    async def create_indexes(self, models):
+        self.created.extend(models)
+        return [model.document["name"] for model in models]
+
+    def find(self, filter):
+        self.filter = filter
+        return self.cursor
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+def ixscan_plan(index_name):
+    return {
+        "queryPlanner": {
+            "winningPlan": {
+                "stage": "LIMIT",
+                "inputStage": {
+                    "stage": "FETCH",
+                    "inputStage": {"stage": "IXSCAN", "indexName": index_name},
+                },
+            },
+        },
+    }
+
+
+RECEIVED = IndexSpec("emails", (("receivedDateTime", -1),), "receivedDateTime_-1")
+
+
+@pytest.mark.asyncio
+async def test_reconcile_creates_missing_indexes():
+    db = FakeDB()
+
+    report = await reconcile_indexes(db, [RECEIVED, *USER_INDEXES])
+
+    assert report.created == ["emails.receivedDateTime_-1", "users.contacts_1"]
+    model = db["emails"].created[0].document
+    assert model["name"] == "receivedDateTime_-1"
+    # Deprecated and ignored since MongoDB 4.2
+    assert "background" not in model
+
+
+@pytest.mark.asyncio
+async def test_reconcile_leaves_matching_indexes_alone():
+    db = FakeDB(emails=FakeCollection({"receivedDateTime_-1": {"key": [("receivedDateTime", -1)], "v": 2}}))
+
+    report = await reconcile_indexes(db, [RECEIVED])
+
+    assert report.unchanged == ["emails.receivedDateTime_-1"]
+    assert db["emails"].created == []
+
+
+@pytest.mark.asyncio
+async def test_reconcile_flags_drifted_index_without_dropping_it():
+    db = FakeDB(emails=FakeCollection({
+        "receivedDateTime_-1": {"key": [("receivedDateTime", 1)], "unique": True, "v": 2},
+    }))
+
+    report = await reconcile_indexes(db, [RECEIVED])
+
+    assert list(report.drifted) == ["emails.receivedDateTime_-1"]
+    assert len(report.drifted["emails.receivedDateTime_-1"]) == 2
+    assert db["emails"].created == []
+
+
+def test_text_index_drift_compares_weights_not_keys():
+    spec = IndexSpec("emails", (("subject", "text"), ("bodyPreview", "text")), "search", {"weights": {"subject": 5}})
+    info = {
+        "key": [("_fts", "text"), ("_ftsx", 1)],
+        "weights": {"subject": 5, "bodyPreview": 1},
+        "default_language": "english",
+    }
+
+    assert spec.drift(info) == []
+    assert spec.drift({**info, "weights": {"subject": 1, "bodyPreview": 1}}) != []
+
+
+def test_winning_index_walks_nested_plans():
+    assert winning_index(ixscan_plan("receivedDateTime_-1")) == "receivedDateTime_-1"
+    assert winning_index({"queryPlanner": {"winningPlan": {"queryPlan": ixscan_plan("x")["queryPlanner"]["winningPlan"]}}}) == "x"
+    assert winning_index({"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}) is None
+
+
+@pytest.mark.asyncio
+async def test_explain_index_applies_sort_and_limit():
+    db = FakeDB(emails=FakeCollection(plan=ixscan_plan("receivedDateTime_-1")))
+
+    name = await explain_index(db, "emails", {}, sort=[("receivedDateTime", -1)], limit=10)
+
+    assert name == "receivedDateTime_-1"
+    assert db["emails"].cursor.sorted_by == [("receivedDateTime", -1)]
+    assert db["emails"].cursor.limited_to == 10
+
+
+# Hot queries and the index each must use; checked against a real server below
+HOT_QUERIES = [
+    # A prefix of the keyset pagination index, so it needs no index of its own
+    ("emails", {}, [("receivedDateTime", -1)], "receivedDateTime_-1__id_-1"),
+    ("emails", {"conversationId": "c1"}, None, "conversationId_1"),
+    ("emails", {"internetMessageId": "<m1@x>"}, None, "internetMessageId_1"),
+    (
+        "emails",
+        {"sender.emailAddress.address": "a@x"},
+        [("receivedDateTime", -1)],
+        "sender.emailAddress.address_1_receivedDateTime_-1",
+    ),
+    (
+        "emails",
+        {},
+        [("receivedDateTime", -1), ("_id", -1)],
+        "receivedDateTime_-1__id_-1",
+    ),
+    (
+        "emails",
+        {"parentFolderId": "f1"},
+        [("receivedDateTime", -1), ("_id", -1)],
+        "parentFolderId_1_receivedDateTime_-1__id_-1",
+    ),
+    ("users", {"contacts": "a@x"}, None, "contacts_1"),
+]
+
+
+def test_every_hot_query_has_a_declared_index():
+    declared = {(spec.collection, spec.name) for spec in [*EMAIL_INDEXES, *USER_INDEXES]}
+    for collection, _, _, index_name in HOT_QUERIES:
+        assert (collection, index_name) in declared
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not os.getenv("MONGO_TEST_URI"), reason="MONGO_TEST_URI not set")
+@pytest.mark.parametrize("collection,filter,sort,expected", HOT_QUERIES)
+async def test_hot_query_uses_expected_index(collection, filter, sort, expected):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ["MONGO_TEST_URI"])
+    db = client["ms_graph_service_index_test"]
+    try:
+        await reconcile_indexes(db, [*EMAIL_INDEXES, *USER_INDEXES])
+        assert await explain_index(db, collection, filter, sort=sort, limit=10) == expected
+    finally:
+        client.close()
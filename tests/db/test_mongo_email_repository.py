@@ -3,6 +3,7 @@
 import pytest
 import datetime as std_datetime
 from unittest.mock import AsyncMock, MagicMock, patch
+from pymongo.errors import BulkWriteError
 
 from app.db.mongo_email_repository import MongoEmailRepository
 from app.schemas.email import EmailInDB, EmailCreate
@@ -29,10 +30,7 @@ class DummyEmailCreate:
 def fake_db_upsert():
     fake_col = MagicMock()
     fake_col.update_one = AsyncMock()
-    fake_col.distinct = AsyncMock(return_value=["abc"])
-    fake_cursor = MagicMock()
-    fake_cursor.to_list = AsyncMock(return_value=[{"_id": "abc"}])
-    fake_col.find.return_value = fake_cursor
+    fake_col.bulk_write = AsyncMock()
 
     fake_db = MagicMock()
     fake_db.emails = fake_col
@@ -57,9 +55,61 @@ async def test_upsert_email_calls_mongo_methods(fake_db_upsert):
     fake_col.update_one.assert_awaited_once_with(
         {"_id": "abc"}, {"$set": payload}, upsert=True
     )
-    fake_col.distinct.assert_awaited_once_with("_id")
-    fake_col.find.assert_called_once_with({"_id": "abc"})
-    fake_col.find.return_value.to_list.assert_awaited_once_with(None)
+    # No diagnostic full-collection queries on the hot path
+    fake_col.distinct.assert_not_called()
+    fake_col.find.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_upsert_emails_sends_one_unordered_bulk_write(fake_db_upsert):
+    _, fake_col, manager = fake_db_upsert
+    fake_col.bulk_write.return_value = MagicMock(bulk_api_result={
+        "writeErrors": [], "writeConcernErrors": [], "nInserted": 0,
+        "nUpserted": 1, "nMatched": 1, "nModified": 1, "nRemoved": 0,
+        "upserted": [{"index": 1, "_id": "b"}],
+    })
+    repo = MongoEmailRepository(manager)
+    emails = [DummyEmailInDB("a", {"_id": "a"}), DummyEmailInDB("b", {"_id": "b"})]
+
+    result = await repo.upsert_emails(emails)
+
+    fake_col.bulk_write.assert_awaited_once()
+    operations = fake_col.bulk_write.call_args[0][0]
+    assert [op._filter for op in operations] == [{"_id": "a"}, {"_id": "b"}]
+    assert all(op._upsert for op in operations)
+    assert fake_col.bulk_write.call_args[1] == {"ordered": False}
+    assert (result.inserted, result.modified, result.failed) == (1, 1, 0)
+    assert result.upserted_ids == ["b"]
+
+
+@pytest.mark.asyncio
+async def test_upsert_emails_reports_per_item_failures(fake_db_upsert):
+    _, fake_col, manager = fake_db_upsert
+    fake_col.bulk_write.side_effect = BulkWriteError({
+        "writeErrors": [{"index": 0, "code": 10334, "errmsg": "too large"}],
+        "writeConcernErrors": [], "nInserted": 0, "nUpserted": 1,
+        "nMatched": 0, "nModified": 0, "nRemoved": 0,
+        "upserted": [{"index": 1, "_id": "b"}],
+    })
+    repo = MongoEmailRepository(manager)
+    emails = [DummyEmailInDB("a", {"_id": "a"}), DummyEmailInDB("b", {"_id": "b"})]
+
+    result = await repo.upsert_emails(emails)
+
+    assert (result.inserted, result.failed) == (1, 1)
+    assert result.errors == ["too large"]
+    assert result.failed_ids == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_upsert_emails_empty_batch_skips_mongo(fake_db_upsert):
+    _, fake_col, manager = fake_db_upsert
+    repo = MongoEmailRepository(manager)
+
+    result = await repo.upsert_emails([])
+
+    assert result.inserted == 0
+    fake_col.bulk_write.assert_not_called()
 
 
 @pytest.fixture
@@ -183,3 +233,197 @@ async def test_save_sent_email_calls_insert(fake_db_insert, monkeypatch):
     assert doc["status"] == "Sent"
     # sentDateTime now a real datetime
     assert isinstance(doc["sentDateTime"], std_datetime.datetime)
+
+
+@pytest.mark.asyncio
+async def test_delete_emails_removes_by_id():
+    fake_col = MagicMock()
+    fake_col.delete_many = AsyncMock(return_value=MagicMock(deleted_count=2))
+    fake_db = MagicMock()
+    fake_db.emails = fake_col
+
+    class DummyManager:
+        async def connect(self):
+            return fake_db
+
+    repo = MongoEmailRepository(DummyManager())
+
+    assert await repo.delete_emails(["a", "b"]) == 2
+    fake_col.delete_many.assert_awaited_once_with({"_id": {"$in": ["a", "b"]}})
+    assert await repo.delete_emails([]) == 0
+
+
+@pytest.mark.asyncio
+async def test_add_contacts_sends_one_unordered_bulk_write():
+    fake_users = MagicMock()
+    fake_users.bulk_write = AsyncMock(return_value=MagicMock(upserted_count=1, modified_count=1))
+    fake_db = MagicMock()
+    fake_db.users = fake_users
+
+    class DummyManager:
+        async def connect(self):
+            return fake_db
+
+    repo = MongoEmailRepository(DummyManager())
+
+    await repo.add_contacts({"me@x.com": {"b@x.com", "a@x.com"}, "a@x.com": {"me@x.com"}})
+
+    operations = fake_users.bulk_write.call_args[0][0]
+    assert fake_users.bulk_write.call_args.kwargs == {"ordered": False}
+    assert [op._filter for op in operations] == [{"_id": "me@x.com"}, {"_id": "a@x.com"}]
+    update = operations[0]._doc
+    assert update["$addToSet"] == {"contacts": {"$each": ["a@x.com", "b@x.com"]}}
+    # $setOnInsert must not touch "contacts" or MongoDB rejects the update
+    assert "contacts" not in update["$setOnInsert"]
+    assert operations[0]._upsert is True
+
+    fake_users.bulk_write.reset_mock()
+    await repo.add_contacts({})
+    fake_users.bulk_write.assert_not_awaited()
+
+
+def query_repo(docs):
+    calls = {}
+
+    class FakeCursor:
+        def sort(self, keys):
+            calls["sort"] = keys
+            return self
+
+        def limit(self, n):
+            calls["limit"] = n
+            self.docs = docs[:n]
+            return self
+
+        async def __aiter__(self):
+            for doc in self.docs:
+                yield doc
+
+    fake_col = MagicMock()
+    fake_col.find = MagicMock(return_value=FakeCursor())
+    fake_db = MagicMock()
+    fake_db.emails = fake_col
+
+    class DummyManager:
+        async def connect(self):
+            return fake_db
+
+    return MongoEmailRepository(DummyManager()), fake_col, calls
+
+
+@pytest.mark.asyncio
+async def test_query_emails_pages_by_keyset():
+    from app.db.pagination import decode_cursor
+    from app.schemas.email import EmailQuery
+
+    received = std_datetime.datetime(2024, 5, 1)
+    docs = [{"_id": f"m{i}", "receivedDateTime": received} for i in (3, 2, 1)]
+    repo, fake_col, calls = query_repo(docs)
+
+    page = await repo.query_emails(EmailQuery(sender="a@x.com", is_read=False), limit=2)
+
+    filter_query, projection = fake_col.find.call_args[0]
+    assert filter_query == {"sender.emailAddress.address": "a@x.com", "isRead": False}
+    assert projection == {"body": 0, "bodyText": 0}
+    assert calls == {"sort": [("receivedDateTime", -1), ("_id", -1)], "limit": 3}
+    assert [doc["_id"] for doc in page.items] == ["m3", "m2"]
+    assert decode_cursor(page.next_cursor) == (received, "m2")
+
+    await repo.query_emails(EmailQuery(), limit=2, cursor=page.next_cursor, fields=["subject"])
+    filter_query, projection = fake_col.find.call_args[0]
+    assert "$or" in filter_query
+    assert projection == {"subject": 1, "receivedDateTime": 1}
+
+
+@pytest.mark.asyncio
+async def test_query_emails_last_page_has_no_cursor():
+    from app.schemas.email import EmailQuery
+
+    repo, _, _ = query_repo([{"_id": "m1", "receivedDateTime": std_datetime.datetime(2024, 5, 1)}])
+    page = await repo.query_emails(EmailQuery(), limit=2)
+    assert page.next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_get_email_returns_none_for_unknown_id():
+    fake_db = MagicMock()
+    fake_db.emails.find_one = AsyncMock(return_value=None)
+
+    class DummyManager:
+        async def connect(self):
+            return fake_db
+
+    assert await MongoEmailRepository(DummyManager()).get_email("m1") is None
+    fake_db.emails.find_one.assert_awaited_once_with({"_id": "m1"})
+
+
+@pytest.mark.asyncio
+async def test_upsert_emails_stores_plain_text_body():
+    fake_db = MagicMock()
+    fake_db.emails.bulk_write = AsyncMock(return_value=MagicMock(bulk_api_result={}))
+
+    class DummyManager:
+        async def connect(self):
+            return fake_db
+
+    email = DummyEmailInDB("m1", {"_id": "m1", "body": {"contentType": "html", "content": "<p>Hi <b>there</b></p>"}})
+    await MongoEmailRepository(DummyManager()).upsert_emails([email])
+
+    operation = fake_db.emails.bulk_write.call_args[0][0][0]
+    assert operation._doc["$set"]["bodyText"] == "Hi there"
+
+
+@pytest.mark.asyncio
+async def test_upsert_emails_writes_parsed_documents_without_changing_them():
+    fake_db = MagicMock()
+    fake_db.emails.bulk_write = AsyncMock(return_value=MagicMock(bulk_api_result={}))
+
+    class DummyManager:
+        async def connect(self):
+            return fake_db
+
+    doc = {"_id": "m1", "subject": "Hi", "body": {"contentType": "text", "content": "Hi"}}
+    await MongoEmailRepository(DummyManager()).upsert_emails([doc])
+
+    operation = fake_db.emails.bulk_write.call_args[0][0][0]
+    assert operation._filter == {"_id": "m1"}
+    assert operation._doc["$set"] == {**doc, "bodyText": "Hi"}
+    # Filled in on a copy: the caller's document is left as it was
+    assert "bodyText" not in doc
+
+
+@pytest.mark.asyncio
+async def test_search_emails_ranks_by_text_score_and_pages():
+    from app.db.pagination import decode_search_cursor
+
+    docs = [{"_id": f"m{i}", "score": 2.0 - i / 10} for i in range(3)]
+
+    class FakeAggregate:
+        def __init__(self, items):
+            self.items = items
+
+        async def __aiter__(self):
+            for item in self.items:
+                yield item
+
+    fake_db = MagicMock()
+    fake_db.emails.aggregate = MagicMock(side_effect=lambda pipeline: FakeAggregate(docs[:pipeline[-2]["$limit"]]))
+
+    class DummyManager:
+        async def connect(self):
+            return fake_db
+
+    repo = MongoEmailRepository(DummyManager())
+    page = await repo.search_emails("quarterly report", limit=2, fields=["subject"])
+
+    pipeline = fake_db.emails.aggregate.call_args[0][0]
+    assert pipeline[0] == {"$match": {"$text": {"$search": "quarterly report"}}}
+    assert pipeline[-3] == {"$sort": {"score": -1, "_id": 1}}
+    assert pipeline[-1] == {"$project": {"subject": 1, "score": 1}}
+    assert [doc["_id"] for doc in page.items] == ["m0", "m1"]
+    assert decode_search_cursor(page.next_cursor) == (1.9, "m1")
+
+    await repo.search_emails("quarterly report", limit=2, cursor=page.next_cursor)
+    pipeline = fake_db.emails.aggregate.call_args[0][0]
+    assert "$or" in pipeline[2]["$match"]
+    assert pipeline[-1] == {"$project": {"body": 0, "bodyText": 0}}
@@ -0,0 +1,76 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+from pymongo.errors import DuplicateKeyError
+
+from app.db.mongo_lease_repository import MongoLeaseRepository
+from app.schemas.lease import Lease
+
+
+@pytest.fixture
+def fake_leases():
+    fake_col = MagicMock()
+    fake_col.find_one_and_update = AsyncMock()
+    fake_col.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+
+    fake_db = MagicMock()
+    fake_db.leases = fake_col
+
+    class DummyManager:
+        async def connect(self):
+            return fake_db
+
+    return fake_col, DummyManager()
+
+
+def lease(token=3):
+    return Lease(_id="sync:a@x.com", owner="r1", token=token, expires_at=datetime.now(timezone.utc))
+
+
+@pytest.mark.asyncio
+async def test_acquire_takes_expired_or_own_lease_and_bumps_token(fake_leases):
+    fake_col, manager = fake_leases
+    fake_col.find_one_and_update.return_value = lease().model_dump(by_alias=True)
+
+    acquired = await MongoLeaseRepository(manager).acquire("sync:a@x.com", "r1", 60)
+
+    assert acquired.token == 3
+    query, update = fake_col.find_one_and_update.call_args[0]
+    assert query["_id"] == "sync:a@x.com"
+    assert {"owner": "r1"} in query["$or"]
+    assert update["$inc"] == {"token": 1}
+    assert fake_col.find_one_and_update.call_args[1]["upsert"] is True
+
+
+@pytest.mark.asyncio
+async def test_acquire_returns_none_while_held_elsewhere(fake_leases):
+    fake_col, manager = fake_leases
+    fake_col.find_one_and_update.side_effect = DuplicateKeyError("held")
+
+    assert await MongoLeaseRepository(manager).acquire("sync:a@x.com", "r2", 60) is None
+
+
+@pytest.mark.asyncio
+async def test_renew_matches_owner_and_token(fake_leases):
+    fake_col, manager = fake_leases
+    repo = MongoLeaseRepository(manager)
+
+    renewed = await repo.renew(lease(), 60)
+
+    query, _ = fake_col.update_one.call_args[0]
+    assert query == {"_id": "sync:a@x.com", "owner": "r1", "token": 3}
+    assert renewed.expires_at > lease().expires_at
+
+    fake_col.update_one.return_value = MagicMock(matched_count=0)
+    assert await repo.renew(lease(), 60) is None
+
+
+@pytest.mark.asyncio
+async def test_release_expires_instead_of_deleting(fake_leases):
+    fake_col, manager = fake_leases
+
+    await MongoLeaseRepository(manager).release(lease())
+
+    _, update = fake_col.update_one.call_args[0]
+    assert "expires_at" in update["$set"]
@@ -0,0 +1,101 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+from app.db.mongo_mailbox_repository import MongoMailboxRepository
+from app.schemas.sync import SyncRunStats
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.fixture
+def fake_mailboxes():
+    fake_col = MagicMock()
+    fake_col.find = MagicMock(return_value=FakeCursor([{"_id": "a@x.com", "enabled": True}]))
+    fake_col.find_one_and_update = AsyncMock(return_value={"_id": "b@x.com", "enabled": False})
+    fake_col.update_one = AsyncMock()
+
+    fake_db = MagicMock()
+    fake_db.mailboxes = fake_col
+
+    class DummyManager:
+        async def connect(self):
+            return fake_db
+
+    return fake_col, DummyManager()
+
+
+@pytest.mark.asyncio
+async def test_list_mailboxes_filters_enabled(fake_mailboxes):
+    fake_col, manager = fake_mailboxes
+    repo = MongoMailboxRepository(manager)
+
+    mailboxes = await repo.list_mailboxes()
+
+    assert [m.address for m in mailboxes] == ["a@x.com"]
+    assert fake_col.find.call_args[0][0] == {"enabled": True}
+    await repo.list_mailboxes(enabled_only=False)
+    assert fake_col.find.call_args[0][0] == {}
+
+
+@pytest.mark.asyncio
+async def test_register_mailbox_upserts(fake_mailboxes):
+    fake_col, manager = fake_mailboxes
+
+    mailbox = await MongoMailboxRepository(manager).register_mailbox("b@x.com", enabled=False)
+
+    assert mailbox.enabled is False
+    query, update = fake_col.find_one_and_update.call_args[0]
+    assert query == {"_id": "b@x.com"}
+    assert update["$set"] == {"enabled": False}
+    assert fake_col.find_one_and_update.call_args[1]["upsert"] is True
+
+
+@pytest.mark.asyncio
+async def test_record_sync_only_moves_last_success_on_success(fake_mailboxes):
+    fake_col, manager = fake_mailboxes
+    repo = MongoMailboxRepository(manager)
+    started = datetime.now(timezone.utc)
+
+    await repo.record_sync("a@x.com", started, SyncRunStats(mode="filter", started_at=started))
+    _, update = fake_col.update_one.call_args[0]
+    assert "last_success_at" in update["$set"]
+    assert update["$set"]["last_stats"]["mode"] == "filter"
+
+    await repo.record_sync("a@x.com", started, error="boom")
+    _, update = fake_col.update_one.call_args[0]
+    assert "last_success_at" not in update["$set"]
+    assert update["$set"]["last_error"] == "boom"
+
+
+@pytest.mark.asyncio
+async def test_subscription_is_saved_and_found(fake_mailboxes):
+    fake_col, manager = fake_mailboxes
+    fake_col.find_one = AsyncMock(return_value={"_id": "a@x.com", "subscription_id": "sub-1"})
+    repo = MongoMailboxRepository(manager)
+    expires = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+    await repo.save_subscription("a@x.com", "sub-1", expires)
+    mailbox = await repo.find_by_subscription("sub-1")
+
+    flt, update = fake_col.update_one.call_args[0]
+    assert flt == {"_id": "a@x.com"}
+    assert update["$set"] == {"subscription_id": "sub-1", "subscription_expires_at": expires}
+    assert mailbox.address == "a@x.com"
+    assert fake_col.find_one.call_args[0][0] == {"subscription_id": "sub-1"}
@@ -0,0 +1,124 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+from app.db.mongo_outbox_repository import MongoOutboxRepository
+from app.schemas.email import EmailCreate
+from app.schemas.outbox import OutboxStatus
+
+
+@pytest.fixture
+def fake_outbox():
+    fake_col = MagicMock()
+    fake_col.insert_one = AsyncMock()
+    fake_col.find_one = AsyncMock()
+    fake_col.find_one_and_update = AsyncMock()
+    fake_col.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+
+    fake_db = MagicMock()
+    fake_db.outbox = fake_col
+
+    class DummyManager:
+        async def connect(self):
+            return fake_db
+
+    return fake_col, DummyManager()
+
+
+def outbox_doc(**overrides):
+    now = datetime(2025, 4, 1, tzinfo=timezone.utc)
+    doc = {
+        "_id": "m1",
+        "mailbox": "me@x.com",
+        "email": {"recipients": ["a@x.com"], "subject": "S", "body": "B"},
+        "status": "sending",
+        "attempts": 0,
+        "max_attempts": 5,
+        "next_attempt_at": now,
+        "lease_owner": "w1",
+        "lease_expires_at": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+    doc.update(overrides)
+    return doc
+
+
+@pytest.mark.asyncio
+async def test_enqueue_inserts_queued_document(fake_outbox):
+    fake_col, manager = fake_outbox
+    repo = MongoOutboxRepository(manager)
+
+    message = await repo.enqueue("me@x.com", EmailCreate(recipients=["a@x.com"], subject="S", body="B"), max_attempts=3)
+
+    doc = fake_col.insert_one.call_args[0][0]
+    assert doc["_id"] == message.id
+    assert doc["status"] == "queued"
+    assert doc["max_attempts"] == 3
+    assert isinstance(doc["next_attempt_at"], datetime)
+    assert doc["email"]["subject"] == "S"
+
+
+@pytest.mark.asyncio
+async def test_claim_leases_due_or_abandoned_message(fake_outbox):
+    fake_col, manager = fake_outbox
+    fake_col.find_one_and_update.return_value = outbox_doc()
+    repo = MongoOutboxRepository(manager)
+
+    message = await repo.claim("w1", lease_seconds=30)
+
+    assert message.status == OutboxStatus.SENDING
+    query, update = fake_col.find_one_and_update.call_args[0]
+    statuses = [clause["status"] for clause in query["$or"]]
+    assert statuses == ["queued", "sending"]
+    assert update["$set"]["lease_owner"] == "w1"
+    assert update["$set"]["lease_expires_at"] > update["$set"]["updated_at"]
+
+
+@pytest.mark.asyncio
+async def test_claim_returns_none_when_nothing_due(fake_outbox):
+    fake_col, manager = fake_outbox
+    fake_col.find_one_and_update.return_value = None
+    assert await MongoOutboxRepository(manager).claim("w1", 30) is None
+
+
+@pytest.mark.asyncio
+async def test_outcomes_require_the_current_lease(fake_outbox):
+    fake_col, manager = fake_outbox
+    repo = MongoOutboxRepository(manager)
+
+    assert await repo.mark_sent("m1", "w1") is True
+    query, update = fake_col.update_one.call_args[0]
+    assert query == {"_id": "m1", "lease_owner": "w1", "status": "sending"}
+    assert update["$set"]["status"] == "sent"
+
+    fake_col.update_one.return_value = MagicMock(matched_count=0)
+    assert await repo.mark_failed("m1", "w1", "boom") is False
+
+
+@pytest.mark.asyncio
+async def test_mark_retry_without_attempt_keeps_counter(fake_outbox):
+    fake_col, manager = fake_outbox
+    repo = MongoOutboxRepository(manager)
+    retry_at = datetime(2025, 4, 1, 12, tzinfo=timezone.utc)
+
+    await repo.mark_retry("m1", "w1", "no token", retry_at, attempted=False)
+
+    _, update = fake_col.update_one.call_args[0]
+    assert update["$set"]["status"] == "queued"
+    assert update["$set"]["next_attempt_at"] == retry_at
+    assert "$inc" not in update
+
+
+@pytest.mark.asyncio
+async def test_renew_lease_requires_the_current_owner(fake_outbox):
+    fake_col, manager = fake_outbox
+    repo = MongoOutboxRepository(manager)
+
+    assert await repo.renew_lease("m1", "w1", 60) is True
+    query, update = fake_col.update_one.call_args[0]
+    assert query == {"_id": "m1", "lease_owner": "w1", "status": "sending"}
+    assert update["$set"]["lease_expires_at"] > datetime.now(timezone.utc)
+
+    fake_col.update_one.return_value = MagicMock(matched_count=0)
+    assert await repo.renew_lease("m1", "w1", 60) is False
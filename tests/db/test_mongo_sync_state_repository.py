@@ -0,0 +1,107 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+from pymongo.errors import DuplicateKeyError
+
+from app.db.base import LeaseLostError
+from app.db.mongo_sync_state_repository import MongoSyncStateRepository
+from app.schemas.lease import Lease
+from app.schemas.sync import SyncRunStats
+
+
+@pytest.fixture
+def fake_sync_state():
+    fake_col = MagicMock()
+    fake_col.find_one = AsyncMock()
+    fake_col.update_one = AsyncMock()
+
+    fake_db = MagicMock()
+    fake_db.sync_state = fake_col
+
+    class DummyManager:
+        async def connect(self):
+            return fake_db
+
+    return fake_col, DummyManager()
+
+
+@pytest.mark.asyncio
+async def test_get_delta_link_per_folder(fake_sync_state):
+    fake_col, manager = fake_sync_state
+    fake_col.find_one.return_value = {"_id": "me@x.com", "delta_links": {"inbox": "link-1"}}
+    repo = MongoSyncStateRepository(manager)
+
+    assert await repo.get_delta_link("me@x.com", "inbox") == "link-1"
+    assert await repo.get_delta_link("me@x.com", "archive") is None
+
+    fake_col.find_one.return_value = None
+    assert await repo.get_delta_link("other@x.com", "inbox") is None
+
+
+@pytest.mark.asyncio
+async def test_save_delta_link_upserts_mailbox_document(fake_sync_state):
+    fake_col, manager = fake_sync_state
+    repo = MongoSyncStateRepository(manager)
+
+    await repo.save_delta_link("me@x.com", "inbox", "link-2")
+
+    query, update = fake_col.update_one.call_args[0]
+    assert query == {"_id": "me@x.com"}
+    assert update["$set"]["delta_links.inbox"] == "link-2"
+    assert fake_col.update_one.call_args[1] == {"upsert": True}
+
+
+@pytest.mark.asyncio
+async def test_get_checkpoint_parses_document(fake_sync_state):
+    fake_col, manager = fake_sync_state
+    hwm = datetime(2025, 4, 1, 10, 5)
+    fake_col.find_one.return_value = {
+        "_id": "me@x.com",
+        "high_water_mark": hwm,
+        "high_water_ids": ["a"],
+        "delta_links": {"inbox": "link"},
+    }
+    repo = MongoSyncStateRepository(manager)
+
+    checkpoint = await repo.get_checkpoint("me@x.com")
+
+    assert checkpoint.mailbox == "me@x.com"
+    assert checkpoint.high_water_mark == hwm
+    assert checkpoint.high_water_ids == ["a"]
+
+    fake_col.find_one.return_value = None
+    assert await repo.get_checkpoint("new@x.com") is None
+
+
+@pytest.mark.asyncio
+async def test_commit_checkpoint_and_record_run(fake_sync_state):
+    fake_col, manager = fake_sync_state
+    repo = MongoSyncStateRepository(manager)
+    hwm = datetime(2025, 4, 1, 10, 5, tzinfo=timezone.utc)
+
+    await repo.commit_checkpoint("me@x.com", hwm, ["a", "b"])
+    stats = SyncRunStats(mode="filter", started_at=hwm, stored=2)
+    await repo.record_run("me@x.com", stats)
+
+    (q1, u1), (q2, u2) = [call.args for call in fake_col.update_one.call_args_list]
+    assert q1 == q2 == {"_id": "me@x.com"}
+    assert u1["$set"]["high_water_mark"] == hwm
+    assert u1["$set"]["high_water_ids"] == ["a", "b"]
+    assert u2["$set"]["last_run"]["stored"] == 2
+
+
+@pytest.mark.asyncio
+async def test_fenced_write_rejects_older_lease_token(fake_sync_state):
+    fake_col, manager = fake_sync_state
+    repo = MongoSyncStateRepository(manager)
+    lease = Lease(_id="sync:me@x.com", owner="r1", token=4, expires_at=datetime.now(timezone.utc))
+
+    await repo.save_delta_link("me@x.com", "inbox", "link", fence=lease)
+    query, update = fake_col.update_one.call_args[0]
+    assert {"fence.token": {"$lte": 4}} in query["$or"]
+    assert update["$set"]["fence"] == {"lease": "sync:me@x.com", "token": 4}
+
+    fake_col.update_one.side_effect = DuplicateKeyError("newer holder")
+    with pytest.raises(LeaseLostError):
+        await repo.commit_checkpoint("me@x.com", datetime.now(timezone.utc), [], fence=lease)
@@ -0,0 +1,129 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.db.mongo_thread_repository import MongoThreadRepository
+from app.db.pagination import decode_cursor
+from app.schemas.email import EmailInDB
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.fixture
+def fake_db():
+    db = MagicMock()
+    db.threads.bulk_write = AsyncMock()
+    db.threads.delete_many = AsyncMock()
+
+    class DummyManager:
+        async def connect(self):
+            return db
+
+    return db, MongoThreadRepository(DummyManager())
+
+
+def email(id_, conversation, is_read, received, sender="a@x.com", to=("me@x.com",)):
+    at = datetime(2024, 5, received, tzinfo=timezone.utc).isoformat()
+    return EmailInDB(**{
+        "_id": id_, "conversationId": conversation, "isRead": is_read,
+        "subject": f"S {id_}", "receivedDateTime": at, "sentDateTime": at,
+        "createdDateTime": at, "lastModifiedDateTime": at, "changeKey": "ck",
+        "categories": [], "hasAttachments": False, "importance": "normal",
+        "body": None, "flag": None,
+        "sender": {"emailAddress": {"name": None, "address": sender}},
+        "toRecipients": [{"emailAddress": {"name": None, "address": a}} for a in to],
+    }).model_dump(by_alias=True)
+
+
+@pytest.mark.asyncio
+async def test_apply_counts_new_messages_and_read_changes(fake_db):
+    db, repo = fake_db
+    emails = [
+        email("m1", "c1", False, 1),
+        email("m2", "c1", False, 3, sender="b@x.com"),
+        # Already stored as unread, now read
+        email("m0", "c2", True, 2),
+    ]
+
+    await repo.apply(emails, {"m1", "m2"}, {"m0": {"_id": "m0", "conversationId": "c2", "isRead": False}})
+
+    c1, c2 = db.threads.bulk_write.call_args[0][0]
+    assert db.threads.bulk_write.call_args.kwargs == {"ordered": False}
+    assert c1._filter == {"_id": "c1"} and c1._upsert is True
+    assert c1._doc["$inc"] == {"message_count": 2, "unread_count": 2}
+    assert c1._doc["$max"] == {"last_activity_at": emails[1]["receivedDateTime"]}
+    assert c1._doc["$min"] == {"first_activity_at": emails[0]["receivedDateTime"]}
+    assert c1._doc["$addToSet"] == {"participants": {"$each": ["a@x.com", "b@x.com", "me@x.com"]}}
+    assert c1._doc["$setOnInsert"] == {"subject": "S m1"}
+    assert c2._doc["$inc"] == {"message_count": 0, "unread_count": -1}
+    # An update must not create a summary that would miss the older messages
+    assert c2._upsert is False
+
+
+@pytest.mark.asyncio
+async def test_apply_skips_failed_writes_and_removes_deleted_messages(fake_db):
+    db, repo = fake_db
+    previous = {"gone": {"_id": "gone", "conversationId": "c1", "isRead": False}}
+
+    await repo.apply([email("failed", "c9", False, 1)], set(), previous, removed_ids=["gone", "unknown"])
+
+    (op,) = db.threads.bulk_write.call_args[0][0]
+    assert op._filter == {"_id": "c1"}
+    assert op._doc == {"$inc": {"message_count": -1, "unread_count": -1}}
+    db.threads.delete_many.assert_awaited_once_with({"_id": {"$in": ["c1"]}, "message_count": {"$lte": 0}})
+
+
+@pytest.mark.asyncio
+async def test_apply_without_changes_skips_mongo(fake_db):
+    db, repo = fake_db
+    await repo.apply([], set(), {})
+    db.threads.bulk_write.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reads_read_state_of_stored_emails(fake_db):
+    db, repo = fake_db
+    db.emails.find = MagicMock(return_value=FakeCursor([{"_id": "m1", "conversationId": "c1", "isRead": True}]))
+
+    assert await repo.snapshot(["m1", "m2"]) == {"m1": {"_id": "m1", "conversationId": "c1", "isRead": True}}
+    assert db.emails.find.call_args[0] == ({"_id": {"$in": ["m1", "m2"]}}, {"conversationId": 1, "isRead": 1})
+    assert await repo.snapshot([]) == {}
+
+
+@pytest.mark.asyncio
+async def test_list_threads_filters_and_pages(fake_db):
+    db, repo = fake_db
+    at = datetime(2024, 5, 1)
+    db.threads.find = MagicMock(return_value=FakeCursor([
+        {"_id": f"c{i}", "message_count": 1, "last_activity_at": at} for i in range(3)
+    ]))
+
+    page = await repo.list_threads(participant="a@x.com", unread_only=True, limit=2)
+
+    assert db.threads.find.call_args[0][0] == {"participants": "a@x.com", "unread_count": {"$gt": 0}}
+    assert [t.conversation_id for t in page.items] == ["c0", "c1"]
+    assert decode_cursor(page.next_cursor) == (at, "c1")
+
+    await repo.list_threads(cursor=page.next_cursor)
+    assert "last_activity_at" in str(db.threads.find.call_args[0][0]["$or"])
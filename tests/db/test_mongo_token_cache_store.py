@@ -0,0 +1,97 @@
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from app.db.mongo_token_cache_store import MongoTokenCacheStore
+
+
+class FakeUpdateResult:
+    def __init__(self, matched_count):
+        self.matched_count = matched_count
+
+
+class FakeCollection:
+    """In-memory stand-in for the token_cache collection."""
+    def __init__(self):
+        self.docs = {}
+        self.find_calls = 0
+
+    async def find_one(self, query):
+        self.find_calls += 1
+        doc = self.docs.get(query["_id"])
+        if doc is None or doc["version"] == query["version"]["$ne"]:
+            return None
+        return dict(doc)
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("dup")
+        self.docs[doc["_id"]] = dict(doc)
+
+    async def update_one(self, query, update):
+        doc = self.docs.get(query["_id"])
+        if doc is None or doc["version"] != query["version"]:
+            return FakeUpdateResult(0)
+        doc.update(update["$set"])
+        doc["version"] += update["$inc"]["version"]
+        return FakeUpdateResult(1)
+
+
+@pytest.fixture
+def manager():
+    collection = FakeCollection()
+
+    class DummyManager:
+        async def connect(self):
+            return {"token_cache": collection}
+
+    m = DummyManager()
+    m.collection = collection
+    return m
+
+
+@pytest.mark.asyncio
+async def test_first_save_inserts_version_one(manager):
+    store = MongoTokenCacheStore(manager, key="k")
+
+    assert await store.save("cache-1") is True
+
+    assert manager.collection.docs["k"]["version"] == 1
+    assert manager.collection.docs["k"]["cache"] == "cache-1"
+
+
+@pytest.mark.asyncio
+async def test_workers_share_the_cache_and_detect_conflicts(manager):
+    worker_a = MongoTokenCacheStore(manager, key="k", read_ttl_seconds=0)
+    worker_b = MongoTokenCacheStore(manager, key="k", read_ttl_seconds=0)
+
+    await worker_a.save("cache-a1")
+    assert await worker_b.load() == "cache-a1"
+
+    # Both wrote from version 1, only the first one wins
+    assert await worker_a.save("cache-a2") is True
+    assert await worker_b.save("cache-b2") is False
+
+    assert manager.collection.docs["k"]["cache"] == "cache-a2"
+    assert await worker_b.load() == "cache-a2"
+    assert await worker_b.save("cache-b3") is True
+    assert manager.collection.docs["k"]["version"] == 3
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_insert_is_a_conflict(manager):
+    worker_a = MongoTokenCacheStore(manager, key="k")
+    worker_b = MongoTokenCacheStore(manager, key="k")
+
+    assert await worker_a.save("cache-a") is True
+    assert await worker_b.save("cache-b") is False
+
+
+@pytest.mark.asyncio
+async def test_reads_are_cached_in_process(manager):
+    store = MongoTokenCacheStore(manager, key="k", read_ttl_seconds=60)
+    await store.save("cache-1")
+
+    for _ in range(5):
+        assert await store.load() == "cache-1"
+
+    assert manager.collection.find_calls == 0
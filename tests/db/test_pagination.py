@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.db.pagination import (
+    decode_cursor,
+    decode_search_cursor,
+    encode_cursor,
+    encode_search_cursor,
+    keyset_filter,
+    search_keyset_filter,
+)
+
+
+def test_cursor_round_trips():
+    received = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    cursor = encode_cursor(received, "AAMk=/+id")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (received, "AAMk=/+id")
+
+
+# Not base64 JSON, a one-element list, a list with a bad date
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "WyJ4Il0", "WyJub3BlIiwibTEiXQ"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_keyset_filter_continues_after_ties():
+    received = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    assert keyset_filter(encode_cursor(received, "m5")) == {
+        "$or": [
+            {"receivedDateTime": {"$lt": received}},
+            {"receivedDateTime": received, "_id": {"$lt": "m5"}},
+        ],
+    }
+
+
+def test_search_cursor_round_trips_float_scores_exactly():
+    score = 1.1666666666666667
+    cursor = encode_search_cursor(score, "m1")
+    assert decode_search_cursor(cursor) == (score, "m1")
+    assert search_keyset_filter(cursor) == {
+        "$or": [
+            {"score": {"$lt": score}},
+            {"score": score, "_id": {"$gt": "m1"}},
+        ],
+    }
+    with pytest.raises(ValueError):
+        decode_search_cursor(encode_cursor(datetime(2024, 5, 1), "m1"))
@@ -0,0 +1,86 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.db.read_cache import ReadThroughCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_hit_until_ttl_expires():
+    clock = FakeClock()
+    cache = ReadThroughCache(ttl_seconds=10, clock=clock)
+    loader = AsyncMock(side_effect=["v1", "v2"])
+
+    assert await cache.get_or_load("k", loader) == "v1"
+    assert await cache.get_or_load("k", loader) == "v1"
+    clock.now = 11
+    assert await cache.get_or_load("k", loader) == "v2"
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entry_is_evicted():
+    cache = ReadThroughCache(max_entries=2)
+    for key in ["a", "b"]:
+        await cache.get_or_load(key, AsyncMock(return_value=key))
+    await cache.get_or_load("a", AsyncMock())
+    await cache.get_or_load("c", AsyncMock(return_value="c"))
+
+    reloaded = AsyncMock(return_value="b2")
+    assert await cache.get_or_load("b", reloaded) == "b2"
+    assert cache.stats()["evictions"] == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.01)
+        return "v"
+
+    cache = ReadThroughCache()
+    results = await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+
+    assert results == ["v"] * 5
+    assert loads == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+@pytest.mark.asyncio
+async def test_load_racing_an_invalidation_is_not_stored():
+    cache = ReadThroughCache()
+    release = asyncio.Event()
+
+    async def slow_loader():
+        await release.wait()
+        return "before-write"
+
+    read = asyncio.create_task(cache.get_or_load("k", slow_loader))
+    await asyncio.sleep(0)
+    cache.invalidate()
+    release.set()
+
+    assert await read == "before-write"
+    assert await cache.get_or_load("k", AsyncMock(return_value="after-write")) == "after-write"
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_not_cached():
+    cache = ReadThroughCache()
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("k", AsyncMock(side_effect=RuntimeError("mongo down")))
+    assert await cache.get_or_load("k", AsyncMock(return_value="v")) == "v"
@@ -0,0 +1,17 @@
+from app.mail.html_text import MAX_BODY_TEXT_CHARS, body_text, html_to_text
+
+
+def test_html_to_text_keeps_visible_text_only():
+    html = (
+        "<html><head><title>T</title><style>p {color: red}</style></head>"
+        "<body><p>Quarterly&nbsp;report</p><div>is <b>ready</b></div>"
+        "<script>alert(1)</script>Fish &amp; chips<br>done</body></html>"
+    )
+    assert html_to_text(html) == "Quarterly report is ready Fish & chips done"
+
+
+def test_body_text_handles_plain_and_missing_bodies():
+    assert body_text("text", "  line one\n\nline two ") == "line one line two"
+    assert body_text("html", "") is None
+    assert body_text(None, None) is None
+    assert len(body_text("text", "x" * (MAX_BODY_TEXT_CHARS + 10))) == MAX_BODY_TEXT_CHARS
@@ -0,0 +1,51 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.mail.http_transport import GraphHttpTransport
+
+
+@pytest.mark.asyncio
+async def test_open_and_close_manage_a_single_pool():
+    transport = GraphHttpTransport(pool_size=3, connect_timeout=1, read_timeout=2)
+    assert transport.is_open is False
+
+    await transport.open()
+    client = transport._client
+    assert transport.is_open is True
+    assert client.timeout.connect == 1
+    assert client.timeout.read == 2
+
+    # Re-opening keeps the same pool
+    await transport.open()
+    assert transport._client is client
+
+    await transport.close()
+    assert transport.is_open is False
+    assert client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_overlap():
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return httpx.Response(200, json={"path": request.url.path})
+
+    transport = GraphHttpTransport(pool_size=5)
+    transport._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    responses = await asyncio.gather(
+        *(transport.request("GET", f"https://graph.test/{i}") for i in range(5))
+    )
+    await transport.close()
+
+    assert [r.status_code for r in responses] == [200] * 5
+    assert peak == 5
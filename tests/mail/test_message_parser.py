@@ -0,0 +1,78 @@
+from app.mail.message_parser import parse_messages
+from app.schemas.email import EmailInDB
+
+
+def graph_message(id_="m1", **overrides):
+    at = "2024-05-01T10:00:00Z"
+    message = {
+        "@odata.etag": "W/\"1\"",
+        "id": id_,
+        "changeKey": "ck",
+        "createdDateTime": at,
+        "lastModifiedDateTime": at,
+        "receivedDateTime": at,
+        "sentDateTime": at,
+        "categories": [],
+        "hasAttachments": False,
+        "subject": "Hello",
+        "importance": "normal",
+        "conversationId": "c1",
+        "body": {"contentType": "html", "content": "<p>Hi</p>"},
+        "sender": {"emailAddress": {"name": "A", "address": "A@Example.COM"}},
+        "toRecipients": [{"emailAddress": {"name": None, "address": "b@example.com"}}],
+        "flag": {"flagStatus": "notFlagged"},
+        # Fields EmailInDB doesn't know are dropped
+        "uniqueBody": {"contentType": "html", "content": "<p>Hi</p>"},
+    }
+    message.update(overrides)
+    return message
+
+
+def test_documents_match_the_model_dump():
+    raw = graph_message()
+
+    parsed = parse_messages([raw])
+
+    assert parsed.errors == []
+    assert parsed.documents == [EmailInDB(**raw).model_dump(by_alias=True)]
+
+
+def test_invalid_messages_are_rejected_individually():
+    messages = [
+        graph_message("m1"),
+        graph_message("m2", receivedDateTime="not a date"),
+        graph_message("m3"),
+        None,
+        graph_message("m5", sender={"emailAddress": {"name": "X", "address": "nope"}}),
+    ]
+
+    parsed = parse_messages(messages)
+
+    assert [doc["_id"] for doc in parsed.documents] == ["m1", "m3"]
+    assert [(error.index, error.message_id) for error in parsed.errors] == [
+        (1, "m2"), (3, None), (4, "m5"),
+    ]
+    assert parsed.errors[0].errors[0]["loc"] == ("receivedDateTime",)
+    assert "m2: receivedDateTime" in str(parsed.errors[0])
+    assert parsed.errors[2].errors[0]["loc"] == ("sender", "emailAddress", "address")
+
+
+def test_message_without_id_is_rejected():
+    raw = graph_message()
+    del raw["id"]
+
+    parsed = parse_messages([raw, graph_message("m2")])
+
+    assert [doc["_id"] for doc in parsed.documents] == ["m2"]
+    assert parsed.errors[0].index == 0
+    assert parsed.errors[0].errors[0]["loc"] == ("id",)
+
+
+def test_stored_id_is_accepted():
+    raw = graph_message()
+    raw["_id"] = raw.pop("id")
+
+    parsed = parse_messages([raw])
+
+    assert parsed.documents[0]["_id"] == "m1"
+    assert "id" not in parsed.documents[0]
@@ -1,41 +1,45 @@
 import pytest
 from datetime import datetime, timedelta, timezone
 
-import requests
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock
 
-from app.mail.ms_graph_client import GraphMailClient
+import httpx
+
+from app.mail.ms_graph_client import GraphMailClient, mailbox_api_url
 from app.schemas.email import EmailCreate
 
 
-class DummyAuthFlow:
-    """A fake auth flow that returns a constant token dict."""
+class DummyTokenProvider:
+    """A fake token provider that returns a constant access token."""
     def __init__(self, token):
         self._token = token
 
-    def acquire_token(self):
+    async def get_token(self):
         return self._token
 
 
 @pytest.fixture
 def client(tmp_path):
-    """Return a GraphMailClient with a dummy auth flow."""
-    token = {"access_token": "fake-token"}
-    auth = DummyAuthFlow(token)
+    """Return a GraphMailClient with a dummy token provider."""
+    auth = DummyTokenProvider("fake-token")
     # Use a fake base URL so we don't accidentally hit real Graph
     api_url = "https://graph.microsoft.com/v1.0"
-    c = GraphMailClient(auth, user_email="me@example.com", api_url=api_url)
-    # Override requests.post/get so they don't use real network
+    # Fake transport so we don't use the real network
+    transport = MagicMock()
+    transport.request = AsyncMock()
+    c = GraphMailClient(
+        auth, user_email="me@example.com", api_url=api_url, transport=transport,
+        min_backoff_seconds=0, max_backoff_seconds=0,
+    )
     return c
 
 
 # send_email tests
 
-@patch.object(requests, "post")
 @pytest.mark.asyncio
-async def test_send_email_success(mock_post, client):
-    mock_resp = MagicMock(status_code=202)
-    mock_post.return_value = mock_resp
+async def test_send_email_success(client):
+    mock_request = client.transport.request
+    mock_request.return_value = MagicMock(status_code=202)
 
     email = EmailCreate(
         recipients=["a@x.com"],
@@ -45,15 +49,18 @@ async def test_send_email_success(mock_post, client):
     )
     result = await client.send_email(email)
     assert result is True
-    mock_post.assert_called_once()
-    url_called = mock_post.call_args[0][0]
+    mock_request.assert_awaited_once()
+    method, url_called = mock_request.call_args[0]
+    assert method == "POST"
     assert url_called.endswith("/sendMail")
+    headers = mock_request.call_args[1]["headers"]
+    assert headers["Authorization"] == "Bearer fake-token"
 
-@patch.object(requests, "post")
 @pytest.mark.asyncio
-async def test_send_email_failure_code(mock_post, client):
-    mock_resp = MagicMock(status_code=400, text="Bad Request")
-    mock_post.return_value = mock_resp
+async def test_send_email_failure_code(client):
+    client.transport.request.return_value = MagicMock(
+        status_code=400, text="Bad Request"
+    )
 
     email = EmailCreate(
         recipients=["a@x.com"],
@@ -63,9 +70,9 @@ async def test_send_email_failure_code(mock_post, client):
     result = await client.send_email(email)
     assert result is False
 
-@patch.object(requests, "post", side_effect=Exception("Boom"))
 @pytest.mark.asyncio
-async def test_send_email_exception(mock_post, client):
+async def test_send_email_exception(client):
+    client.transport.request.side_effect = Exception("Boom")
     email = EmailCreate(
         recipients=["a@x.com"],
         subject="Hi",
@@ -77,44 +84,335 @@ async def test_send_email_exception(mock_post, client):
 
 # fetch_emails tests
 
-@patch.object(requests, "get")
 @pytest.mark.asyncio
-async def test_fetch_emails_initial_and_update(mock_get, client):
-    # First call: returns 2 messages
+async def test_fetch_emails_returns_all_messages(client):
+    mock_get = client.transport.request
     now = datetime.now(timezone.utc)
     msg1 = {"receivedDateTime": (now - timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ")}
     msg2 = {"receivedDateTime": now.strftime("%Y-%m-%dT%H:%M:%SZ")}
     mock_get.return_value = MagicMock(status_code=200, json=lambda: {"value": [msg1, msg2]})
 
-    # First fetch: should return both and set last_fetch_time to msg2 time
     messages = await client.fetch_emails()
-    assert messages == [msg1, msg2]
-    assert client.last_fetch_time.isoformat().startswith(now.isoformat()[:19])
 
-    # Prepare second call: only returns msg2 onwards
-    mock_get.reset_mock()
-    mock_get.return_value = MagicMock(
-        status_code=200,
-        json=lambda: {"value": [msg2]}
+    assert messages == [msg1, msg2]
+    method, called_url = mock_get.call_args[0]
+    assert method == "GET"
+    assert called_url.endswith("/messages")
+    # Without a checkpoint the window starts one day back
+    expected = (now - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M")
+    assert mock_get.call_args[1]["params"]["$filter"].startswith(
+        f"receivedDateTime ge {expected}"
     )
 
-    # Second fetch: using filter, returns only the new list
-    messages2 = await client.fetch_emails()
-    assert messages2 == [msg2]
-    mock_get.assert_called_once()
-    # Ensure the URL includes the filter with the previous timestamp
-    called_url = mock_get.call_args[0][0]
-    assert "$filter=receivedDateTime ge" in called_url
 
-@patch.object(requests, "get")
 @pytest.mark.asyncio
-async def test_fetch_emails_non_200(mock_get, client):
-    mock_get.return_value = MagicMock(status_code=500, text="Error")
+async def test_iter_email_pages_starts_at_since(client):
+    mock_get = client.transport.request
+    mock_get.return_value = MagicMock(status_code=200, json=lambda: {"value": []})
+    since = datetime(2025, 4, 1, 12, 30, 15, 999, tzinfo=timezone.utc)
+
+    [page async for page in client.iter_email_pages(since=since)]
+
+    params = mock_get.call_args[1]["params"]
+    assert params["$filter"] == "receivedDateTime ge 2025-04-01T12:30:15Z"
+    assert params["$orderby"] == "receivedDateTime asc"
+
+@pytest.mark.asyncio
+async def test_fetch_emails_non_200(client):
+    client.transport.request.return_value = MagicMock(status_code=500, text="Error", headers={})
     messages = await client.fetch_emails()
     assert messages == []
+    # Reads are retried before giving up
+    assert client.transport.request.await_count == client.max_retries + 1
 
-@patch.object(requests, "get", side_effect=Exception("Fail network"))
 @pytest.mark.asyncio
-async def test_fetch_emails_exception(mock_get, client):
+async def test_fetch_emails_exception(client):
+    client.transport.request.side_effect = Exception("Fail network")
     messages = await client.fetch_emails()
     assert messages == []
+
+
+@pytest.mark.asyncio
+async def test_iter_email_pages_follows_next_link(client):
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    next_link = "https://graph.microsoft.com/v1.0/messages?$skip=2"
+    pages = [
+        {"value": [{"id": "1", "receivedDateTime": now}, {"id": "2", "receivedDateTime": now}],
+         "@odata.nextLink": next_link},
+        {"value": [{"id": "3", "receivedDateTime": now}]},
+    ]
+    client.transport.request.side_effect = [
+        MagicMock(status_code=200, json=lambda page=page: page) for page in pages
+    ]
+
+    batches = [page async for page in client.iter_email_pages(page_size=2)]
+
+    assert [[m["id"] for m in b.messages] for b in batches] == [["1", "2"], ["3"]]
+    first_call, second_call = client.transport.request.call_args_list
+    assert first_call[1]["params"]["$top"] == 2
+    # nextLink is followed verbatim, without re-sending the query options
+    assert second_call[0][1] == next_link
+    assert second_call[1]["params"] is None
+
+
+@pytest.mark.asyncio
+async def test_iter_email_pages_stops_on_failed_page(client):
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    client.transport.request.side_effect = [
+        MagicMock(status_code=200, json=lambda: {
+            "value": [{"id": "1", "receivedDateTime": now}],
+            "@odata.nextLink": "https://graph.microsoft.com/next",
+        }),
+    ] + [MagicMock(status_code=500, text="Error", headers={})] * (client.max_retries + 1)
+
+    batches = [page async for page in client.iter_email_pages()]
+
+    assert len(batches) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_retries_throttled_page_after_retry_after(client):
+    client.transport.request.side_effect = [
+        MagicMock(status_code=429, text="Throttled", headers={"Retry-After": "0"}),
+        MagicMock(status_code=200, headers={}, json=lambda: {"value": [{"id": "1"}]}),
+    ]
+
+    messages = await client.fetch_emails()
+
+    assert [m["id"] for m in messages] == ["1"]
+    assert client.rate_limiter.stats()["me@example.com"]["throttled_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_send_retries_429_but_not_503(client):
+    email = EmailCreate(recipients=["a@x.com"], subject="Hi", body="Body")
+    client.transport.request.side_effect = [
+        MagicMock(status_code=429, text="Throttled", headers={"Retry-After": "0"}),
+        MagicMock(status_code=202, headers={}),
+    ]
+    assert await client.send_email(email) is True
+
+    client.transport.request.reset_mock()
+    client.transport.request.side_effect = None
+    # A 503 may have been executed, resending could deliver the mail twice
+    client.transport.request.return_value = MagicMock(status_code=503, text="Busy", headers={})
+    assert await client.send_email(email) is False
+    assert client.transport.request.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_send_retries_only_connections_that_never_opened(client):
+    email = EmailCreate(recipients=["a@x.com"], subject="Hi", body="Body")
+    client.transport.request.side_effect = [
+        httpx.ConnectError("refused"),
+        MagicMock(status_code=202, headers={}),
+    ]
+    assert await client.send_email(email) is True
+
+    client.transport.request.reset_mock()
+    client.transport.request.side_effect = httpx.ReadTimeout("slow")
+    assert await client.send_email(email) is False
+    assert client.transport.request.await_count == 1
+
+
+# delta sync tests
+
+@pytest.mark.asyncio
+async def test_iter_delta_pages_splits_removed_items_and_returns_delta_link(client):
+    next_link = "https://graph.microsoft.com/v1.0/me/mailFolders/inbox/messages/delta?$skiptoken=a"
+    delta_link = "https://graph.microsoft.com/v1.0/me/mailFolders/inbox/messages/delta?$deltatoken=b"
+    pages = [
+        {"value": [{"id": "1"}], "@odata.nextLink": next_link},
+        {"value": [{"id": "2"}, {"id": "3", "@removed": {"reason": "deleted"}}],
+         "@odata.deltaLink": delta_link},
+    ]
+    client.transport.request.side_effect = [
+        MagicMock(status_code=200, json=lambda page=page: page) for page in pages
+    ]
+
+    batches = [page async for page in client.iter_delta_pages("inbox", page_size=10)]
+
+    assert [[m["id"] for m in b.messages] for b in batches] == [["1"], ["2"]]
+    assert batches[1].removed_ids == ["3"]
+    assert batches[0].delta_link is None
+    assert batches[1].delta_link == delta_link
+
+    first_call, second_call = client.transport.request.call_args_list
+    assert first_call[0][1].endswith("/mailFolders/inbox/messages/delta")
+    assert first_call[1]["headers"]["Prefer"] == "odata.maxpagesize=10"
+    assert second_call[0][1] == next_link
+
+
+@pytest.mark.asyncio
+async def test_iter_delta_pages_resumes_from_delta_link(client):
+    delta_link = "https://graph.microsoft.com/v1.0/me/mailFolders/inbox/messages/delta?$deltatoken=b"
+    client.transport.request.return_value = MagicMock(
+        status_code=200, json=lambda: {"value": [], "@odata.deltaLink": delta_link}
+    )
+
+    batches = [page async for page in client.iter_delta_pages("inbox", delta_link)]
+
+    assert batches[0].delta_link == delta_link
+    method, url = client.transport.request.call_args[0]
+    assert url == delta_link
+    assert client.transport.request.call_args[1]["params"] is None
+
+
+@pytest.mark.asyncio
+async def test_iter_delta_pages_restarts_when_delta_link_expired(client):
+    fresh_link = "https://graph.microsoft.com/v1.0/me/mailFolders/inbox/messages/delta?$deltatoken=new"
+    client.transport.request.side_effect = [
+        MagicMock(status_code=410, text="Gone"),
+        MagicMock(status_code=200, json=lambda: {"value": [{"id": "1"}], "@odata.deltaLink": fresh_link}),
+    ]
+
+    batches = [page async for page in client.iter_delta_pages("inbox", "https://old-link")]
+
+    assert batches[0].delta_link == fresh_link
+    restart_url = client.transport.request.call_args_list[1][0][1]
+    assert restart_url.endswith("/mailFolders/inbox/messages/delta")
+
+
+# send_emails_batch tests
+
+def make_emails(n):
+    return [
+        EmailCreate(recipients=[f"user{i}@x.com"], subject=f"S{i}", body="B")
+        for i in range(n)
+    ]
+
+
+def batch_reply(request_body, status_for=lambda i: 202):
+    responses = []
+    for item in reversed(request_body["requests"]):
+        i = int(item["id"])
+        status = status_for(i)
+        reply = {"id": item["id"], "status": status}
+        if status != 202:
+            reply["body"] = {"error": {"message": f"failed {i}"}}
+        responses.append(reply)
+    return MagicMock(status_code=200, json=lambda: {"responses": responses})
+
+
+def test_batch_url_is_derived_from_api_url():
+    c = GraphMailClient(DummyTokenProvider("t"), "me@x.com", "https://graph.microsoft.com/v1.0/me", transport=MagicMock())
+    assert c.batch_url == "https://graph.microsoft.com/v1.0/$batch"
+    assert c.batch_resource == "/me"
+
+
+def test_mailbox_api_url_escapes_the_address():
+    api_url = "https://graph.microsoft.com/v1.0/me"
+
+    assert mailbox_api_url(api_url, "a@x.com") == "https://graph.microsoft.com/v1.0/users/a@x.com"
+    assert mailbox_api_url(api_url, "a@x.com?$top=1#") == (
+        "https://graph.microsoft.com/v1.0/users/a@x.com%3F%24top%3D1%23"
+    )
+
+
+@pytest.mark.asyncio
+async def test_send_emails_batch_chunks_by_twenty(client):
+    client.transport.request.side_effect = lambda method, url, headers, json: batch_reply(json)
+
+    results = await client.send_emails_batch(make_emails(45))
+
+    assert client.transport.request.await_count == 3
+    sizes = [len(call.kwargs["json"]["requests"]) for call in client.transport.request.call_args_list]
+    assert sizes == [20, 20, 5]
+    method, url = client.transport.request.call_args[0]
+    assert (method, url) == ("POST", "https://graph.microsoft.com/v1.0/$batch")
+    assert [r.index for r in results] == list(range(45))
+    assert all(r.sent for r in results)
+
+
+@pytest.mark.asyncio
+async def test_send_emails_batch_maps_item_status_back(client):
+    client.transport.request.side_effect = lambda method, url, headers, json: batch_reply(
+        json, status_for=lambda i: 400 if i == 1 else 202,
+    )
+
+    results = await client.send_emails_batch(make_emails(3))
+
+    assert [r.sent for r in results] == [True, False, True]
+    assert results[1].status_code == 400
+    assert results[1].error == "failed 1"
+    payload = client.transport.request.call_args.kwargs["json"]["requests"][2]
+    assert payload["url"].endswith("/sendMail")
+    assert payload["body"]["message"]["subject"] == "S2"
+
+
+@pytest.mark.asyncio
+async def test_send_emails_batch_marks_whole_chunk_failed(client):
+    client.transport.request.return_value = MagicMock(status_code=400, text="Bad batch")
+
+    results = await client.send_emails_batch(make_emails(2))
+
+    assert [(r.sent, r.status_code) for r in results] == [(False, 400), (False, 400)]
+
+
+@pytest.mark.asyncio
+async def test_send_emails_batch_resends_throttled_items(client):
+    replies = iter([
+        lambda body: batch_reply(body, status_for=lambda i: 429 if i == 1 else 202),
+        lambda body: batch_reply(body),
+    ])
+    client.transport.request.side_effect = lambda method, url, headers, json: next(replies)(json)
+
+    results = await client.send_emails_batch(make_emails(3))
+
+    assert all(r.sent for r in results)
+    resent = client.transport.request.call_args_list[1].kwargs["json"]["requests"]
+    assert [item["id"] for item in resent] == ["1"]
+
+
+# subscription / single message tests
+
+@pytest.mark.asyncio
+async def test_get_message_returns_none_when_gone(client):
+    client.transport.request.return_value = MagicMock(status_code=404, headers={})
+    assert await client.get_message("m1") is None
+    method, url = client.transport.request.call_args[0]
+    assert (method, url) == ("GET", "https://graph.microsoft.com/v1.0/messages/m1")
+
+
+@pytest.mark.asyncio
+async def test_get_message_raises_instead_of_reporting_gone(client):
+    response = MagicMock(status_code=403, headers={})
+    response.raise_for_status.side_effect = httpx.HTTPStatusError("403", request=None, response=None)
+    client.transport.request.return_value = response
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.get_message("m1")
+
+
+@pytest.mark.asyncio
+async def test_create_subscription_targets_folder_messages():
+    transport = MagicMock()
+    transport.request = AsyncMock(return_value=MagicMock(
+        status_code=201, headers={}, json=MagicMock(return_value={"id": "sub-1"}),
+    ))
+    c = GraphMailClient(
+        DummyTokenProvider("t"), "me@x.com", "https://graph.microsoft.com/v1.0/users/me@x.com",
+        transport=transport,
+    )
+    expires = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+    created = await c.create_subscription(
+        "https://hook/notifications", "secret", expires, lifecycle_url="https://hook/notifications",
+    )
+
+    assert created == {"id": "sub-1"}
+    method, url = transport.request.call_args[0]
+    assert (method, url) == ("POST", "https://graph.microsoft.com/v1.0/subscriptions")
+    body = transport.request.call_args.kwargs["json"]
+    assert body["resource"] == "users/me@x.com/mailFolders('inbox')/messages"
+    assert body["clientState"] == "secret"
+    assert body["expirationDateTime"].startswith("2030-01-01T00:00:00")
+    assert body["lifecycleNotificationUrl"] == "https://hook/notifications"
+
+
+@pytest.mark.asyncio
+async def test_renew_subscription_reports_missing_subscription(client):
+    client.transport.request.return_value = MagicMock(status_code=404, headers={})
+    renewed = await client.renew_subscription("sub-1", datetime.now(timezone.utc) + timedelta(days=1))
+    assert renewed is None
+    method, url = client.transport.request.call_args[0]
+    assert (method, url) == ("PATCH", "https://graph.microsoft.com/v1.0/subscriptions/sub-1")
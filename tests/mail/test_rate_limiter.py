@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from app.mail.rate_limiter import GraphRateLimiter, Lane, parse_retry_after
+
+
+def test_parse_retry_after_seconds_and_dates():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    later = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < parse_retry_after(format_datetime(later, usegmt=True)) <= 30
+
+
+@pytest.mark.asyncio
+async def test_burst_is_granted_without_waiting():
+    limiter = GraphRateLimiter(rate_per_second=1, burst=3, send_reserve=0)
+
+    waits = [await limiter.acquire("me@x.com") for _ in range(3)]
+
+    assert max(waits) < 0.05
+
+
+@pytest.mark.asyncio
+async def test_fetch_leaves_reserve_for_sends():
+    limiter = GraphRateLimiter(rate_per_second=1, burst=3, send_reserve=2)
+    await limiter.acquire("me@x.com", Lane.FETCH)
+
+    # The reserved tokens are still there for a send...
+    assert await limiter.acquire("me@x.com", Lane.SEND) < 0.05
+    # ...but not for more fetch traffic
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(limiter.acquire("me@x.com", Lane.FETCH), 0.1)
+
+
+@pytest.mark.asyncio
+async def test_waiting_send_goes_before_fetch():
+    limiter = GraphRateLimiter(rate_per_second=20, burst=1, send_reserve=0)
+    await limiter.acquire("me@x.com")
+    order = []
+
+    async def take(lane):
+        await limiter.acquire("me@x.com", lane)
+        order.append(lane)
+
+    await asyncio.gather(take(Lane.FETCH), take(Lane.SEND))
+
+    assert order == [Lane.SEND, Lane.FETCH]
+
+
+@pytest.mark.asyncio
+async def test_throttle_blocks_mailbox_until_retry_after():
+    limiter = GraphRateLimiter(rate_per_second=100, burst=10)
+    limiter.throttle("me@x.com", 0.2)
+
+    waited = await limiter.acquire("me@x.com", Lane.SEND)
+
+    assert waited >= 0.15
+    assert limiter.stats()["me@x.com"]["throttled_count"] == 1
+    assert limiter.throttled_count("me@x.com") == 1
+    assert limiter.throttled_count("unknown@x.com") == 0
+    # Other mailboxes have their own bucket
+    assert await limiter.acquire("other@x.com") < 0.05
@@ -0,0 +1,78 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services.contact_graph import ContactGraphWriter
+
+
+def recipient(address):
+    return {"emailAddress": {"name": None, "address": address}}
+
+
+def email(sender, to=(), cc=()):
+    return {
+        "sender": recipient(sender),
+        "toRecipients": [recipient(a) for a in to],
+        "ccRecipients": [recipient(a) for a in cc],
+    }
+
+
+@pytest.mark.asyncio
+async def test_record_send_writes_both_directions_once():
+    repo = MagicMock()
+    repo.add_contacts = AsyncMock()
+    writer = ContactGraphWriter(repo)
+
+    assert await writer.record_send("me@x.com", ["a@x.com", "b@x.com"]) == 4
+    repo.add_contacts.assert_awaited_once_with({
+        "me@x.com": {"a@x.com", "b@x.com"},
+        "a@x.com": {"me@x.com"},
+        "b@x.com": {"me@x.com"},
+    })
+
+    # Same people again: served from the LRU, no MongoDB round-trip
+    assert await writer.record_send("me@x.com", ["a@x.com"]) == 0
+    repo.add_contacts.assert_awaited_once()
+    assert writer.stats()["cache_hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_lru_evicts_least_recently_used_pairs():
+    repo = MagicMock()
+    repo.add_contacts = AsyncMock()
+    writer = ContactGraphWriter(repo, cache_size=2)
+
+    await writer.add([("u", "a"), ("u", "b")])
+    await writer.add([("u", "a")])
+    await writer.add([("u", "c")])
+    await writer.add([("u", "a"), ("u", "b")])
+
+    assert repo.add_contacts.await_args_list[-1].args[0] == {"u": {"b"}}
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_not_cached_or_raised():
+    repo = MagicMock()
+    repo.add_contacts = AsyncMock(side_effect=[RuntimeError("mongo down"), None])
+    writer = ContactGraphWriter(repo)
+
+    assert await writer.record_send("me@x.com", ["a@x.com"]) == 0
+    assert await writer.record_send("me@x.com", ["a@x.com"]) == 2
+    assert writer.stats()["failure_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_record_received_links_owner_with_correspondents():
+    repo = MagicMock()
+    repo.add_contacts = AsyncMock()
+    writer = ContactGraphWriter(repo)
+
+    await writer.record_received("me@x.com", [
+        email("a@x.com", to=["me@x.com", "z@x.com"]),
+        email("me@x.com", to=["b@x.com"], cc=["c@x.com"]),
+    ])
+
+    contacts = repo.add_contacts.await_args.args[0]
+    assert contacts["me@x.com"] == {"a@x.com", "b@x.com", "c@x.com"}
+    assert contacts["a@x.com"] == {"me@x.com"}
+    assert "z@x.com" not in contacts
@@ -1,11 +1,35 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 
+from app.mail.base import MessagePage
 from app.services.email_manager import EmailManager
-from app.schemas.email import EmailCreate, EmailInDB
+from app.schemas.email import EmailCreate, Recipient
+from app.schemas.sync import BulkUpsertResult, SyncCheckpoint
 from datetime import datetime, timezone
 
 
+def bulk_repo(**kwargs):
+    """Repository mock whose upsert_emails reports every email as inserted."""
+    repo = MagicMock()
+
+    async def upsert_emails(emails):
+        return BulkUpsertResult(inserted=len(emails), upserted_ids=[e["_id"] for e in emails])
+
+    repo.upsert_emails = AsyncMock(side_effect=upsert_emails, **kwargs)
+    return repo
+
+
+def stored_ids(repo):
+    return [e["_id"] for call in repo.upsert_emails.await_args_list for e in call.args[0]]
+
+
+def pages_of(*pages):
+    async def _iter_email_pages(since=None, page_size=None):
+        for messages in pages:
+            yield MessagePage(messages=messages)
+    return _iter_email_pages
+
+
 @pytest.fixture
 def email_create():
     return EmailCreate(
@@ -60,7 +84,7 @@ async def test_send_email_success(email_create):
 
     repo = MagicMock()
 
-    manager = EmailManager(mail_client, repo)
+    manager = EmailManager(mail_client, repo, user_email="me@example.com")
 
     success = await manager.send_email(email_create)
 
@@ -75,7 +99,7 @@ async def test_send_email_failure(email_create):
 
     repo = MagicMock()
 
-    manager = EmailManager(mail_client, repo)
+    manager = EmailManager(mail_client, repo, user_email="me@example.com")
 
     success = await manager.send_email(email_create)
 
@@ -83,37 +107,378 @@ async def test_send_email_failure(email_create):
     mail_client.send_email.assert_awaited_once_with(email_create)
 
 
+@pytest.mark.asyncio
+async def test_send_email_records_contacts_only_when_sent(email_create):
+    mail_client = MagicMock()
+    mail_client.send_email = AsyncMock(side_effect=[True, False])
+    contact_writer = MagicMock()
+    contact_writer.record_send = AsyncMock()
+
+    manager = EmailManager(
+        mail_client, MagicMock(), user_email="me@example.com", contact_writer=contact_writer,
+    )
+
+    await manager.send_email(email_create)
+    await manager.send_email(email_create)
+
+    contact_writer.record_send.assert_awaited_once_with("me@example.com", email_create.recipients)
+
+
+@pytest.mark.asyncio
+async def test_synced_pages_feed_the_contact_graph(valid_email_dict):
+    mail_client = MagicMock()
+    mail_client.iter_email_pages = pages_of([valid_email_dict])
+    contact_writer = MagicMock()
+    contact_writer.record_received = AsyncMock()
+
+    manager = EmailManager(
+        mail_client, bulk_repo(), user_email="me@example.com", contact_writer=contact_writer,
+    )
+    await manager.sync_and_store_emails()
+
+    owner, emails = contact_writer.record_received.await_args.args
+    assert owner == "me@example.com"
+    assert [e["_id"] for e in emails] == [valid_email_dict["id"]]
+
+
+def test_email_recipients_parser_collects_addresses():
+    manager = EmailManager(MagicMock(), MagicMock(), user_email="me@example.com")
+    recipients = [
+        Recipient(emailAddress={"name": "A", "address": "a@x.com"}),
+        Recipient(emailAddress={"name": "B", "address": "a@x.com"}),
+    ]
+    assert manager._email_recipients_parser(recipients) == {"a@x.com"}
+    assert manager._email_recipients_parser() == set()
+
+
 @pytest.mark.asyncio
 async def test_sync_and_store_emails(valid_email_dict):
     mail_client = MagicMock()
-    mail_client.fetch_emails = AsyncMock(return_value=[valid_email_dict])
+    mail_client.iter_email_pages = pages_of([valid_email_dict])
 
-    repo = MagicMock()
-    repo.upsert_email = AsyncMock()
+    repo = bulk_repo()
 
-    manager = EmailManager(mail_client, repo)
+    manager = EmailManager(mail_client, repo, user_email="me@example.com")
 
     result = await manager.sync_and_store_emails()
 
-    assert len(result) == 1
-    assert isinstance(result[0], EmailInDB)
-    repo.upsert_email.assert_awaited_once()
-    mail_client.fetch_emails.assert_awaited_once()
+    assert result.stored == 1
+    assert result.pages == 1
+    repo.upsert_emails.assert_awaited_once()
 
 
 @pytest.mark.asyncio
 async def test_sync_skips_invalid_emails(valid_email_dict):
     mail_client = MagicMock()
-    mail_client.fetch_emails = AsyncMock(return_value=[valid_email_dict, {"invalid": "data"}])
+    mail_client.iter_email_pages = pages_of([valid_email_dict, {"invalid": "data"}])
 
-    repo = MagicMock()
-    repo.upsert_email = AsyncMock()
+    repo = bulk_repo()
 
-    manager = EmailManager(mail_client, repo)
+    manager = EmailManager(mail_client, repo, user_email="me@example.com")
 
     result = await manager.sync_and_store_emails()
 
     # Only one valid email should be stored
-    assert len(result) == 1
-    repo.upsert_email.assert_awaited_once()
-    mail_client.fetch_emails.assert_awaited_once()
+    assert result.stored == 1
+    assert result.failed == 1
+    repo.upsert_emails.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_sync_stores_every_page(valid_email_dict):
+    second = {**valid_email_dict, "id": "email-456"}
+    mail_client = MagicMock()
+    mail_client.iter_email_pages = pages_of([valid_email_dict], [second])
+
+    repo = bulk_repo()
+
+    manager = EmailManager(mail_client, repo, user_email="me@example.com")
+
+    result = await manager.sync_and_store_emails()
+
+    assert result.stored == 2
+    assert stored_ids(repo) == ["email-123", "email-456"]
+    # One bulk write per page
+    assert repo.upsert_emails.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_delta_sync_applies_removals_and_saves_delta_link(valid_email_dict):
+    async def iter_delta_pages(folder, delta_link=None, page_size=None, since=None):
+        assert (folder, delta_link) == ("inbox", "old-link")
+        # Read back naive from MongoDB, passed on as UTC for a restarted round
+        assert since == datetime(2024, 5, 1, 10, tzinfo=timezone.utc)
+        yield MessagePage(messages=[valid_email_dict], next_link="next")
+        yield MessagePage(removed_ids=["gone-1"], delta_link="new-link")
+
+    mail_client = MagicMock()
+    mail_client.iter_delta_pages = iter_delta_pages
+
+    repo = bulk_repo()
+    repo.delete_emails = AsyncMock(return_value=1)
+
+    sync_state = MagicMock()
+    sync_state.get_checkpoint = AsyncMock(return_value=SyncCheckpoint(
+        _id="me@example.com", delta_links={"inbox": "old-link"},
+        high_water_mark=datetime(2024, 5, 1, 10),
+    ))
+    sync_state.save_delta_link = AsyncMock()
+    sync_state.record_run = AsyncMock()
+
+    manager = EmailManager(
+        mail_client, repo, user_email="me@example.com",
+        sync_state_repo=sync_state, sync_mode="delta",
+    )
+
+    result = await manager.sync_and_store_emails()
+
+    assert result.stored == 1
+    assert result.removed == 1
+    repo.delete_emails.assert_awaited_once_with(["gone-1"])
+    sync_state.save_delta_link.assert_awaited_once_with("me@example.com", "inbox", "new-link", fence=None)
+
+
+@pytest.mark.asyncio
+async def test_delta_link_not_saved_when_round_is_incomplete(valid_email_dict):
+    async def iter_delta_pages(folder, delta_link=None, page_size=None, since=None):
+        yield MessagePage(messages=[valid_email_dict], next_link="next")
+
+    mail_client = MagicMock()
+    mail_client.iter_delta_pages = iter_delta_pages
+
+    repo = bulk_repo()
+
+    sync_state = MagicMock()
+    sync_state.get_checkpoint = AsyncMock(return_value=None)
+    sync_state.save_delta_link = AsyncMock()
+    sync_state.record_run = AsyncMock()
+
+    manager = EmailManager(
+        mail_client, repo, user_email="me@example.com",
+        sync_state_repo=sync_state, sync_mode="delta",
+    )
+
+    await manager.sync_and_store_emails()
+
+    sync_state.save_delta_link.assert_not_awaited()
+
+
+def email_at(valid_email_dict, id_, received):
+    return {**valid_email_dict, "id": id_, "receivedDateTime": received}
+
+
+@pytest.mark.asyncio
+async def test_sync_resumes_from_checkpoint_and_commits_after_each_page(valid_email_dict):
+    seen_since = []
+    checkpoint = SyncCheckpoint(
+        _id="me@example.com",
+        high_water_mark=datetime(2025, 4, 1, 10, 0),  # naive, as Mongo returns it
+        high_water_ids=["already-stored"],
+    )
+
+    async def iter_email_pages(since=None, page_size=None):
+        seen_since.append(since)
+        yield MessagePage(messages=[
+            email_at(valid_email_dict, "already-stored", "2025-04-01T10:00:00Z"),
+            email_at(valid_email_dict, "new-1", "2025-04-01T10:05:00Z"),
+        ])
+        yield MessagePage(messages=[
+            email_at(valid_email_dict, "new-2", "2025-04-01T10:05:00Z"),
+        ])
+
+    mail_client = MagicMock()
+    mail_client.iter_email_pages = iter_email_pages
+    repo = bulk_repo()
+    sync_state = MagicMock()
+    sync_state.get_checkpoint = AsyncMock(return_value=checkpoint)
+    sync_state.commit_checkpoint = AsyncMock()
+    sync_state.record_run = AsyncMock()
+
+    manager = EmailManager(mail_client, repo, user_email="me@example.com",
+                           sync_state_repo=sync_state)
+
+    stats = await manager.sync_and_store_emails()
+
+    assert seen_since == [datetime(2025, 4, 1, 10, 0, tzinfo=timezone.utc)]
+    assert stored_ids(repo) == ["new-1", "new-2"]
+    assert stats.skipped == 1
+
+    commits = [call.args for call in sync_state.commit_checkpoint.await_args_list]
+    hwm = datetime(2025, 4, 1, 10, 5, tzinfo=timezone.utc)
+    assert commits == [
+        ("me@example.com", hwm, ["new-1"]),
+        ("me@example.com", hwm, ["new-1", "new-2"]),
+    ]
+    sync_state.record_run.assert_awaited_once_with("me@example.com", stats, fence=None)
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_not_committed_when_storage_fails(valid_email_dict):
+    mail_client = MagicMock()
+    mail_client.iter_email_pages = pages_of([valid_email_dict])
+    repo = MagicMock()
+    repo.upsert_emails = AsyncMock(side_effect=Exception("mongo down"))
+    sync_state = MagicMock()
+    sync_state.get_checkpoint = AsyncMock(return_value=None)
+    sync_state.commit_checkpoint = AsyncMock()
+    sync_state.record_run = AsyncMock()
+
+    manager = EmailManager(mail_client, repo, user_email="me@example.com",
+                           sync_state_repo=sync_state)
+
+    with pytest.raises(Exception, match="mongo down"):
+        await manager.sync_and_store_emails()
+
+    sync_state.commit_checkpoint.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_sync_reports_bulk_write_failures(valid_email_dict):
+    second = {**valid_email_dict, "id": "email-456"}
+    mail_client = MagicMock()
+    mail_client.iter_email_pages = pages_of([valid_email_dict, second])
+    repo = MagicMock()
+    repo.upsert_emails = AsyncMock(return_value=BulkUpsertResult(
+        inserted=1, failed=1, errors=["document too large"],
+    ))
+
+    manager = EmailManager(mail_client, repo, user_email="me@example.com")
+
+    stats = await manager.sync_and_store_emails()
+
+    assert stats.stored == 1
+    assert stats.inserted == 1
+    assert stats.failed == 1
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_stays_before_emails_that_failed_to_store(valid_email_dict):
+    mail_client = MagicMock()
+    mail_client.iter_email_pages = pages_of(
+        [
+            email_at(valid_email_dict, "ok-1", "2025-04-01T10:00:00Z"),
+            email_at(valid_email_dict, "bad", "2025-04-01T10:05:00Z"),
+            email_at(valid_email_dict, "ok-2", "2025-04-01T10:10:00Z"),
+        ],
+        [email_at(valid_email_dict, "ok-3", "2025-04-01T10:15:00Z")],
+    )
+    repo = bulk_repo()
+    repo.upsert_emails.side_effect = [
+        BulkUpsertResult(inserted=2, failed=1, failed_ids=["bad"], errors=["too large"]),
+        BulkUpsertResult(inserted=1),
+    ]
+    sync_state = MagicMock()
+    sync_state.get_checkpoint = AsyncMock(return_value=None)
+    sync_state.commit_checkpoint = AsyncMock()
+    sync_state.record_run = AsyncMock()
+
+    manager = EmailManager(mail_client, repo, user_email="me@example.com", sync_state_repo=sync_state)
+    await manager.sync_and_store_emails()
+
+    # Only ok-1 is safely behind the failure; later pages don't move it either
+    sync_state.commit_checkpoint.assert_awaited_once_with(
+        "me@example.com", datetime(2025, 4, 1, 10, 0, tzinfo=timezone.utc), ["ok-1"], fence=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_delta_link_not_saved_when_a_write_in_the_round_failed(valid_email_dict):
+    async def iter_delta_pages(folder, delta_link=None, page_size=None, since=None):
+        yield MessagePage(messages=[email_at(valid_email_dict, "bad", "2025-04-01T10:05:00Z")])
+        yield MessagePage(
+            messages=[email_at(valid_email_dict, "ok", "2025-04-01T10:10:00Z")],
+            delta_link="new-link",
+        )
+
+    mail_client = MagicMock()
+    mail_client.iter_delta_pages = iter_delta_pages
+    repo = bulk_repo()
+    repo.upsert_emails.side_effect = [
+        BulkUpsertResult(failed=1, failed_ids=["bad"], errors=["too large"]),
+        BulkUpsertResult(inserted=1),
+    ]
+    sync_state = MagicMock()
+    sync_state.get_checkpoint = AsyncMock(return_value=None)
+    sync_state.save_delta_link = AsyncMock()
+    sync_state.record_run = AsyncMock()
+
+    manager = EmailManager(
+        mail_client, repo, user_email="me@example.com",
+        sync_state_repo=sync_state, sync_mode="delta",
+    )
+    stats = await manager.sync_and_store_emails()
+
+    # The next run resumes from the old link and gets "bad" again
+    assert (stats.stored, stats.failed) == (1, 1)
+    sync_state.save_delta_link.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_store_messages_by_id_stores_found_and_removes_gone(valid_email_dict):
+    mail_client = MagicMock()
+    mail_client.get_message = AsyncMock(side_effect=lambda i: valid_email_dict if i == "m1" else None)
+    repo = bulk_repo()
+    repo.delete_emails = AsyncMock(return_value=1)
+
+    manager = EmailManager(mail_client, repo, user_email="me@example.com")
+    result = await manager.store_messages_by_id(["m1", "m2"])
+
+    assert result.mode == "push"
+    assert (result.stored, result.removed) == (1, 1)
+    repo.delete_emails.assert_awaited_once_with(["m2"])
+
+
+@pytest.mark.asyncio
+async def test_stored_pages_update_thread_summaries(valid_email_dict):
+    async def iter_delta_pages(folder, delta_link=None, page_size=None, since=None):
+        yield MessagePage(messages=[valid_email_dict], removed_ids=["gone-1"], delta_link="link")
+
+    mail_client = MagicMock()
+    mail_client.iter_delta_pages = iter_delta_pages
+    repo = bulk_repo()
+    repo.delete_emails = AsyncMock(return_value=1)
+    thread_repo = MagicMock()
+    thread_repo.snapshot = AsyncMock(return_value={"gone-1": {"conversationId": "c1", "isRead": False}})
+    thread_repo.apply = AsyncMock(side_effect=RuntimeError("threads down"))
+    sync_state = MagicMock()
+    sync_state.get_checkpoint = AsyncMock(return_value=None)
+    sync_state.save_delta_link = AsyncMock()
+    sync_state.record_run = AsyncMock()
+
+    manager = EmailManager(
+        mail_client, repo, user_email="me@example.com",
+        sync_state_repo=sync_state, sync_mode="delta", thread_repo=thread_repo,
+    )
+    result = await manager.sync_and_store_emails()
+
+    thread_repo.snapshot.assert_awaited_once_with([valid_email_dict["id"], "gone-1"])
+    emails, inserted_ids, previous, removed_ids = thread_repo.apply.await_args.args
+    assert inserted_ids == {valid_email_dict["id"]}
+    assert removed_ids == ["gone-1"]
+    # A failing summary update doesn't hold the sync back
+    assert result.stored == 1
+    sync_state.save_delta_link.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_sync_stores_pages_parsed_by_the_parse_pool(valid_email_dict):
+    from app.mail.message_parser import MessageError, parse_messages
+
+    mail_client = MagicMock()
+    mail_client.iter_email_pages = pages_of([valid_email_dict, {"id": "broken"}])
+    parse_pool = MagicMock()
+
+    async def pipeline(pages):
+        async for page in pages:
+            parsed = parse_messages(page.messages[:1])
+            parsed.errors.append(MessageError(1, "broken", []))
+            yield page, parsed
+
+    parse_pool.pipeline = pipeline
+    repo = bulk_repo()
+    manager = EmailManager(mail_client, repo, user_email="me@example.com", parse_pool=parse_pool)
+
+    stats = await manager.sync_and_store_emails()
+
+    assert stored_ids(repo) == [valid_email_dict["id"]]
+    assert stats.fetched == 2 and stats.stored == 1 and stats.failed == 1
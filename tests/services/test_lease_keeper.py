@@ -0,0 +1,57 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.db.base import LeaseLostError
+from app.schemas.lease import Lease
+from app.services.lease_keeper import LeaseKeeper
+
+
+def lease():
+    return Lease(_id="sync:a@x.com", owner="r1", token=1, expires_at=datetime.now(timezone.utc))
+
+
+@pytest.mark.asyncio
+async def test_run_heartbeats_and_releases():
+    repo = AsyncMock()
+    repo.renew.side_effect = lambda held, ttl: held
+    keeper = LeaseKeeper(repo, owner="r1", ttl_seconds=0.06)
+
+    async def work():
+        await asyncio.sleep(0.1)
+        return "done"
+
+    assert await keeper.run(lease(), work) == "done"
+    assert repo.renew.await_count >= 2
+    repo.release.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_lost_lease_cancels_work():
+    repo = AsyncMock()
+    repo.renew.return_value = None
+    keeper = LeaseKeeper(repo, owner="r1", ttl_seconds=0.03)
+    finished = []
+
+    async def work():
+        await asyncio.sleep(1)
+        finished.append(True)
+
+    with pytest.raises(LeaseLostError):
+        await keeper.run(lease(), work)
+    assert finished == []
+    # The new holder owns it now, nothing to release
+    repo.release.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_acquire_uses_replica_owner_and_ttl():
+    repo = AsyncMock()
+    keeper = LeaseKeeper(repo, ttl_seconds=30)
+
+    await keeper.acquire("sync:all")
+
+    repo.acquire.assert_awaited_once_with("sync:all", keeper.owner, 30)
+    assert keeper.owner.count(":") == 2
@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.schemas.sync import SyncRunStats
+from app.services.notification_processor import NotificationProcessor
+
+
+def manager_factory(stored=None, error=None):
+    managers = {}
+
+    def factory(mailbox):
+        if mailbox not in managers:
+            manager = MagicMock()
+            manager.store_messages_by_id = AsyncMock(
+                side_effect=error,
+                return_value=SyncRunStats(mode="push", started_at=datetime.now(timezone.utc), stored=stored or 0),
+            )
+            managers[mailbox] = manager
+        return managers[mailbox]
+
+    factory.managers = managers
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_workers_fetch_each_changed_message_once():
+    factory = manager_factory(stored=2)
+    processor = NotificationProcessor(factory, workers=1, batch_size=10)
+    for message_id in ["m1", "m2", "m1"]:
+        processor.submit("a@x.com", message_id)
+    processor.submit("b@x.com", "m9")
+
+    processor.start()
+    await asyncio.wait_for(processor.drain(), timeout=1)
+    await processor.stop()
+
+    factory.managers["a@x.com"].store_messages_by_id.assert_awaited_once_with(["m1", "m2"])
+    factory.managers["b@x.com"].store_messages_by_id.assert_awaited_once_with(["m9"])
+    assert processor.stats()["received_count"] == 4
+    assert processor.stats()["stored_count"] == 4
+    assert processor.stats()["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_and_resyncs_mailbox():
+    on_gap = AsyncMock()
+    processor = NotificationProcessor(manager_factory(), queue_size=1, on_gap=on_gap)
+
+    assert processor.submit("a@x.com", "m1") is True
+    assert processor.submit("a@x.com", "m2") is False
+    await asyncio.sleep(0)
+
+    on_gap.assert_awaited_once_with("a@x.com")
+    assert processor.stats()["dropped_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_falls_back_to_resync():
+    on_gap = AsyncMock()
+    processor = NotificationProcessor(manager_factory(error=RuntimeError("boom")), on_gap=on_gap)
+
+    await processor.process([("a@x.com", "m1"), ("a@x.com", "m2")])
+    await asyncio.sleep(0)
+
+    assert processor.stats()["failed_count"] == 2
+    on_gap.assert_awaited_once_with("a@x.com")
@@ -0,0 +1,129 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.auth.base import TokenAcquisitionError
+from app.schemas.email import EmailCreate
+from app.schemas.outbox import OutboxMessage
+from app.services.outbox_worker import OutboxWorkerPool
+
+
+def queued(attempts=0, max_attempts=3):
+    now = datetime.now(timezone.utc)
+    return OutboxMessage(
+        _id="m1",
+        mailbox="me@x.com",
+        email=EmailCreate(recipients=["a@x.com"], subject="S", body="B"),
+        attempts=attempts,
+        max_attempts=max_attempts,
+        next_attempt_at=now,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def outbox_repo(*messages):
+    repo = AsyncMock()
+    repo.claim.side_effect = [*messages, None]
+    return repo
+
+
+@pytest.mark.asyncio
+async def test_sent_message_is_marked_sent():
+    repo = outbox_repo(queued())
+    pool = OutboxWorkerPool(repo, AsyncMock(return_value=True))
+
+    assert await pool.process_one("w1") is True
+    repo.mark_sent.assert_awaited_once_with("m1", "w1")
+    assert pool.sent_count == 1
+    assert await pool.process_one("w1") is False
+
+
+@pytest.mark.asyncio
+async def test_failed_send_is_retried_with_backoff():
+    repo = outbox_repo(queued(attempts=0))
+    pool = OutboxWorkerPool(repo, AsyncMock(return_value=False), min_backoff_seconds=1, max_backoff_seconds=5)
+
+    await pool.process_one("w1")
+
+    message_id, owner, error, retry_at = repo.mark_retry.call_args[0]
+    assert (message_id, owner) == ("m1", "w1")
+    assert retry_at > datetime.now(timezone.utc)
+    assert repo.mark_retry.call_args.kwargs == {"attempted": True}
+
+
+@pytest.mark.asyncio
+async def test_last_attempt_marks_message_failed():
+    repo = outbox_repo(queued(attempts=2, max_attempts=3))
+    pool = OutboxWorkerPool(repo, AsyncMock(side_effect=RuntimeError("boom")))
+
+    await pool.process_one("w1")
+
+    repo.mark_failed.assert_awaited_once_with("m1", "w1", "boom")
+    assert pool.stats()["failed_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_token_does_not_spend_an_attempt():
+    repo = outbox_repo(queued(attempts=2, max_attempts=3))
+    pool = OutboxWorkerPool(repo, AsyncMock(side_effect=TokenAcquisitionError("login")))
+
+    await pool.process_one("w1")
+
+    repo.mark_failed.assert_not_awaited()
+    assert repo.mark_retry.call_args.kwargs == {"attempted": False}
+
+
+@pytest.mark.asyncio
+async def test_workers_drain_queue_and_stop():
+    repo = AsyncMock()
+    repo.claim.side_effect = [queued(), queued()] + [None] * 10
+    send = AsyncMock(return_value=True)
+    pool = OutboxWorkerPool(repo, send, workers=2, poll_interval_seconds=60)
+
+    pool.start()
+    await asyncio.sleep(0.05)
+    await pool.stop()
+
+    assert send.await_count == 2
+    assert pool.stats()["workers"] == 0
+
+
+@pytest.mark.asyncio
+async def test_lease_is_renewed_while_send_is_in_flight():
+    repo = outbox_repo(queued())
+    repo.renew_lease.return_value = True
+
+    async def slow_send(mailbox, email):
+        await asyncio.sleep(0.05)
+        return True
+
+    pool = OutboxWorkerPool(repo, slow_send, lease_seconds=0.03)
+    await pool.process_one("w1")
+
+    repo.renew_lease.assert_awaited_with("m1", "w1", 0.03)
+    repo.mark_sent.assert_awaited_once_with("m1", "w1")
+
+
+@pytest.mark.asyncio
+async def test_lost_lease_cancels_send_and_leaves_message_alone():
+    repo = outbox_repo(queued())
+    repo.renew_lease.return_value = False
+    cancelled = asyncio.Event()
+
+    async def hanging_send(mailbox, email):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    pool = OutboxWorkerPool(repo, hanging_send, lease_seconds=0.03)
+    assert await pool.process_one("w1") is True
+
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    repo.mark_sent.assert_not_awaited()
+    repo.mark_retry.assert_not_awaited()
+    repo.mark_failed.assert_not_awaited()
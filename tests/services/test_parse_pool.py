@@ -0,0 +1,138 @@
+import asyncio
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import aclosing
+
+import pytest
+
+from app.mail.base import MessagePage
+from app.mail.message_parser import ParsedPage
+from app.services.parse_pool import ParsePool
+
+
+def graph_message(id_, **overrides):
+    at = "2024-05-01T10:00:00Z"
+    message = {
+        "id": id_, "changeKey": "ck", "createdDateTime": at, "lastModifiedDateTime": at,
+        "receivedDateTime": at, "sentDateTime": at, "categories": [], "hasAttachments": False,
+        "subject": f"S {id_}", "importance": "normal", "flag": None,
+        "body": {"contentType": "html", "content": "<p>Hi <b>there</b></p>"},
+        "sender": {"emailAddress": {"name": None, "address": "a@x.com"}},
+    }
+    message.update(overrides)
+    return message
+
+
+class InlinePool(ParsePool):
+    """ParsePool without processes, recording what it was asked to parse."""
+
+    def __init__(self, **kwargs):
+        super().__init__(workers=1, **kwargs)
+        self.parsed: list[list[dict]] = []
+
+    async def parse(self, messages):
+        self.parsed.append(messages)
+        return ParsedPage(documents=[{"_id": m["id"]} for m in messages])
+
+
+async def pages_of(*pages, fetched=None, closed=None, fail_after=None):
+    try:
+        for n, messages in enumerate(pages):
+            if fail_after is not None and n == fail_after:
+                raise RuntimeError("graph down")
+            if fetched is not None:
+                fetched.append(n)
+            yield MessagePage(messages=messages)
+    finally:
+        if closed is not None:
+            closed.set()
+
+
+@pytest.mark.asyncio
+async def test_parse_spreads_chunks_over_workers_and_keeps_order():
+    pool = ParsePool(workers=2, chunk_size=2)
+    messages = [graph_message(f"m{i}") for i in range(5)]
+    messages[3]["receivedDateTime"] = "not a date"
+    try:
+        parsed = await pool.parse(messages)
+    finally:
+        pool.shutdown()
+
+    assert [doc["_id"] for doc in parsed.documents] == ["m0", "m1", "m2", "m4"]
+    # Index into the page, not into the chunk
+    assert [(error.index, error.message_id) for error in parsed.errors] == [(3, "m3")]
+    assert parsed.documents[0]["bodyText"] == "Hi there"
+    assert pool.stats()["chunks"] == 3 and pool.stats()["running"] is False
+
+
+class BrokenExecutor(Executor):
+    """Behaves like a ProcessPoolExecutor whose worker was killed."""
+
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.mark.asyncio
+async def test_broken_pool_is_dropped_and_page_parsed_in_process():
+    pool = ParsePool(workers=2, chunk_size=2)
+    broken = BrokenExecutor()
+    pool._executor = broken
+
+    parsed = await pool.parse([graph_message("m0"), graph_message("m1"), graph_message("m2")])
+
+    assert [doc["_id"] for doc in parsed.documents] == ["m0", "m1", "m2"]
+    assert parsed.documents[0]["bodyText"] == "Hi there"
+    assert broken.shut_down and pool._executor is None
+    assert pool.stats()["broken_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_yields_in_order_while_fetching_ahead():
+    pool = InlinePool(max_pages_in_flight=2)
+    fetched = []
+    pages = [[graph_message(f"p{n}")] for n in range(5)]
+
+    seen = []
+    async with aclosing(pool.pipeline(pages_of(*pages, fetched=fetched))) as parsed_pages:
+        async for page, parsed in parsed_pages:
+            if not seen:
+                # Writing the first page: the next ones are fetched meanwhile
+                await asyncio.sleep(0.01)
+                assert len(fetched) >= 3
+            seen.append(parsed.documents[0]["_id"])
+
+    assert seen == ["p0", "p1", "p2", "p3", "p4"]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_raises_fetch_errors_after_earlier_pages():
+    pool = InlinePool()
+    seen = []
+
+    with pytest.raises(RuntimeError, match="graph down"):
+        async for page, parsed in pool.pipeline(pages_of([graph_message("p0")], [], fail_after=1)):
+            seen.append(page)
+
+    assert len(seen) == 1
+
+
+@pytest.mark.asyncio
+async def test_closing_pipeline_early_stops_the_fetch():
+    pool = InlinePool(max_pages_in_flight=1)
+    closed = asyncio.Event()
+    pages = [[graph_message(f"p{n}")] for n in range(10)]
+
+    async with aclosing(pool.pipeline(pages_of(*pages, closed=closed))) as parsed_pages:
+        async for _ in parsed_pages:
+            break
+
+    await asyncio.wait_for(closed.wait(), timeout=1)
+    assert len(pool.parsed) < 10
@@ -0,0 +1,52 @@
+from app.services.poll_scheduler import AdaptivePollScheduler
+
+
+def test_interval_follows_arrival_rate_within_bounds():
+    scheduler = AdaptivePollScheduler(initial_seconds=120, min_seconds=30, max_seconds=300)
+
+    assert scheduler.observe("a", stored=5) == 60
+    assert scheduler.observe("a", stored=1) == 30
+    assert scheduler.observe("a", stored=3) == 30
+    assert scheduler.observe("a", stored=0) == 45
+    for _ in range(10):
+        scheduler.observe("a", stored=0)
+    assert scheduler.stats()["mailboxes"]["a"]["interval_seconds"] == 300
+
+
+def test_failed_and_skipped_syncs_keep_the_interval():
+    scheduler = AdaptivePollScheduler(initial_seconds=120)
+
+    assert scheduler.observe("a", stored=None, failed=True) == 120
+    assert scheduler.observe("a", stored=None) == 120
+    reasons = [entry["reason"] for entry in scheduler.stats()["mailboxes"]["a"]["history"]]
+    assert reasons == ["failed", "skipped"]
+
+
+def test_throttling_backs_off_even_when_mail_arrived():
+    throttles = {"a": 0}
+    scheduler = AdaptivePollScheduler(
+        initial_seconds=60, max_seconds=600, throttled_count=lambda m: throttles[m],
+    )
+    scheduler.due(["a"])
+
+    throttles["a"] = 2
+    assert scheduler.observe("a", stored=10) == 120
+    # No new throttle since the last sync
+    assert scheduler.observe("a", stored=10) == 60
+
+
+def test_only_mailboxes_past_their_interval_are_due():
+    scheduler = AdaptivePollScheduler(initial_seconds=60)
+
+    assert scheduler.due(["a", "b"]) == ["a", "b"]
+    scheduler.observe("a", stored=0)
+    assert scheduler.due(["a", "b"]) == ["b"]
+    assert 0 < scheduler.stats()["mailboxes"]["a"]["due_in_seconds"] <= 90
+
+
+def test_history_is_bounded():
+    scheduler = AdaptivePollScheduler(initial_seconds=60, history_size=3)
+    for stored in range(5):
+        scheduler.observe("a", stored=stored)
+    history = scheduler.stats()["mailboxes"]["a"]["history"]
+    assert [entry["stored"] for entry in history] == [2, 3, 4]
@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.schemas.mailbox import Mailbox
+from app.services.subscription_manager import SubscriptionManager
+
+
+def make_manager(mailboxes, client=None, lease_keeper=None):
+    repo = MagicMock()
+    repo.list_mailboxes = AsyncMock(return_value=mailboxes)
+    repo.save_subscription = AsyncMock()
+    repo.find_by_subscription = AsyncMock(return_value=None)
+    client = client or MagicMock()
+    manager = SubscriptionManager(
+        repo, lambda address: client, "https://hook", "secret",
+        ttl_minutes=60, lease_keeper=lease_keeper,
+    )
+    return manager, repo, client
+
+
+@pytest.mark.asyncio
+async def test_ensure_all_creates_missing_subscriptions():
+    client = MagicMock()
+    client.create_subscription = AsyncMock(return_value={"id": "sub-1"})
+    manager, repo, _ = make_manager([Mailbox(_id="a@x.com")], client)
+
+    await manager.ensure_all()
+
+    client.create_subscription.assert_awaited_once()
+    assert client.create_subscription.call_args[0][:2] == ("https://hook", "secret")
+    assert repo.save_subscription.call_args[0][:2] == ("a@x.com", "sub-1")
+    assert await manager.mailbox_for("sub-1") == "a@x.com"
+    assert manager.stats()["created_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fresh_subscription_is_left_alone():
+    fresh = Mailbox(
+        _id="a@x.com", subscription_id="sub-1",
+        subscription_expires_at=datetime.now(timezone.utc) + timedelta(minutes=50),
+    )
+    manager, repo, client = make_manager([fresh])
+    client.renew_subscription = AsyncMock()
+
+    await manager.ensure_all()
+
+    client.renew_subscription.assert_not_awaited()
+    repo.save_subscription.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_expiring_subscription_is_renewed_or_recreated():
+    expiring = Mailbox(
+        _id="a@x.com", subscription_id="sub-1",
+        subscription_expires_at=datetime.now(timezone.utc) + timedelta(minutes=5),
+    )
+    client = MagicMock()
+    client.renew_subscription = AsyncMock(side_effect=[{"id": "sub-1"}, None])
+    client.create_subscription = AsyncMock(return_value={"id": "sub-2"})
+    manager, repo, _ = make_manager([expiring], client)
+
+    await manager.ensure(expiring)
+    assert manager.stats()["renewed_count"] == 1
+    client.create_subscription.assert_not_awaited()
+
+    await manager.ensure(expiring)
+    assert repo.save_subscription.call_args[0][:2] == ("a@x.com", "sub-2")
+
+
+@pytest.mark.asyncio
+async def test_ensure_all_skips_when_another_replica_holds_lease():
+    lease_keeper = MagicMock()
+    lease_keeper.acquire = AsyncMock(return_value=None)
+    manager, repo, _ = make_manager([Mailbox(_id="a@x.com")], lease_keeper=lease_keeper)
+
+    await manager.ensure_all()
+
+    lease_keeper.acquire.assert_awaited_once_with("subscriptions")
+    repo.list_mailboxes.assert_not_awaited()
+
+
+def test_verify_client_state():
+    manager, _, _ = make_manager([])
+    assert manager.verify_client_state("secret")
+    assert not manager.verify_client_state("wrong")
+    assert not manager.verify_client_state(None)
+
+
+@pytest.mark.asyncio
+async def test_removed_subscription_is_cleared_and_recreated():
+    client = MagicMock()
+    client.create_subscription = AsyncMock(return_value={"id": "sub-2"})
+    manager, repo, _ = make_manager([], client)
+    manager._mailbox_by_subscription["sub-1"] = "a@x.com"
+    repo.get_mailbox = AsyncMock(return_value=Mailbox(_id="a@x.com"))
+
+    manager.handle_lifecycle("a@x.com", "sub-1", "subscriptionRemoved")
+    await asyncio.gather(*manager._tasks)
+
+    assert repo.save_subscription.call_args_list[0].args == ("a@x.com", None, None)
+    assert repo.save_subscription.call_args[0][:2] == ("a@x.com", "sub-2")
+    assert client.create_subscription.call_args.kwargs["lifecycle_url"] == "https://hook"
+    assert await manager.mailbox_for("sub-2") == "a@x.com"
+    assert manager.stats()["removed_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reauthorization_renews_a_fresh_subscription():
+    fresh = Mailbox(
+        _id="a@x.com", subscription_id="sub-1",
+        subscription_expires_at=datetime.now(timezone.utc) + timedelta(minutes=50),
+    )
+    client = MagicMock()
+    client.renew_subscription = AsyncMock(return_value={"id": "sub-1"})
+    manager, repo, _ = make_manager([], client)
+    repo.get_mailbox = AsyncMock(return_value=fresh)
+
+    manager.handle_lifecycle("a@x.com", "sub-1", "reauthorizationRequired")
+    await asyncio.gather(*manager._tasks)
+
+    client.renew_subscription.assert_awaited_once()
+    assert manager.stats()["renewed_count"] == 1
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from app.services.sync_coordinator import SyncCoordinator
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_run():
+    coordinator = SyncCoordinator()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "stats"
+
+    results = await asyncio.gather(*(coordinator.run("a", work) for _ in range(3)))
+
+    assert results == ["stats"] * 3
+    assert len(calls) == 1
+    assert coordinator.stats()["coalesced_count"] == 2
+    assert not coordinator.is_running("a")
+
+
+@pytest.mark.asyncio
+async def test_shared_run_propagates_errors_to_every_caller():
+    coordinator = SyncCoordinator()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("graph down")
+
+    results = await asyncio.gather(
+        coordinator.run("a", work), coordinator.run("a", work), return_exceptions=True,
+    )
+
+    assert [str(r) for r in results] == ["graph down", "graph down"]
+
+
+@pytest.mark.asyncio
+async def test_sequential_runs_start_fresh_and_keys_are_independent():
+    coordinator = SyncCoordinator()
+
+    async def work():
+        return 1
+
+    await coordinator.run("a", work)
+    await coordinator.run("a", work)
+    await coordinator.run("b", work)
+
+    assert coordinator.stats()["started_count"] == 3
+    assert coordinator.stats()["coalesced_count"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_run():
+    coordinator = SyncCoordinator()
+    done = asyncio.Event()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        done.set()
+        return "ok"
+
+    first = asyncio.create_task(coordinator.run("a", work))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(coordinator.run("a", work))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "ok"
+    assert done.is_set()
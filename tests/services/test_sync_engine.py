@@ -0,0 +1,292 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.schemas.lease import Lease
+from app.schemas.mailbox import Mailbox
+from app.schemas.sync import SyncRunStats
+from app.services.poll_scheduler import AdaptivePollScheduler
+from app.services.sync_engine import MailboxSyncEngine
+
+
+def registry(*addresses):
+    repo = AsyncMock()
+    repo.list_mailboxes.return_value = [Mailbox(_id=address) for address in addresses]
+    return repo
+
+
+class FakeManager:
+    def __init__(self, address, tracker, fail=False):
+        self.address = address
+        self.tracker = tracker
+        self.fail = fail
+
+    async def sync_and_store_emails(self, fence=None):
+        self.tracker.setdefault("fences", []).append(fence)
+        self.tracker["running"] += 1
+        self.tracker["peak"] = max(self.tracker["peak"], self.tracker["running"])
+        self.tracker["order"].append(self.address)
+        await asyncio.sleep(0.01)
+        self.tracker["running"] -= 1
+        if self.fail:
+            raise RuntimeError("graph down")
+        return SyncRunStats(mode="filter", started_at=datetime.now(timezone.utc), stored=1)
+
+
+def engine_for(repo, failing=(), max_concurrency=2):
+    tracker = {"running": 0, "peak": 0, "order": []}
+    engine = MailboxSyncEngine(
+        repo,
+        lambda address: FakeManager(address, tracker, fail=address in failing),
+        max_concurrency=max_concurrency,
+    )
+    return engine, tracker
+
+
+@pytest.mark.asyncio
+async def test_run_once_respects_concurrency_cap():
+    engine, tracker = engine_for(registry("a", "b", "c", "d", "e"), max_concurrency=2)
+
+    started = await engine.run_once()
+    await engine.drain()
+
+    assert sorted(started) == ["a", "b", "c", "d", "e"]
+    assert tracker["peak"] == 2
+
+
+@pytest.mark.asyncio
+async def test_start_of_queue_rotates_between_runs():
+    engine, tracker = engine_for(registry("a", "b", "c"), max_concurrency=1)
+
+    await engine.run_once()
+    await engine.drain()
+    await engine.run_once()
+    await engine.drain()
+
+    assert tracker["order"] == ["a", "b", "c", "b", "c", "a"]
+
+
+@pytest.mark.asyncio
+async def test_failing_mailbox_does_not_stop_the_others():
+    repo = registry("a", "b")
+    engine, _ = engine_for(repo, failing={"a"})
+
+    await engine.run_once()
+    await engine.drain()
+
+    assert engine.stats()["mailboxes"]["a"]["failures"] == 1
+    assert engine.stats()["mailboxes"]["b"]["last_stored"] == 1
+    recorded = {call.args[0]: call.args[3] for call in repo.record_sync.await_args_list}
+    assert recorded == {"a": "graph down", "b": None}
+
+
+@pytest.mark.asyncio
+async def test_stats_report_lag_per_mailbox():
+    engine, _ = engine_for(registry("a", "b"), failing={"b"})
+
+    await engine.run_once()
+    await engine.drain()
+    mailboxes = engine.stats()["mailboxes"]
+
+    assert mailboxes["a"]["lag_seconds"] >= 0
+    assert mailboxes["a"]["last_stored"] == 1
+    assert mailboxes["b"]["lag_seconds"] is None
+    assert mailboxes["b"]["failures"] == 1
+
+
+def lease_keeper(held_elsewhere=()):
+    keeper = AsyncMock()
+
+    async def acquire(name):
+        if name in held_elsewhere:
+            return None
+        return Lease(_id=name, owner="r1", token=7, expires_at=datetime.now(timezone.utc))
+
+    async def run(lease, work):
+        return await work()
+
+    keeper.acquire.side_effect = acquire
+    keeper.run.side_effect = run
+    return keeper
+
+
+@pytest.mark.asyncio
+async def test_mailbox_leases_split_work_between_replicas():
+    repo = registry("a", "b")
+    tracker = {"running": 0, "peak": 0, "order": []}
+    engine = MailboxSyncEngine(
+        repo,
+        lambda address: FakeManager(address, tracker),
+        lease_keeper=lease_keeper(held_elsewhere={"sync:b"}),
+    )
+
+    await engine.run_once()
+    await engine.drain()
+
+    assert tracker["order"] == ["a"]
+    assert tracker["fences"][0].token == 7
+    assert engine.stats()["mailboxes"]["b"]["lease_skips"] == 1
+
+
+@pytest.mark.asyncio
+async def test_global_lease_skips_whole_run_when_held():
+    engine = MailboxSyncEngine(
+        registry("a"),
+        lambda address: None,
+        lease_keeper=lease_keeper(held_elsewhere={"sync:all"}),
+        lease_scope="global",
+    )
+
+    assert await engine.run_once() == []
+    assert engine.stats()["global_lease_skips"] == 1
+
+
+@pytest.mark.asyncio
+async def test_on_demand_sync_takes_the_global_lease():
+    tracker = {"running": 0, "peak": 0, "order": []}
+    keeper = lease_keeper(held_elsewhere=set())
+    engine = MailboxSyncEngine(
+        registry("a", "b"),
+        lambda address: FakeManager(address, tracker),
+        lease_keeper=keeper,
+        lease_scope="global",
+    )
+
+    stats = await engine.sync_mailbox("a")
+
+    assert stats.stored == 1
+    keeper.acquire.assert_awaited_once_with("sync:all")
+    assert tracker["fences"] == [keeper.run.await_args.args[0]]
+
+
+@pytest.mark.asyncio
+async def test_on_demand_sync_is_skipped_when_global_lease_is_held():
+    tracker = {"running": 0, "peak": 0, "order": []}
+    engine = MailboxSyncEngine(
+        registry("a"),
+        lambda address: FakeManager(address, tracker),
+        lease_keeper=lease_keeper(held_elsewhere={"sync:all"}),
+        lease_scope="global",
+    )
+
+    assert await engine.sync_mailbox("a") is None
+    assert tracker["order"] == []
+    assert engine.stats()["mailboxes"]["a"]["lease_skips"] == 1
+
+
+@pytest.mark.asyncio
+async def test_on_demand_sync_does_not_reacquire_this_replicas_global_lease():
+    tracker = {"running": 0, "peak": 0, "order": []}
+    keeper = lease_keeper(held_elsewhere=set())
+    engine = MailboxSyncEngine(
+        registry("a"),
+        lambda address: FakeManager(address, tracker),
+        lease_keeper=keeper,
+        lease_scope="global",
+    )
+
+    # "b" isn't part of the run, so the fetch can't join it
+    started = await engine.run_once()
+    fetch = await engine.sync_mailbox("b")
+    await engine.drain()
+
+    assert started == ["a"] and fetch is None
+    assert tracker["order"] == ["a"]
+    keeper.acquire.assert_awaited_once_with("sync:all")
+
+
+@pytest.mark.asyncio
+async def test_mailbox_still_syncing_is_skipped_and_fetch_joins_it():
+    engine, tracker = engine_for(registry("a"))
+
+    first_tick = await engine.run_once()
+    second_tick = await engine.run_once()
+    fetch = await engine.sync_mailbox("a")
+
+    assert first_tick == ["a"] and second_tick == []
+    assert tracker["order"] == ["a"]
+    assert fetch.stored == 1
+    single_flight = engine.stats()["single_flight"]
+    assert single_flight["skipped_count"] == 1
+    assert single_flight["coalesced_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sync_mailbox_raises_for_direct_callers():
+    engine, _ = engine_for(registry("a"), failing={"a"})
+
+    with pytest.raises(RuntimeError):
+        await engine.sync_mailbox("a")
+
+
+@pytest.mark.asyncio
+async def test_due_only_run_syncs_mailboxes_whose_interval_elapsed():
+    tracker = {"running": 0, "peak": 0, "order": []}
+    scheduler = AdaptivePollScheduler(initial_seconds=60)
+    engine = MailboxSyncEngine(
+        registry("a", "b"),
+        lambda address: FakeManager(address, tracker),
+        poll_scheduler=scheduler,
+    )
+    scheduler.observe("a", stored=0)
+
+    assert await engine.run_once(due_only=True) == ["b"]
+    await engine.drain()
+
+    # b stored a message, so its interval halved
+    assert engine.stats()["polling"]["mailboxes"]["b"]["interval_seconds"] == 30
+    assert await engine.run_once(due_only=True) == []
+    assert sorted(await engine.run_once()) == ["a", "b"]
+    await engine.drain()
+
+
+@pytest.mark.asyncio
+async def test_long_sync_does_not_hold_up_other_mailboxes():
+    tracker = {"running": 0, "peak": 0, "order": []}
+    backfill = asyncio.Event()
+
+    class SlowManager(FakeManager):
+        async def sync_and_store_emails(self, fence=None):
+            await backfill.wait()
+            return await super().sync_and_store_emails(fence)
+
+    engine = MailboxSyncEngine(
+        registry("a", "b"),
+        lambda address: (SlowManager if address == "a" else FakeManager)(address, tracker),
+        max_concurrency=2,
+    )
+
+    assert await engine.run_once() == ["a", "b"]
+    await asyncio.sleep(0.05)
+    # The next tick starts b again while a is still backfilling
+    assert await engine.run_once() == ["b"]
+    assert engine.stats()["in_flight"] == ["a", "b"]
+    await asyncio.sleep(0.05)
+    assert engine.stats()["in_flight"] == ["a"]
+
+    backfill.set()
+    await engine.drain()
+    assert tracker["order"] == ["b", "b", "a"]
+
+
+@pytest.mark.asyncio
+async def test_global_leader_keeps_its_lease_until_syncs_drain():
+    tracker = {"running": 0, "peak": 0, "order": []}
+    keeper = lease_keeper(held_elsewhere=set())
+    engine = MailboxSyncEngine(
+        registry("a", "b"),
+        lambda address: FakeManager(address, tracker),
+        lease_keeper=keeper,
+        lease_scope="global",
+    )
+
+    assert sorted(await engine.run_once()) == ["a", "b"]
+    # A tick while leading reuses the lease instead of bumping its token
+    assert await engine.run_once() == []
+    await engine._leader
+
+    keeper.acquire.assert_awaited_once_with("sync:all")
+    assert all(fence.token == 7 for fence in tracker["fences"])
+    assert engine._global_fence is None
@@ -2,10 +2,16 @@
 
 import pytest
 from unittest.mock import AsyncMock, patch
+from app.auth.device_code_login import AuthState
+from app.core.config import settings
 from app.dependencies import (
+    device_login,
     get_mail_client,
+    get_mailbox_client,
+    get_mailbox_manager,
     get_email_repo,
     get_email_manager,
+    reconcile_database,
     run_email_sync,
 )
 from app.mail.ms_graph_client import GraphMailClient
@@ -33,23 +39,55 @@ def test_lru_cache_returns_same_instances():
     assert get_email_repo() is get_email_repo()
     assert get_email_manager() is get_email_manager()
 
+def test_each_mailbox_gets_its_own_client_and_manager():
+    assert get_mailbox_client(settings.USER_EMAIL) is get_mail_client()
+    other = get_mailbox_client("shared@example.com")
+    assert other.api_url.endswith("/users/shared@example.com")
+    assert get_mailbox_manager("shared@example.com").user_email == "shared@example.com"
+    assert get_mailbox_manager("shared@example.com").mail_client is other
+
+
+@pytest.fixture
+def authenticated(monkeypatch):
+    monkeypatch.setattr(device_login, "state", AuthState.AUTHENTICATED)
+    monkeypatch.setattr(device_login.token_provider, "_token", None)
+
+
 @pytest.mark.asyncio
-@patch("app.dependencies.get_email_manager")
-async def test_run_email_sync_success(mock_get_manager):
-    mock_manager = AsyncMock()
-    mock_get_manager.return_value = mock_manager
+@patch("app.dependencies.get_sync_engine")
+async def test_run_email_sync_skips_when_not_authenticated(mock_get_engine, monkeypatch):
+    monkeypatch.setattr(device_login, "state", AuthState.NOT_STARTED)
     await run_email_sync()
-    mock_manager.sync_and_store_emails.assert_awaited_once()
+    mock_get_engine.assert_not_called()
 
 
 @pytest.mark.asyncio
-@patch("app.dependencies.get_email_manager")
-async def test_run_email_sync_handles_exception(mock_get_manager, capsys):
-    mock_manager = AsyncMock()
-    mock_manager.sync_and_store_emails.side_effect = Exception("Some sync error")
-    mock_get_manager.return_value = mock_manager
+@patch("app.dependencies.get_sync_engine")
+async def test_run_email_sync_fans_out_over_registry(mock_get_engine, authenticated):
+    mock_engine = AsyncMock()
+    mock_get_engine.return_value = mock_engine
+    await run_email_sync()
+    mock_engine.run_once.assert_awaited_once_with(due_only=settings.ADAPTIVE_POLLING_ENABLED)
+
+
+@pytest.mark.asyncio
+@patch("app.dependencies.get_sync_engine")
+async def test_run_email_sync_handles_exception(mock_get_engine, authenticated, capsys):
+    mock_engine = AsyncMock()
+    mock_engine.run_once.side_effect = Exception("Some sync error")
+    mock_get_engine.return_value = mock_engine
 
     await run_email_sync()
 
     captured = capsys.readouterr()
-    assert "CRON JOB ERROR: Some sync error" in captured.out
\ No newline at end of file
+    assert "CRON JOB ERROR: Some sync error" in captured.out
+
+
+@pytest.mark.asyncio
+@patch("app.dependencies.mongo_mgr.ensure_database", new_callable=AsyncMock)
+async def test_reconcile_database_logs_instead_of_raising(mock_ensure_db, caplog):
+    mock_ensure_db.side_effect = Exception("mongo down")
+
+    await reconcile_database()
+
+    assert "Index reconciliation failed: mongo down" in caplog.text
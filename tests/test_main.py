@@ -1,4 +1,6 @@
 # tests/test_main.py
+import asyncio
+
 import pytest
 import httpx
 from fastapi import FastAPI
@@ -43,13 +45,26 @@ def test_middleware_applied():
 
 @pytest.mark.asyncio
 async def test_startup_handler():
-    with patch("app.main.mongo_mgr.ensure_database", new_callable=AsyncMock) as mock_ensure_db, \
+    with patch("app.main.reconcile_database", new_callable=AsyncMock) as mock_reconcile_db, \
+         patch("app.main.register_default_mailbox", new_callable=AsyncMock) as mock_register_mailbox, \
+         patch("app.main.backfill_threads", new_callable=AsyncMock) as mock_backfill_threads, \
+         patch("app.main.http_transport.open", new_callable=AsyncMock) as mock_http_open, \
+         patch("app.main.device_login.bootstrap", new_callable=AsyncMock) as mock_login_bootstrap, \
+         patch("app.main.token_refresher.start") as mock_refresher_start, \
+         patch("app.main.get_outbox_workers") as mock_outbox_workers, \
          patch("app.main.scheduler.start") as mock_scheduler_start, \
          patch("app.main.scheduler.add_job") as mock_add_job:
 
         await startup()
 
-        mock_ensure_db.assert_awaited_once()
+        mock_register_mailbox.assert_awaited_once()
+        await asyncio.sleep(0)
+        mock_reconcile_db.assert_awaited_once()
+        mock_backfill_threads.assert_awaited_once()
+        mock_http_open.assert_awaited_once()
+        mock_login_bootstrap.assert_awaited_once()
+        mock_refresher_start.assert_called_once()
+        mock_outbox_workers.return_value.start.assert_called_once()
         mock_add_job.assert_called_once()
         mock_scheduler_start.assert_called_once()
 
@@ -57,9 +72,16 @@ async def test_startup_handler():
 @pytest.mark.asyncio
 async def test_shutdown_handler():
     with patch("app.main.mongo_mgr.close", new_callable=AsyncMock) as mock_close_db, \
+         patch("app.main.http_transport.close", new_callable=AsyncMock) as mock_http_close, \
+         patch("app.main.token_refresher.stop", new_callable=AsyncMock) as mock_refresher_stop, \
+         patch("app.main.get_outbox_workers") as mock_outbox_workers, \
          patch("app.main.scheduler.shutdown") as mock_scheduler_shutdown:
 
+        mock_outbox_workers.return_value.stop = AsyncMock()
         await shutdown()
 
         mock_close_db.assert_awaited_once()
+        mock_http_close.assert_awaited_once()
+        mock_refresher_stop.assert_awaited_once()
+        mock_outbox_workers.return_value.stop.assert_awaited_once()
         mock_scheduler_shutdown.assert_called_once()
\ No newline at end of file